@@ -6,8 +6,12 @@ Unified plan generation with LLM, rate limiting, and plan history.
 from __future__ import annotations
 
 import os
+import json
+import asyncio
+import httpx
 import stripe
-from datetime import datetime, timezone, timedelta
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone, timedelta
 from typing import Any, Dict, Optional
 
 # Load environment variables from .env file
@@ -22,19 +26,53 @@ ENV_PATH = BASE_DIR / ".env"
 load_dotenv(dotenv_path=ENV_PATH)
 from app.services.subscribers import SubscriberStore
 from app.services.stripe_billing import init_stripe
-from fastapi import FastAPI, HTTPException, Request, Response, Header
+from fastapi import FastAPI, HTTPException, Request, Response, Header, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse
-from pydantic import BaseModel, EmailStr
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, StreamingResponse
+from pydantic import BaseModel, EmailStr, Field
 
 # Services
 from app.services.subscribers import SubscriberStore
-from app.services.rate_limits import RateLimitStore
+from app.services.rate_limits import rate_limits
 from app.services.plan_links import PlanLinkStore
 from app.services.plan_history import PlanHistoryStore
-from app.services.weather import get_weather_snapshot
+from app.services.plan_jobs import (
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_SUCCEEDED,
+    PermanentJobError,
+    PlanJobQueue,
+    PlanJobStore,
+    QueueFullError,
+)
+from app.services.weather import (
+    FORECAST_DAYS,
+    get_forecast_snapshot,
+    get_weather_snapshot,
+    get_weather_snapshots,
+    local_date,
+    weather_providers,
+)
 from app.services.phase_logic import determine_phase
-from app.services.llm_plan_service import generate_llm_plan_with_retries
+from app.services.llm_plan_service import (
+    generate_llm_plan_with_retries,
+    hedge_stats,
+    is_user_regenerating,
+    llm_usage_stats,
+    plan_repair_stats,
+    stream_llm_plan,
+    STREAM_SECTIONS,
+)
+from app.services.plan_cache import plan_cache, plan_cache_key
+from app.services.auth import require_api_key
+from app.services.http_clients import http_clients
+from app.services import db
+from app.services.weather_cache import weather_cache
+from app.services.pressure_history import pressure_history
+from app.services.weather_prefetch import WeatherPrefetcher
+from app.services.plan_retention import PlanRetentionWorker
+from app.services.geo import ensure_zip_index, geo_stats, resolve_zip
+from app.services.lake_catalog import get_catalog
 from app.services.plan_enrichment import enrich_member_plan
 from app.canon.target_definitions import get_target_definition
 from app.services.email_service import (
@@ -58,14 +96,60 @@ from app.services.stripe_billing import (
 # ----------------------------------------
 # These must exist BEFORE importing routes that use them
 subs = SubscriberStore()
-rate_limits = RateLimitStore()
 plan_links = PlanLinkStore()
 plan_history_store = PlanHistoryStore() 
+plan_jobs = PlanJobStore()
+plan_job_queue = PlanJobQueue(plan_jobs)
+weather_prefetcher = WeatherPrefetcher(plan_history_store, plan_links)
+plan_retention = PlanRetentionWorker(plan_history_store)
 
 # ----------------------------------------
 # 2. APP SETUP
 # ----------------------------------------
-app = FastAPI(title="Bass Clarity API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled outbound clients live for the whole process; the outer finally
+    # closes them even if a startup step below fails
+    try:
+        await http_clients.start()
+        # This runs every time Render deploys or restarts your API
+        await sync_members_from_stripe()
+        # Async plan jobs (queued jobs from before a restart are picked up here)
+        await plan_job_queue.start(_run_plan_job)
+        pressure_pruner = asyncio.create_task(pressure_history.run_pruner())
+        cache_sweeper = asyncio.create_task(plan_cache.run_sweeper())
+        view_flusher = asyncio.create_task(plan_links.run_view_flusher())
+        usage_flusher = asyncio.create_task(rate_limits.run_flusher())
+        # Keep the most-planned lakes' weather warm ahead of the dawn peak
+        prefetcher = asyncio.create_task(weather_prefetcher.run())
+        retention = asyncio.create_task(plan_retention.run())
+        # Builds the ZIP index in the background if the deploy didn't ship one
+        zip_index_builder = asyncio.create_task(ensure_zip_index())
+        try:
+            yield
+        finally:
+            prefetcher.cancel()
+            retention.cancel()
+            zip_index_builder.cancel()
+            pressure_pruner.cancel()
+            cache_sweeper.cancel()
+            view_flusher.cancel()
+            usage_flusher.cancel()
+            try:
+                plan_links.flush_views()
+            except Exception as e:
+                print(f"[PlanLinks] Final view flush failed: {e}")
+            try:
+                rate_limits.flush_usage()
+            except Exception as e:
+                print(f"[RateLimits] Final usage flush failed: {e}")
+            await plan_job_queue.stop()
+    finally:
+        await http_clients.aclose()
+        db.close_pools()
+
+
+app = FastAPI(title="Bass Clarity API", lifespan=lifespan)
 
 # ✅ PRODUCTION CORS CONFIGURATION
 origins = [
@@ -127,7 +211,7 @@ async def sync_members_from_stripe():
 # VARIETY SYSTEM HELPER
 # ========================================
 
-def get_recent_lures(email: str, current_lake_name: str, limit: int = 3) -> dict[str, any]:
+async def get_recent_lures(email: str, current_lake_name: str, limit: int = 3) -> dict[str, any]:
     """
     Get user's N most recent primary AND secondary lures from plan history.
     Also returns regeneration context (location, timing, last combination).
@@ -135,12 +219,10 @@ def get_recent_lures(email: str, current_lake_name: str, limit: int = 3) -> dict
     seven_days_ago = datetime.now(timezone.utc) - timedelta(days=7)
     
     try:
-        recent_history = plan_history_store.get_user_plans(
+        recent_history = await plan_history_store.aio.get_recent_lures(
             email=email,
             since=seven_days_ago,
             limit=limit,
-            offset=0,
-            include_deleted=False
         )
     except Exception as e:
         print(f"Failed to get plan history for {email}: {e}")
@@ -161,9 +243,6 @@ def get_recent_lures(email: str, current_lake_name: str, limit: int = 3) -> dict
     last_combination = None
     
     for idx, plan_hist in enumerate(recent_history):
-        token = plan_hist.get("plan_link_id")
-        if not token: continue
-        
         # Capture context from most recent plan (first in list)
         if idx == 0:
             last_lake_name = plan_hist.get("lake_name")
@@ -179,24 +258,15 @@ def get_recent_lures(email: str, current_lake_name: str, limit: int = 3) -> dict
                 except Exception as e:
                     print(f"Failed to parse generation date: {e}")
         
-        try:
-            full_plan_data = plan_links.get_plan(token)
-            if not full_plan_data: continue
-            
-            plan = full_plan_data.get("plan", {})
-            p_lure = plan.get("primary", {}).get("base_lure")
-            if p_lure: primary_lures.append(p_lure)
-            
-            s_lure = plan.get("secondary", {}).get("base_lure")
-            if s_lure: secondary_lures.append(s_lure)
-            
-            # Capture most recent combination
-            if idx == 0 and p_lure and s_lure:
-                last_combination = (p_lure, s_lure)
-                
-        except Exception as e:
-            print(f"Failed to extract lures from plan {token}: {e}")
-            continue
+        p_lure = plan_hist.get("primary_lure")
+        if p_lure: primary_lures.append(p_lure)
+        
+        s_lure = plan_hist.get("secondary_lure")
+        if s_lure: secondary_lures.append(s_lure)
+        
+        # Capture most recent combination
+        if idx == 0 and p_lure and s_lure:
+            last_combination = (p_lure, s_lure)
     
     return {
         "primary": primary_lures,
@@ -218,18 +288,17 @@ class PlanGenerateRequest(BaseModel):
     longitude: float
     location_name: str
     access_type: str = "boat"
+    trip_date: Optional[date] = None  # plan ahead from the stored forecast (next 7 days)
 
 class SubscribeRequest(BaseModel):
     email: EmailStr
 
+class WeatherPoint(BaseModel):
+    lat: float = Field(ge=-90, le=90)
+    lon: float = Field(ge=-180, le=180)
 
-# ========================================
-# SYNC STRIPE MEMBERS
-# ========================================
-@app.on_event("startup")
-async def startup_event():
-    # This runs every time Render deploys or restarts your API
-    await sync_members_from_stripe()
+class WeatherBatchRequest(BaseModel):
+    points: list[WeatherPoint] = Field(min_length=1, max_length=25)
 
 
 # ========================================
@@ -245,7 +314,7 @@ async def weather_current(lat: float, lon: float):
     """
     try:
         # Reuse your existing weather service
-        weather = await get_weather_snapshot(lat, lon)
+        weather = await get_weather_snapshot(lat, lon, endpoint="weather_current")
         return weather
     except Exception as e:
         # Frontend fails gracefully (stays offline) if this errors
@@ -253,17 +322,69 @@ async def weather_current(lat: float, lon: float):
         raise HTTPException(status_code=500, detail="Weather unavailable")
 
 
+@app.get("/lakes/nearest")
+def lakes_nearest(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=500),
+    limit: int = Query(5, ge=1, le=100),
+):
+    """
+    Catalog lakes nearest to a point. With radius_km, every lake inside the
+    radius (up to limit), nearest first.
+    """
+    catalog = get_catalog()
+    if radius_km is not None:
+        lakes = catalog.within(lat, lon, radius_km, limit=limit)
+    else:
+        lakes = catalog.nearest(lat, lon, limit=limit)
+    return {"count": len(lakes), "lakes": lakes}
+
+
+@app.get("/geo/zip/{zip_code}")
+async def geo_zip(zip_code: str):
+    """Centroid and place name for a US ZIP: {"zip", "lat", "lon", "name"}."""
+    try:
+        return await resolve_zip(zip_code)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            raise HTTPException(status_code=404, detail="ZIP not found")
+        raise HTTPException(status_code=502, detail="ZIP lookup unavailable")
+    except (httpx.HTTPError, KeyError, IndexError, TypeError) as e:
+        print(f"ZIP lookup failed for {zip_code}: {e}")
+        raise HTTPException(status_code=502, detail="ZIP lookup unavailable")
+
+
+@app.post("/weather/batch")
+async def weather_batch(body: WeatherBatchRequest):
+    """
+    Live weather for several launch points in one round trip.
+    Points in the same weather grid cell share one lookup; a failed point
+    is reported in its own item ("ok": false) instead of failing the batch.
+    """
+    items = await get_weather_snapshots([(p.lat, p.lon) for p in body.points])
+    return {
+        "count": len(items),
+        "failed": sum(1 for item in items if not item["ok"]),
+        "items": items,
+    }
+
+
 # ========================================
 # PLAN GENERATION (UNIFIED ENDPOINT)
 # ========================================
 
-@app.post("/plan/generate")
-async def plan_generate(body: PlanGenerateRequest, request: Request):
-    # Map flat fields to Service variables
-    latitude = body.latitude
-    longitude = body.longitude
-    location = body.location_name
-    
+async def _check_plan_access(
+    body: PlanGenerateRequest, admin_override: bool, reserve: bool = True
+) -> tuple[str, str, bool, Optional[str]]:
+    """
+    Validate the request and take one of the caller's daily plans.
+    Returns (email, access_type, is_member, usage_day); usage_day is set when a
+    slot was reserved and must be released (_release_usage) if no plan is
+    delivered. With reserve=False the quota is only checked.
+    """
     email = body.email.lower().strip()
     
     access_type = body.access_type.lower().strip()
@@ -273,8 +394,8 @@ async def plan_generate(body: PlanGenerateRequest, request: Request):
             detail=f"Invalid access_type: '{access_type}'. Must be 'boat' or 'bank'."
         )
     
-    admin_override = request.headers.get("X-Admin-Override") == "true"
-    is_member = subs.is_active(email)
+    is_member = await subs.aio.is_active(email)
+    usage_day = None
     
     if not admin_override:
         if not is_member:
@@ -283,7 +404,12 @@ async def plan_generate(body: PlanGenerateRequest, request: Request):
                 detail="Subscription required to generate scouting reports."
             )
             
-        if not rate_limits.is_within_daily_limit(email):
+        if reserve:
+            usage_day = await rate_limits.aio.reserve(email)
+            allowed = usage_day is not None
+        else:
+            allowed = await rate_limits.aio.is_within_daily_limit(email)
+        if not allowed:
             raise HTTPException(
                 status_code=429,
                 detail={
@@ -292,44 +418,144 @@ async def plan_generate(body: PlanGenerateRequest, request: Request):
                 }
             )
     
+    return email, access_type, is_member, usage_day
+
+
+async def _release_usage(ctx: Dict[str, Any]) -> None:
+    """Refund the daily plan reserved for ctx when generation fails."""
+    if ctx.get("usage_day") is None:
+        return
     try:
-        weather = await get_weather_snapshot(latitude, longitude)
+        await rate_limits.aio.release(ctx["email"], ctx["usage_day"])
+    except Exception as e:
+        print(f"[RateLimits] Could not release reserved plan for {ctx['email']}: {e}")
+    ctx["usage_day"] = None
+
+
+async def _prepare_plan_generation(body: PlanGenerateRequest, admin_override: bool) -> Dict[str, Any]:
+    """
+    Everything plan generation needs before the LLM runs: access checks,
+    weather, phase, variety context and the plan-cache lookup.
+    Raises HTTPException on any failure so streaming callers fail before
+    the event stream starts. On success the returned ctx holds the reserved
+    daily plan; callers release it (_release_usage) if generation fails.
+    """
+    email, access_type, is_member, usage_day = await _check_plan_access(body, admin_override)
+    try:
+        return await _prepare_plan_context(body, email, access_type, is_member, usage_day)
+    except BaseException:
+        await _release_usage({"email": email, "usage_day": usage_day})
+        raise
+
+
+async def _prepare_plan_context(
+    body: PlanGenerateRequest, email: str, access_type: str, is_member: bool, usage_day: Optional[str]
+) -> Dict[str, Any]:
+    # Map flat fields to Service variables
+    latitude = body.latitude
+    longitude = body.longitude
+    
+    try:
+        # Today's snapshot is needed either way: it carries the lake's UTC offset
+        weather = await get_weather_snapshot(latitude, longitude, endpoint="plan_generate")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Weather service error: {e}")
     
-    current_month = datetime.now().month
-    phase = determine_phase(temp_f=weather["temp_f"], month=current_month, latitude=latitude)
+    # "Today" is the lake's date, not the server's
+    lake_today = local_date(weather, longitude)
+    trip_day = body.trip_date or lake_today
+    if body.trip_date:
+        last_day = lake_today + timedelta(days=FORECAST_DAYS - 1)
+        range_msg = f"trip_date must be between {lake_today.isoformat()} and {last_day.isoformat()} (today through 7 days ahead at the lake)."
+        if not lake_today <= body.trip_date <= last_day:
+            raise HTTPException(status_code=400, detail=range_msg)
+        try:
+            weather = await get_forecast_snapshot(latitude, longitude, body.trip_date, endpoint="plan_generate")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"{e}. {range_msg}")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Weather service error: {e}")
     
-    recent_data = get_recent_lures(email, current_lake_name=body.location_name, limit=2)
-    trip_date = datetime.now().strftime("%B %d, %Y")
+    # Phase is evaluated for the trip date, not today
+    phase = determine_phase(temp_f=weather["temp_f"], month=trip_day.month, latitude=latitude)
     
-    try:
-        plan = await generate_llm_plan_with_retries(
+    recent_data = await get_recent_lures(email, current_lake_name=body.location_name, limit=2)
+    
+    # Canonical lake for these coordinates (None when off-catalog)
+    lake = get_catalog().resolve(latitude, longitude)
+    
+    # Plan cache: same conditions + same water = same validated plan.
+    # Only an actual regeneration (variety requested) skips the lookup.
+    cache_key = None
+    cached_plan = None
+    if is_member and plan_cache.enabled:
+        cache_key = plan_cache_key(
             weather=weather,
             phase=phase,
-            location=location, 
-            latitude=latitude,
-            longitude=longitude,
             access_type=access_type,
-            is_member=is_member,
-            current_lake_name=body.location_name,
-            recent_primary_lures=recent_data["primary"],
-            recent_secondary_lures=recent_data["secondary"],
-            regen_context=recent_data["context"],
+            latitude=None if lake else latitude,
+            longitude=None if lake else longitude,
+            water_view_id=lake["id"] if lake else None,
+            # A trip date of today is the live plan and shares its key
+            trip_date=body.trip_date if body.trip_date != lake_today else None,
+        )
+        cached_plan = await plan_cache.aio.lookup(
+            cache_key,
+            regenerating=is_user_regenerating(body.location_name, recent_data["context"]),
+            # Combinations must never repeat for the same member
+            avoid_combination=recent_data["context"].get("last_combination"),
         )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Plan generation error: {e}")
     
-    if not plan:
-        raise HTTPException(status_code=503, detail="Plan generation temporarily unavailable.")
+    return {
+        "body": body,
+        "email": email,
+        "is_member": is_member,
+        "usage_day": usage_day,
+        "access_type": access_type,
+        "weather": weather,
+        "phase": phase,
+        "recent_data": recent_data,
+        "cache_key": cache_key,
+        "cached_plan": cached_plan,
+        "lake": lake,
+        "trip_date": trip_day.strftime("%B %d, %Y"),
+        "llm_kwargs": {
+            "weather": weather,
+            "phase": phase,
+            "location": body.location_name,
+            "latitude": latitude,
+            "longitude": longitude,
+            "access_type": access_type,
+            "is_member": is_member,
+            "current_lake_name": body.location_name,
+            "recent_primary_lures": recent_data["primary"],
+            "recent_secondary_lures": recent_data["secondary"],
+            "regen_context": recent_data["context"],
+        },
+    }
+
+
+async def _finalize_plan(ctx: Dict[str, Any], plan: Dict[str, Any], from_cache: bool) -> Dict[str, Any]:
+    """Cache, enrich, attach conditions, persist, and count a generated plan."""
+    body = ctx["body"]
+    email = ctx["email"]
+    is_member = ctx["is_member"]
+    weather = ctx["weather"]
+    phase = ctx["phase"]
+    access_type = ctx["access_type"]
+    trip_date = ctx["trip_date"]
+    
+    if ctx["cache_key"] and not from_cache:
+        await plan_cache.aio.set(ctx["cache_key"], plan)
     
     if is_member:
         plan = enrich_member_plan(plan, weather, phase)
     
     plan["conditions"] = {
         "location_name": body.location_name,
-        "latitude": latitude,
-        "longitude": longitude,
+        "lake_id": ctx["lake"]["id"] if ctx["lake"] else None,
+        "latitude": body.latitude,
+        "longitude": body.longitude,
         "trip_date": trip_date,
         "access_type": access_type,
         "subscriber_email": email if is_member else None,
@@ -359,7 +585,7 @@ async def plan_generate(body: PlanGenerateRequest, request: Request):
     if "forecast_rating" in plan:
         plan["conditions"]["forecast_rating"] = plan["forecast_rating"]
 
-    token = plan_links.save_plan(
+    token = await plan_links.aio.save_plan(
         email=email,
         is_member=is_member,
         plan_data=plan,
@@ -371,16 +597,20 @@ async def plan_generate(body: PlanGenerateRequest, request: Request):
     # ✅ Add plan_url to the plan object itself for frontend Share/Copy functionality
     plan["plan_url"] = plan_url
     
-    plan_history_store.add_plan(
+    await plan_history_store.aio.add_plan(
         user_email=email,
         plan_link_id=token,
         lake_name=body.location_name,
         plan_type="member" if is_member else "preview",
-        conditions=plan["conditions"]
+        conditions=plan["conditions"],
+        primary_lure=(plan.get("primary") or {}).get("base_lure"),
+        secondary_lure=(plan.get("secondary") or {}).get("base_lure"),
     )
     
-    if is_member:
-        rate_limits.increment_daily_count(email)
+    # Quota-checked requests reserved their slot up front; admin overrides are counted here
+    if is_member and ctx.get("usage_day") is None:
+        await rate_limits.aio.increment_daily_count(email)
+    ctx["usage_day"] = None
     
     return {
         "plan_url": plan_url,
@@ -389,13 +619,213 @@ async def plan_generate(body: PlanGenerateRequest, request: Request):
         "plan": plan,
     }
 
+
+@app.post("/plan/generate")
+async def plan_generate(
+    body: PlanGenerateRequest,
+    request: Request,
+    async_mode: bool = Query(False, alias="async"),
+):
+    admin_override = request.headers.get("X-Admin-Override") == "true"
+    
+    if async_mode:
+        # Fail fast on access/quota, then hand the heavy pipeline to the job pool
+        # (the job reserves its slot when it runs)
+        email, _, _, _ = await _check_plan_access(body, admin_override, reserve=False)
+        try:
+            job_id = await plan_job_queue.submit(
+                email,
+                {"body": body.model_dump(mode="json"), "admin_override": admin_override},
+            )
+        except QueueFullError:
+            raise HTTPException(
+                status_code=503,
+                detail="Plan queue is full. Please retry shortly.",
+                headers={"Retry-After": "10"},
+            )
+        return JSONResponse(
+            status_code=202,
+            content={
+                "job_id": job_id,
+                "status": JOB_QUEUED,
+                "status_url": f"/plan/jobs/{job_id}",
+                "events_url": f"/plan/jobs/{job_id}/events",
+            },
+        )
+    
+    ctx = await _prepare_plan_generation(body, admin_override)
+    
+    try:
+        plan = ctx["cached_plan"]
+        if plan is not None:
+            return await _finalize_plan(ctx, plan, from_cache=True)
+        
+        try:
+            plan = await generate_llm_plan_with_retries(**ctx["llm_kwargs"])
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Plan generation error: {e}")
+        
+        if not plan:
+            raise HTTPException(status_code=503, detail="Plan generation temporarily unavailable.")
+        
+        return await _finalize_plan(ctx, plan, from_cache=False)
+    finally:
+        await _release_usage(ctx)
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _stream_plan_events(ctx: Dict[str, Any]):
+    yield _sse("meta", {"phase": ctx["phase"], "access_type": ctx["access_type"]})
+    
+    cached = ctx["cached_plan"]
+    if cached is not None:
+        for section in STREAM_SECTIONS:
+            if cached.get(section) is not None:
+                yield _sse(section, cached[section])
+        yield _sse("done", await _finalize_plan(ctx, cached, from_cache=True))
+        return
+    
+    plan = None
+    try:
+        async for event, data in stream_llm_plan(**ctx["llm_kwargs"]):
+            if event == "plan":
+                plan = data
+            else:
+                yield _sse(event, data)
+    except Exception as e:
+        print(f"LLM_STREAM: Generation error: {e}")
+        yield _sse("error", {"status": 500, "detail": f"Plan generation error: {e}"})
+        return
+    
+    if not plan:
+        yield _sse("error", {"status": 503, "detail": "Plan generation temporarily unavailable."})
+        return
+    
+    yield _sse("done", await _finalize_plan(ctx, plan, from_cache=False))
+
+
+@app.post("/plan/generate/stream")
+async def plan_generate_stream(body: PlanGenerateRequest, request: Request):
+    """
+    Server-Sent Events variant of /plan/generate.
+    Events: one per plan section (forecast_rating, weather_card_insights,
+    outlook_blurb, primary, secondary) as soon as it validates, then "done"
+    with the same payload /plan/generate returns (token, plan_url, plan),
+    or "error". If whole-plan repair or the fallback changes a section that
+    was already sent, "reset" comes before "done": the client drops what it
+    has and the final plan's sections are sent again.
+    """
+    ctx = await _prepare_plan_generation(body, request.headers.get("X-Admin-Override") == "true")
+    
+    async def events():
+        try:
+            async for chunk in _stream_plan_events(ctx):
+                yield chunk
+        finally:
+            # Client disconnects and failures hand the reserved plan back
+            await _release_usage(ctx)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ========================================
+# ASYNC PLAN JOBS
+# ========================================
+
+async def _run_plan_job(job: Dict[str, Any]) -> str:
+    """Job handler: same pipeline as /plan/generate. Returns the plan_links token."""
+    body = PlanGenerateRequest(**job["request"]["body"])
+    try:
+        ctx = await _prepare_plan_generation(body, bool(job["request"].get("admin_override")))
+    except HTTPException as e:
+        if e.status_code < 500:
+            raise PermanentJobError(str(e.detail))
+        raise RuntimeError(str(e.detail))
+    
+    try:
+        plan = ctx["cached_plan"]
+        from_cache = plan is not None
+        if plan is None:
+            plan = await generate_llm_plan_with_retries(**ctx["llm_kwargs"])
+            if not plan:
+                raise RuntimeError("Plan generation temporarily unavailable.")
+        
+        return (await _finalize_plan(ctx, plan, from_cache=from_cache))["token"]
+    finally:
+        await _release_usage(ctx)
+
+
+def _job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    out = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
+    if job["status"] == JOB_FAILED:
+        out["error"] = job["error"]
+    if job["status"] == JOB_SUCCEEDED and job["result_token"]:
+        token = job["result_token"]
+        plan_data = plan_links.peek(token)
+        out["token"] = token
+        out["plan_url"] = f"{WEB_BASE_URL}/plan?token={token}"
+        out["access_type"] = job["request"]["body"].get("access_type")
+        out["plan"] = plan_data["plan"] if plan_data else None
+    return out
+
+
+@app.get("/plan/jobs/{job_id}")
+def plan_job_status(job_id: str):
+    job = plan_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_status(job)
+
+
+@app.get("/plan/jobs/{job_id}/events")
+async def plan_job_events(job_id: str):
+    """SSE alternative to polling: emits "status" on each change, then "done" or "error"."""
+    if not await plan_jobs.aio.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def events():
+        last_status = None
+        deadline = asyncio.get_running_loop().time() + 300
+        while asyncio.get_running_loop().time() < deadline:
+            job = await plan_jobs.aio.get(job_id)
+            if job["status"] != last_status:
+                last_status = job["status"]
+                if last_status == JOB_SUCCEEDED:
+                    yield _sse("done", await db.run(_job_status, job))
+                    return
+                if last_status == JOB_FAILED:
+                    yield _sse("error", await db.run(_job_status, job))
+                    return
+                yield _sse("status", {"job_id": job_id, "status": last_status})
+            await asyncio.sleep(1.0)
+        yield _sse("error", {"job_id": job_id, "detail": "Timed out waiting for job"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # ========================================
 # PLAN VIEWING
 # ========================================
 
 @app.get("/plan/view/{token}")
 async def plan_view(token: str):
-    plan_data = plan_links.get_plan(token)
+    plan_data = await plan_links.aio.get_plan(token)
     if not plan_data:
         raise HTTPException(status_code=404, detail="Plan not found")
     return {
@@ -421,7 +851,7 @@ def billing_subscribe(body: SubscribeRequest):
 async def billing_portal(authorization: Optional[str] = Header(None)):
     from app.routes.members import verify_clerk_session
     email = await verify_clerk_session(authorization)
-    subscriber = subs.get(email)
+    subscriber = await subs.aio.get(email)
     if not subscriber or not subscriber.stripe_customer_id:
         raise HTTPException(status_code=404, detail="No subscription found")
     try:
@@ -457,7 +887,7 @@ async def stripe_webhook(request: Request):
             email, active, customer_id, subscription_id = update
             
             # 1. Update the member's active status in Postgres
-            subs.upsert_active(
+            await subs.aio.upsert_active(
                 email=email,
                 active=active,
                 stripe_customer_id=customer_id,
@@ -466,7 +896,7 @@ async def stripe_webhook(request: Request):
             
             # 2. ✅ LOG THE EVENT: For real-time monitoring and database auditing
             print(f"[Webhook Received] {event_type} | User: {email} | Active: {active}")
-            subs.log_webhook(
+            await subs.aio.log_webhook(
                 event_type=event_type,
                 email=email,
                 active=active,
@@ -489,14 +919,40 @@ async def stripe_webhook(request: Request):
 @app.get("/health")
 @app.head("/health")
 def health_check():
+    databases = db.health()
+    healthy = all(d["status"] == "ok" for d in databases.values())
     return {
-        "status": "healthy",
+        "status": "healthy" if healthy else "degraded",
         "services": {
             "subscribers": "ok",
             "rate_limits": "ok",
             "plan_links": "ok",
             "plan_history": "ok"
-        }
+        },
+        "databases": databases,
+    }
+
+@app.get("/metrics")
+def metrics(_: None = Depends(require_api_key)):
+    """Operational counters for sizing caches and pools (requires X-API-Key)."""
+    return {
+        "plan_cache": plan_cache.stats(),
+        "llm_usage": llm_usage_stats(),
+        "llm_repair": plan_repair_stats(),
+        "llm_hedge": hedge_stats(),
+        "plan_jobs": plan_job_queue.stats(),
+        "http_pools": http_clients.stats(),
+        "db_pools": db.stats(),
+        "plan_views": plan_links.view_stats(),
+        "plan_codec": plan_links.codec.codec_stats(),
+        "plan_retention": plan_retention.stats(),
+        "rate_limits": rate_limits.stats(),
+        "weather_cache": weather_cache.stats(),
+        "weather_providers": weather_providers.stats(),
+        "weather_prefetch": weather_prefetcher.stats(),
+        "geo": geo_stats(),
+        "lake_catalog": get_catalog().stats(),
+        "pressure_history": pressure_history.stats(),
     }
 
 @app.get("/")
@@ -507,6 +963,10 @@ def root():
         "version": "2.0",
         "endpoints": {
             "generate_plan": "POST /plan/generate",
+            "generate_plan_stream": "POST /plan/generate/stream",
+            "weather_batch": "POST /weather/batch",
+            "lakes_nearest": "GET /lakes/nearest",
+            "plan_job": "GET /plan/jobs/{job_id}",
             "view_plan": "GET /plan/view/{token}",
             "subscribe": "POST /billing/subscribe",
             "health": "GET /health",
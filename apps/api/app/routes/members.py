@@ -4,20 +4,20 @@ Member-only endpoints requiring Clerk authentication.
 """
 from __future__ import annotations
 
+import asyncio
 import os
 from typing import Dict, Optional
 
-import httpx
 import jwt
 from fastapi import APIRouter, HTTPException, Header
 
 from app.services.subscribers import SubscriberStore
-from app.services.rate_limits import RateLimitStore
+from app.services.rate_limits import rate_limits as rate_limit_store
 from app.services.plan_history import plan_history_store
+from app.services.http_clients import client_for
 
 router = APIRouter()
 subscriber_store = SubscriberStore()
-rate_limit_store = RateLimitStore()
 
 
 async def verify_clerk_session(authorization: Optional[str]) -> str:
@@ -47,7 +47,7 @@ async def verify_clerk_session(authorization: Optional[str]) -> str:
         raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
     
     # Get user details to extract email
-    async with httpx.AsyncClient() as client:
+    async with client_for("clerk") as client:
         user_response = await client.get(
             f"https://api.clerk.com/v1/users/{user_id}",
             headers={"Authorization": f"Bearer {clerk_secret_key}"}
@@ -94,7 +94,7 @@ async def member_status(authorization: Optional[str] = Header(None)) -> Dict:
     email = await verify_clerk_session(authorization)
     
     # Check subscriber status
-    subscriber = subscriber_store.get(email)
+    subscriber = await subscriber_store.aio.get(email)
 
     # Default membership decision from stored flag
     is_member = bool(subscriber and subscriber.active)
@@ -121,7 +121,7 @@ async def member_status(authorization: Optional[str] = Header(None)) -> Dict:
         
     # Check rate limit (10 per day)
     # Replaces old check_member_cooldown logic
-    daily_count = rate_limit_store.get_daily_count(email)
+    daily_count = await rate_limit_store.aio.get_daily_count(email)
     rate_limit_allowed = daily_count < 25
     
     # Base response
@@ -183,33 +183,52 @@ async def member_status(authorization: Optional[str] = Header(None)) -> Dict:
 async def get_plan_history(
     authorization: Optional[str] = Header(None),
     limit: int = 10,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None,
 ) -> Dict:
     """
-    Get user's plan generation history for last 30 days.
+    Get user's plan generation history (every visible plan retention still
+    keeps: PLAN_RETENTION_DAYS, default 30). total counts the same plans the
+    pages list, with or without PLAN_HISTORY_COUNT_CACHE.
+    Page with the returned next_cursor (offset still works for older clients).
     """
     print(f"[PLAN HISTORY] Endpoint called! Email fetching...")
-    from datetime import datetime, timezone, timedelta
     
     # Verify Clerk session
     email = await verify_clerk_session(authorization)
     
     limit = min(limit, 50)
-    thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
     
-    plans = plan_history_store.get_user_plans(
-        email=email,
-        since=thirty_days_ago,
-        limit=limit,
-        offset=offset,
-        include_deleted=False
-    )
+    # Served from the cached count when enabled
+    count = plan_history_store.aio.count_user_plans(email=email, include_deleted=False)
     
-    total = plan_history_store.count_user_plans(
-        email=email,
-        since=thirty_days_ago,
-        include_deleted=False
-    )
+    if offset and not cursor:
+        plans, total = await asyncio.gather(
+            plan_history_store.aio.get_user_plans(
+                email=email,
+                limit=limit,
+                offset=offset,
+                include_deleted=False
+            ),
+            count,
+        )
+        next_cursor = None
+        has_more = (offset + limit) < total
+    else:
+        try:
+            page, total = await asyncio.gather(
+                plan_history_store.aio.get_user_plans_page(
+                    email=email,
+                    limit=limit,
+                    cursor=cursor,
+                    include_deleted=False
+                ),
+                count,
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        plans, next_cursor = page["plans"], page["next_cursor"]
+        has_more = next_cursor is not None
     
     return {
         "plans": [
@@ -224,5 +243,6 @@ async def get_plan_history(
             for plan in plans
         ],
         "total": total,
-        "has_more": (offset + limit) < total
+        "next_cursor": next_cursor,
+        "has_more": has_more
     }
\ No newline at end of file
@@ -0,0 +1,244 @@
+# apps/api/app/services/db.py
+"""
+Shared database connections for every store.
+
+- Postgres: one psycopg_pool.ConnectionPool per DATABASE_URL. Connections are
+  health-checked on checkout and recycled after DB_POOL_MAX_LIFETIME_SECONDS.
+- SQLite: one persistent connection per (thread, database file), opened in WAL
+  mode so readers don't block the writer.
+
+Stores call db.connection(...) where they used to call psycopg.connect /
+sqlite3.connect. Both kinds work as `with ... as conn:` blocks that commit on
+success and roll back on error; the connection goes back to the pool (or stays
+open for the thread) instead of being closed.
+
+Async handlers reach stores through their `aio` view (AsyncStore): each
+method call runs on a dedicated DB thread pool, sized to the connection
+pool, so queries never block the event loop and never queue for a thread
+while holding a connection.
+
+Pool settings (env):
+  DB_POOL_MIN_SIZE               (default: 1)
+  DB_POOL_MAX_SIZE               (default: 10)
+  DB_EXECUTOR_WORKERS            threads running store calls for async code (default: DB_POOL_MAX_SIZE)
+  DB_POOL_TIMEOUT_SECONDS        max wait for a free connection (default: 10)
+  DB_POOL_MAX_IDLE_SECONDS       close idle connections above min size (default: 300)
+  DB_POOL_MAX_LIFETIME_SECONDS   (default: 3600)
+  SQLITE_BUSY_TIMEOUT_MS         (default: 5000)
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Postgres support
+try:
+    import psycopg
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    psycopg = None
+    ConnectionPool = None
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+_pools: Dict[str, Any] = {}
+_pools_lock = threading.Lock()
+
+_local = threading.local()
+_sqlite_lock = threading.Lock()
+_sqlite_stats: Dict[str, Dict[str, int]] = {}
+
+
+# ----------------------------------------
+# Postgres
+# ----------------------------------------
+
+def pg_pool(url: str):
+    """The shared pool for this DATABASE_URL (created and opened on first use)."""
+    pool = _pools.get(url)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(url)
+        if pool is None:
+            pool = ConnectionPool(
+                url,
+                min_size=int(_env_float("DB_POOL_MIN_SIZE", 1)),
+                max_size=int(_env_float("DB_POOL_MAX_SIZE", 10)),
+                timeout=_env_float("DB_POOL_TIMEOUT_SECONDS", 10),
+                max_idle=_env_float("DB_POOL_MAX_IDLE_SECONDS", 300),
+                max_lifetime=_env_float("DB_POOL_MAX_LIFETIME_SECONDS", 3600),
+                kwargs={"row_factory": dict_row},
+                check=ConnectionPool.check_connection,
+                name="bassclarity",
+                open=True,
+            )
+            _pools[url] = pool
+            print(f"[DB] Postgres pool opened (min={pool.min_size} max={pool.max_size})")
+    return pool
+
+
+def pg_autocommit(url: str):
+    """
+    A separate, unpooled autocommit connection, for statements that can't run
+    inside a transaction (CREATE INDEX CONCURRENTLY). Closes on leaving `with`.
+    """
+    return psycopg.connect(url, autocommit=True, row_factory=dict_row)
+
+
+# ----------------------------------------
+# SQLite
+# ----------------------------------------
+
+def sqlite_connection(path: str) -> sqlite3.Connection:
+    """This thread's persistent connection to the SQLite file at path."""
+    path = os.path.abspath(path)
+    conns = getattr(_local, "sqlite", None)
+    if conns is None:
+        conns = _local.sqlite = {}
+    conn = conns.get(path)
+    if conn is not None:
+        return conn
+
+    conn = sqlite3.connect(path, timeout=_env_float("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conns[path] = conn
+    with _sqlite_lock:
+        stats = _sqlite_stats.setdefault(path, {"opened": 0})
+        stats["opened"] += 1
+    return conn
+
+
+# ----------------------------------------
+# Store entry point
+# ----------------------------------------
+
+def connection(pg_url: Optional[str] = None, sqlite_path: Optional[str] = None):
+    """
+    Context manager for one unit of work:
+        with db.connection(pg_url=...) as conn: ...
+        with db.connection(sqlite_path=...) as conn: ...
+    """
+    if pg_url:
+        return pg_pool(pg_url).connection()
+    # sqlite3.Connection as a context manager commits/rolls back without closing
+    return sqlite_connection(sqlite_path)
+
+
+# ----------------------------------------
+# Async access
+# ----------------------------------------
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = int(_env_float("DB_EXECUTOR_WORKERS", _env_float("DB_POOL_MAX_SIZE", 10)))
+                _executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="db")
+    return _executor
+
+
+async def run(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Await a blocking store call on the DB thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor(), functools.partial(fn, *args, **kwargs))
+
+
+class AsyncStore:
+    """
+    Awaitable view of a store: `await store.aio.method(...)` runs
+    `store.method(...)` on the DB thread pool.
+    """
+
+    def __init__(self, store: Any) -> None:
+        self._store = store
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._store, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await run(attr, *args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+
+def health() -> Dict[str, Any]:
+    """Round-trip a trivial query on every open pool / this thread's SQLite files."""
+    out: Dict[str, Any] = {}
+    for url, pool in list(_pools.items()):
+        t0 = time.perf_counter()
+        try:
+            with pool.connection(timeout=5) as conn:
+                conn.execute("SELECT 1")
+            out["postgres"] = {"status": "ok", "latency_ms": round((time.perf_counter() - t0) * 1000, 1)}
+        except Exception as e:
+            out["postgres"] = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+    for path in list(_sqlite_stats):
+        name = os.path.basename(path)
+        try:
+            sqlite_connection(path).execute("SELECT 1")
+            out[name] = {"status": "ok"}
+        except Exception as e:
+            out[name] = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+    return out
+
+
+def stats() -> Dict[str, Any]:
+    pools = {}
+    for url, pool in list(_pools.items()):
+        s = pool.get_stats()
+        pools[pool.name] = {
+            "min_size": pool.min_size,
+            "max_size": pool.max_size,
+            "size": s.get("pool_size", 0),
+            "available": s.get("pool_available", 0),
+            "waiting": s.get("requests_waiting", 0),
+            "requests": s.get("requests_num", 0),
+            "requests_queued": s.get("requests_queued", 0),
+            "requests_errors": s.get("requests_errors", 0),
+            "wait_ms": s.get("requests_wait_ms", 0),
+            "usage_ms": s.get("usage_ms", 0),
+            "connections_opened": s.get("connections_num", 0),
+            "connections_lost": s.get("connections_lost", 0),
+        }
+    with _sqlite_lock:
+        sqlite_files = {os.path.basename(p): dict(s) for p, s in _sqlite_stats.items()}
+    return {
+        "postgres": pools,
+        "sqlite": sqlite_files,
+        "executor_workers": _executor._max_workers if _executor is not None else 0,
+    }
+
+
+def close_pools() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
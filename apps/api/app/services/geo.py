@@ -1,22 +1,327 @@
-from typing import Dict, Any
-import httpx
+# apps/api/app/services/geo.py
+"""
+US ZIP -> (lat, lon, name) resolution.
 
-# Simple ZIP -> lat/lon via Zippopotam.us (free, no key)
-# US-only for V1.
-async def resolve_zip(zip_code: str) -> Dict[str, Any]:
+Lookups (GET /geo/zip/{zip}) go, in order, to:
+1. The ZIP centroid index (ZIP_INDEX_PATH): a memory-mapped array with one
+   fixed-size record per possible 5-digit ZIP, so a lookup is a single row
+   read by index and needs no network.
+2. The persistent zip_cache table of earlier remote answers.
+3. Zippopotam.us (free, no key); the answer is written to zip_cache.
+
+The index is not checked in. At startup ensure_zip_index() builds it in the
+background from the GeoNames US postal file (ZIP_INDEX_SOURCE_URL) when it
+is missing; until then lookups use steps 2-3. build_zip_index.py builds it
+ahead of time instead (e.g. in the deploy build) from a downloaded or local
+source file. ZIP_INDEX_AUTO_BUILD=false turns the startup build off.
+"""
+from __future__ import annotations
+
+import io
+import os
+import time
+import zipfile
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from app.services.http_clients import client_for
+from app.services import db
+
+# Index needs NumPy; without it every lookup goes to the cache / remote API
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+ZIP_INDEX_PATH = os.getenv("ZIP_INDEX_PATH", "data/geo/zip_index.npy")
+ZIP_INDEX_SOURCE_URL = os.getenv("ZIP_INDEX_SOURCE_URL", "https://download.geonames.org/export/zip/US.zip")
+ZIP_SLOTS = 100_000  # one record per 00000..99999
+ZIP_NAME_BYTES = 48
+ZIP_DTYPE = [("lat", "<f4"), ("lon", "<f4"), ("name", f"S{ZIP_NAME_BYTES}")]
+
+
+def _normalize_zip(zip_code: str) -> str:
     z = zip_code.strip()
     if len(z) != 5 or not z.isdigit():
         raise ValueError("ZIP must be 5 digits")
+    return z
 
-    url = f"https://api.zippopotam.us/us/{z}"
-    async with httpx.AsyncClient(timeout=8) as client:
-        r = await client.get(url)
+
+# ----------------------------------------
+# Bundled index
+# ----------------------------------------
+
+def build_zip_index(rows, path: str = ZIP_INDEX_PATH) -> int:
+    """
+    Write the index from (zip, lat, lon, name) rows. Later rows for the same
+    ZIP are ignored. Returns the number of ZIPs written.
+    """
+    table = np.zeros(ZIP_SLOTS, dtype=ZIP_DTYPE)
+    table["lat"] = np.nan
+    count = 0
+    for zip_code, lat, lon, name in rows:
+        slot = int(_normalize_zip(zip_code))
+        if not np.isnan(table["lat"][slot]):
+            continue
+        table[slot] = (lat, lon, name.encode("utf-8")[:ZIP_NAME_BYTES])
+        count += 1
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp.npy"  # workers may build at the same time
+    np.save(tmp, table)
+    os.replace(tmp, path)
+    return count
+
+
+def geonames_rows(lines: Iterable[str]) -> Iterator[Tuple[str, float, float, str]]:
+    """(zip, lat, lon, name) from GeoNames postal code lines (tab-separated)."""
+    for line in lines:
+        # country, postal code, place name, admin name1, admin code1, ..., latitude, longitude, accuracy
+        cols = line.rstrip("\r\n").split("\t")
+        if len(cols) < 11 or cols[0] != "US":
+            continue
+        try:
+            yield cols[1], float(cols[9]), float(cols[10]), f"{cols[2]} {cols[4]}".strip()
+        except ValueError:
+            continue
+
+
+def geonames_archive_rows(data: bytes) -> Iterator[Tuple[str, float, float, str]]:
+    """Rows from the GeoNames download (a zip holding US.txt)."""
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        with archive.open("US.txt") as f:
+            yield from geonames_rows(io.TextIOWrapper(f, encoding="utf-8"))
+
+
+async def download_zip_source(url: str = ZIP_INDEX_SOURCE_URL) -> bytes:
+    async with client_for("geonames") as client:
+        r = await client.get(url, follow_redirects=True)
         r.raise_for_status()
-        data = r.json()
+        return r.content
+
+
+class ZipIndex:
+    """Memory-mapped ZIP centroid table (see build_zip_index)."""
+
+    def __init__(self, path: str = ZIP_INDEX_PATH):
+        self.path = path
+        self.table = None
+        self.zips = 0
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self) -> None:
+        if np is None or not os.path.exists(self.path):
+            return
+        try:
+            table = np.load(self.path, mmap_mode="r")
+            if table.shape != (ZIP_SLOTS,) or table.dtype != np.dtype(ZIP_DTYPE):
+                raise ValueError(f"unexpected layout {table.shape} {table.dtype}")
+            self.table = table
+            self.zips = int(np.count_nonzero(~np.isnan(table["lat"])))
+            print(f"[Geo] ZIP index loaded: {self.path} ({self.zips} ZIPs)")
+        except Exception as e:
+            print(f"[Geo] Could not load ZIP index {self.path}: {e}")
+            self.table = None
+
+    def lookup(self, zip_code: str) -> Optional[Dict[str, Any]]:
+        if self.table is None:
+            return None
+        row = self.table[int(zip_code)]
+        lat = float(row["lat"])
+        if lat != lat:  # NaN: ZIP not in the index
+            self.misses += 1
+            return None
+        self.hits += 1
+        name = bytes(row["name"]).decode("utf-8", errors="ignore")
+        return {"zip": zip_code, "lat": round(lat, 4), "lon": round(float(row["lon"]), 4), "name": name}
+
+
+# ----------------------------------------
+# Persistent cache of remote answers
+# ----------------------------------------
+
+class ZipCacheStore:
+    """
+    ZIPs resolved through the remote API.
+    Supports both SQLite (local) and Postgres (Render).
+    """
+
+    def __init__(self, path: str = "data/zip_cache.sqlite3"):
+        self._pg_url = os.getenv("DATABASE_URL")
+        self._use_pg = bool(self._pg_url and self._pg_url.startswith("postgres"))
+        self.aio = db.AsyncStore(self)  # awaitable view for async handlers
+        self.hits = 0
+
+        if self._use_pg:
+            self._init_pg()
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.path = path
+            self._init_db()
+
+    def _conn(self):
+        if self._use_pg:
+            return db.connection(pg_url=self._pg_url)
+        return db.connection(sqlite_path=self.path)
+
+    def _get_p(self) -> str:
+        return "%s" if self._use_pg else "?"
+
+    def _init_pg(self) -> None:
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS zip_cache (
+                    zip TEXT PRIMARY KEY,
+                    lat REAL NOT NULL,
+                    lon REAL NOT NULL,
+                    name TEXT NOT NULL,
+                    fetched_at INTEGER NOT NULL
+                );
+            """)
+            conn.commit()
+
+    def _init_db(self) -> None:
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS zip_cache (
+                    zip TEXT PRIMARY KEY,
+                    lat REAL NOT NULL,
+                    lon REAL NOT NULL,
+                    name TEXT NOT NULL,
+                    fetched_at INTEGER NOT NULL
+                );
+            """)
+            conn.commit()
+
+    def get(self, zip_code: str) -> Optional[Dict[str, Any]]:
+        p = self._get_p()
+        with self._conn() as conn:
+            row = conn.execute(f"SELECT zip, lat, lon, name FROM zip_cache WHERE zip={p}", (zip_code,)).fetchone()
+        if not row:
+            return None
+        self.hits += 1
+        return {"zip": row["zip"], "lat": row["lat"], "lon": row["lon"], "name": row["name"]}
+
+    def put(self, result: Dict[str, Any]) -> None:
+        p = self._get_p()
+        with self._conn() as conn:
+            conn.execute(
+                f"""INSERT INTO zip_cache (zip, lat, lon, name, fetched_at) VALUES ({p}, {p}, {p}, {p}, {p})
+                    ON CONFLICT(zip) DO UPDATE SET lat = excluded.lat, lon = excluded.lon,
+                        name = excluded.name, fetched_at = excluded.fetched_at""",
+                (result["zip"], result["lat"], result["lon"], result["name"], int(time.time())),
+            )
+            conn.commit()
+
+    def all(self):
+        """Every cached (zip, lat, lon, name), e.g. to fold into the next index build."""
+        with self._conn() as conn:
+            rows = conn.execute("SELECT zip, lat, lon, name FROM zip_cache ORDER BY zip").fetchall()
+        return [(row["zip"], row["lat"], row["lon"], row["name"]) for row in rows]
+
+
+_index: Optional[ZipIndex] = None
+_cache: Optional[ZipCacheStore] = None
+_REMOTE_STATS = {"calls": 0, "errors": 0}
+_BUILD_STATS: Dict[str, Any] = {"built": 0, "build_errors": 0, "last_build_ms": None}
+
+
+def _get_index() -> ZipIndex:
+    global _index
+    if _index is None:
+        _index = ZipIndex()
+    return _index
+
+
+def _get_cache() -> ZipCacheStore:
+    global _cache
+    if _cache is None:
+        _cache = ZipCacheStore()
+    return _cache
+
+
+async def _resolve_zip_remote(z: str) -> Dict[str, Any]:
+    url = f"https://api.zippopotam.us/us/{z}"
+    _REMOTE_STATS["calls"] += 1
+    try:
+        async with client_for("zippopotam") as client:
+            r = await client.get(url)
+            r.raise_for_status()
+            data = r.json()
+    except Exception:
+        _REMOTE_STATS["errors"] += 1
+        raise
 
     place = (data.get("places") or [None])[0] or {}
     lat = float(place["latitude"])
     lon = float(place["longitude"])
     name = f'{place.get("place name","")} {place.get("state abbreviation","")}'.strip()
 
-    return {"zip": z, "lat": lat, "lon": lon, "name": name}
\ No newline at end of file
+    return {"zip": z, "lat": lat, "lon": lon, "name": name}
+
+
+# US-only for V1.
+async def resolve_zip(zip_code: str) -> Dict[str, Any]:
+    z = _normalize_zip(zip_code)
+
+    result = _get_index().lookup(z)
+    if result is not None:
+        return result
+
+    cache = _cache if _cache is not None else await db.run(_get_cache)
+    result = await cache.aio.get(z)
+    if result is not None:
+        return result
+
+    result = await _resolve_zip_remote(z)
+    try:
+        await cache.aio.put(result)
+    except Exception as e:
+        print(f"[Geo] Could not cache ZIP {z}: {e}")
+    return result
+
+
+def _build_index_from_archive(data: bytes, path: str) -> int:
+    rows = list(geonames_archive_rows(data))
+    try:
+        rows.extend(_get_cache().all())  # source file wins for ZIPs present in both
+    except Exception as e:
+        print(f"[Geo] zip_cache not folded into the index: {e}")
+    return build_zip_index(rows, path=path)
+
+
+async def ensure_zip_index() -> None:
+    """Build the index in the background when it's missing (see module docstring)."""
+    index = _get_index()
+    if index.table is not None or np is None:
+        return
+    if os.getenv("ZIP_INDEX_AUTO_BUILD", "true").strip().lower() not in ("1", "true", "yes", "on"):
+        return
+    t0 = time.perf_counter()
+    try:
+        data = await download_zip_source()
+        count = await db.run(_build_index_from_archive, data, index.path)
+        await db.run(index._load)
+    except Exception as e:
+        _BUILD_STATS["build_errors"] += 1
+        print(f"[Geo] ZIP index build failed ({e}); lookups use zip_cache and the remote API")
+        return
+    _BUILD_STATS["built"] += 1
+    _BUILD_STATS["last_build_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    print(f"[Geo] Built ZIP index {index.path} ({count} ZIPs) in {_BUILD_STATS['last_build_ms']} ms")
+
+
+def geo_stats() -> Dict[str, Any]:
+    index = _get_index()
+    return {
+        "index_loaded": index.table is not None,
+        "index_zips": index.zips,
+        "index_hits": index.hits,
+        "index_misses": index.misses,
+        "cache_hits": _cache.hits if _cache is not None else 0,
+        "remote_calls": _REMOTE_STATS["calls"],
+        "remote_errors": _REMOTE_STATS["errors"],
+        **_BUILD_STATS,
+    }
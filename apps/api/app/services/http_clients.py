@@ -0,0 +1,225 @@
+# apps/api/app/services/http_clients.py
+"""
+Application-scoped outbound HTTP clients.
+
+One pooled httpx.AsyncClient per upstream host (OpenWeather, OpenAI, Clerk,
+Zippopotam), created in the FastAPI lifespan and closed on shutdown, so
+requests reuse warm TCP/TLS connections instead of paying setup every call.
+
+Usage:
+    async with client_for("openai") as client:
+        r = await client.post(...)
+
+Outside the app lifespan (scripts, one-off jobs) client_for() falls back to a
+short-lived client with the same limits/timeouts.
+"""
+from __future__ import annotations
+
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+@dataclass(frozen=True)
+class ClientConfig:
+    timeout: float
+    connect_timeout: float = 3.0
+    pool_timeout: float = 5.0
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 60.0
+    http2: bool = True
+
+
+# Per-host defaults. Override with HTTP_<NAME>_MAX_CONNECTIONS / HTTP_<NAME>_TIMEOUT.
+CLIENT_CONFIGS: Dict[str, ClientConfig] = {
+    "openweather": ClientConfig(timeout=10.0, max_connections=20, max_keepalive_connections=10),
+    "openai": ClientConfig(timeout=70.0, connect_timeout=5.0, max_connections=32, max_keepalive_connections=16),
+    "clerk": ClientConfig(timeout=10.0, max_connections=10, max_keepalive_connections=5),
+    "zippopotam": ClientConfig(timeout=8.0, max_connections=5, max_keepalive_connections=2),
+    # One-off ZIP index source download (geo.ensure_zip_index)
+    "geonames": ClientConfig(timeout=60.0, max_connections=1, max_keepalive_connections=0, http2=False),
+}
+
+
+def _env_override(name: str, key: str, default: Any) -> Any:
+    raw = os.getenv(f"HTTP_{name.upper()}_{key}", "").strip()
+    if not raw:
+        return default
+    try:
+        return type(default)(raw)
+    except ValueError:
+        return default
+
+
+class _PoolStats:
+    """Counters fed by httpcore trace events for one client."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.total_connect_ms = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        served = self.new_connections + self.reused_connections
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "reuse_ratio": round(self.reused_connections / served, 4) if served else 0.0,
+            "avg_pool_wait_ms": round(self.total_wait_ms / served, 2) if served else 0.0,
+            "max_pool_wait_ms": round(self.max_wait_ms, 2),
+            "avg_connect_ms": round(self.total_connect_ms / self.new_connections, 2) if self.new_connections else 0.0,
+        }
+
+
+class _InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps AsyncHTTPTransport and uses httpcore's trace extension to tell
+    new connections from reused ones and to time the wait for a connection.
+    """
+
+    def __init__(self, inner: httpx.AsyncHTTPTransport, stats: _PoolStats):
+        self._inner = inner
+        self._stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self._stats
+        t0 = time.perf_counter()
+        state: Dict[str, Any] = {"connect_start": None, "connect_ms": 0.0, "counted": False}
+        upstream_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            now = time.perf_counter()
+            if event_name == "connection.connect_tcp.started":
+                state["connect_start"] = now
+            elif event_name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+                if state["connect_start"] is not None:
+                    state["connect_ms"] = (now - state["connect_start"]) * 1000
+            elif event_name.endswith("send_request_headers.started") and not state["counted"]:
+                state["counted"] = True
+                wait_ms = max((now - t0) * 1000 - state["connect_ms"], 0.0)
+                if state["connect_start"] is not None:
+                    stats.new_connections += 1
+                    stats.total_connect_ms += state["connect_ms"]
+                else:
+                    stats.reused_connections += 1
+                stats.total_wait_ms += wait_ms
+                stats.max_wait_ms = max(stats.max_wait_ms, wait_ms)
+
+            if upstream_trace is not None:
+                result = upstream_trace(event_name, info)
+                if hasattr(result, "__await__"):
+                    await result
+
+        request.extensions["trace"] = trace
+        stats.requests += 1
+        try:
+            return await self._inner.handle_async_request(request)
+        except Exception:
+            stats.errors += 1
+            raise
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+    def pool_state(self) -> Dict[str, int]:
+        pool = getattr(self._inner, "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        return {
+            "open_connections": len(connections),
+            "idle_connections": sum(1 for c in connections if c.is_idle()),
+        }
+
+
+class HttpClientRegistry:
+    def __init__(self, configs: Optional[Dict[str, ClientConfig]] = None):
+        self._configs = dict(configs or CLIENT_CONFIGS)
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transports: Dict[str, _InstrumentedTransport] = {}
+        self._stats: Dict[str, _PoolStats] = {name: _PoolStats() for name in self._configs}
+
+    def _config(self, name: str) -> ClientConfig:
+        if name not in self._configs:
+            raise KeyError(f"Unknown HTTP client: {name}")
+        base = self._configs[name]
+        return ClientConfig(
+            timeout=_env_override(name, "TIMEOUT", base.timeout),
+            connect_timeout=base.connect_timeout,
+            pool_timeout=base.pool_timeout,
+            max_connections=_env_override(name, "MAX_CONNECTIONS", base.max_connections),
+            max_keepalive_connections=_env_override(name, "MAX_KEEPALIVE", base.max_keepalive_connections),
+            keepalive_expiry=base.keepalive_expiry,
+            http2=base.http2,
+        )
+
+    def build_client(self, name: str) -> httpx.AsyncClient:
+        cfg = self._config(name)
+        limits = httpx.Limits(
+            max_connections=cfg.max_connections,
+            max_keepalive_connections=cfg.max_keepalive_connections,
+            keepalive_expiry=cfg.keepalive_expiry,
+        )
+        timeout = httpx.Timeout(cfg.timeout, connect=cfg.connect_timeout, pool=cfg.pool_timeout)
+        inner = httpx.AsyncHTTPTransport(limits=limits, http2=cfg.http2 and HTTP2_AVAILABLE, retries=1)
+        transport = _InstrumentedTransport(inner, self._stats.setdefault(name, _PoolStats()))
+        self._transports[name] = transport
+        return httpx.AsyncClient(transport=transport, timeout=timeout)
+
+    async def start(self) -> None:
+        for name in self._configs:
+            if name not in self._clients:
+                self._clients[name] = self.build_client(name)
+        print(f"[HTTP] Pooled clients ready: {sorted(self._clients)} http2={HTTP2_AVAILABLE}")
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for name, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                print(f"[HTTP] Failed to close {name} client: {e}")
+
+    def get(self, name: str) -> Optional[httpx.AsyncClient]:
+        return self._clients.get(name)
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"http2_available": HTTP2_AVAILABLE, "clients": {}}
+        for name, stats in self._stats.items():
+            entry = stats.snapshot()
+            entry["pooled"] = name in self._clients
+            transport = self._transports.get(name)
+            if transport is not None and name in self._clients:
+                entry.update(transport.pool_state())
+            out["clients"][name] = entry
+        return out
+
+
+# Global instance
+http_clients = HttpClientRegistry()
+
+
+@asynccontextmanager
+async def client_for(name: str) -> AsyncIterator[httpx.AsyncClient]:
+    client = http_clients.get(name)
+    if client is not None:
+        yield client
+        return
+    async with http_clients.build_client(name) as temp_client:
+        yield temp_client
@@ -0,0 +1,227 @@
+# apps/api/app/services/lake_catalog.py
+"""
+Spatial lake catalog.
+
+location_name is free text from the client, so the same lake shows up under
+many spellings. The catalog maps coordinates to a canonical lake id instead,
+which plan cache keys use as water_view_id.
+
+Lakes are loaded from a CSV (LAKE_CATALOG_PATH, default data/lakes/lakes.csv)
+with columns:
+    id,name,state,lat,lon[,radius_km]
+
+radius_km is how far from the lake's point coordinates still count as on
+that lake; build_lake_catalog.py derives it from surface area, since one
+point can't describe a 30 km reservoir and a 50-acre pond alike. Rows
+without it use LAKE_MATCH_RADIUS_KM. The shipped lakes.csv is generated
+from the frontend lake list (bfp-frontend/src/data/lakes.json) by that script.
+
+Lakes are bucketed into a fixed lat/lon grid (LAKE_INDEX_CELL_DEG, default
+0.25°). A query only reads the cells covering its search radius and ranks
+those candidates by great-circle distance, which keeps lookups well under a
+millisecond with tens of thousands of water bodies. NumPy vectorizes the
+distance pass when installed; without it the same query runs in pure Python.
+
+Without a catalog file every lookup returns nothing and callers fall back to
+free-text names and rounded coordinates.
+"""
+from __future__ import annotations
+
+import csv
+import heapq
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+# Optional, as for the solunar engine: faster distance pass for large candidate sets
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CATALOG_PATH = os.getenv("LAKE_CATALOG_PATH", "data/lakes/lakes.csv")
+EARTH_RADIUS_KM = 6371.0
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+class LakeCatalog:
+    """
+    Grid-bucketed lake index.
+    Configured from env:
+      LAKE_CATALOG_PATH        CSV of id,name,state,lat,lon[,radius_km]
+      LAKE_INDEX_CELL_DEG      bucket size in degrees (default: 0.25)
+      LAKE_NEAREST_MAX_KM      search radius for /lakes/nearest without radius_km (default: 50)
+      LAKE_MATCH_RADIUS_KM     match radius for lakes without their own radius_km (default: 5)
+    """
+
+    def __init__(self, path: str = CATALOG_PATH):
+        self.path = path
+        self.cell_deg = _env_float("LAKE_INDEX_CELL_DEG", 0.25)
+        self.nearest_max_km = _env_float("LAKE_NEAREST_MAX_KM", 50)
+        self.match_radius_km = _env_float("LAKE_MATCH_RADIUS_KM", 5)
+
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self.states: List[str] = []
+        self.lats: List[float] = []
+        self.lons: List[float] = []
+        self.radii: List[float] = []  # per-lake match radius (km)
+        self.max_radius_km = 0.0
+        self._lats_np = None  # NumPy copies of lats / lons when available
+        self._lons_np = None
+        # (i, j) cell -> (start, end) slice into the cell-sorted arrays
+        self._cells: Dict[tuple, tuple] = {}
+        self.queries = 0
+        self.resolved = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, newline="", encoding="utf-8") as f:
+                rows = [
+                    (
+                        r["id"].strip(),
+                        r["name"].strip(),
+                        (r.get("state") or "").strip(),
+                        float(r["lat"]),
+                        float(r["lon"]),
+                        float(r.get("radius_km") or 0) or self.match_radius_km,
+                    )
+                    for r in csv.DictReader(f)
+                    if r.get("id") and r.get("lat") and r.get("lon")
+                ]
+        except Exception as e:
+            print(f"[LakeCatalog] Could not load {self.path}: {e}")
+            return
+        self._build(rows)
+        print(f"[LakeCatalog] Loaded {len(self.ids)} lakes from {self.path}")
+
+    def _build(self, rows) -> None:
+        cells = [(math.floor(row[3] / self.cell_deg), math.floor(row[4] / self.cell_deg)) for row in rows]
+        order = sorted(range(len(rows)), key=lambda k: cells[k])
+
+        self.ids = [rows[k][0] for k in order]
+        self.names = [rows[k][1] for k in order]
+        self.states = [rows[k][2] for k in order]
+        self.lats = [rows[k][3] for k in order]
+        self.lons = [rows[k][4] for k in order]
+        self.radii = [rows[k][5] for k in order]
+        self.max_radius_km = max(self.radii, default=0.0)
+        if np is not None:
+            self._lats_np = np.array(self.lats, dtype=np.float64)
+            self._lons_np = np.array(self.lons, dtype=np.float64)
+
+        self._cells = {}
+        for pos, k in enumerate(order):
+            cell = cells[k]
+            start, _ = self._cells.get(cell, (pos, pos))
+            self._cells[cell] = (start, pos + 1)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> List[Tuple[int, int]]:
+        """(start, end) slices of the grid cells covering the search radius."""
+        dlat = radius_km / 111.32
+        dlon = radius_km / (111.32 * max(math.cos(math.radians(lat)), 0.01))
+        i0, i1 = math.floor((lat - dlat) / self.cell_deg), math.floor((lat + dlat) / self.cell_deg)
+        j0, j1 = math.floor((lon - dlon) / self.cell_deg), math.floor((lon + dlon) / self.cell_deg)
+
+        spans = []
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                span = self._cells.get((i, j))
+                if span is not None:
+                    spans.append(span)
+        return spans
+
+    def _hits(self, lat: float, lon: float, radius_km: float) -> List[Tuple[int, float]]:
+        """(lake index, distance_km) for every lake within radius_km, unordered."""
+        spans = self._candidates(lat, lon, radius_km)
+        if not spans:
+            return []
+        phi1 = math.radians(lat)
+
+        if np is not None:
+            idx = np.concatenate([np.arange(start, end) for start, end in spans])
+            phi2 = np.radians(self._lats_np[idx])
+            dlmb = np.radians(self._lons_np[idx] - lon)
+            a = np.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+            dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+            keep = dist <= radius_km
+            return list(zip(idx[keep].tolist(), dist[keep].tolist()))
+
+        hits = []
+        cos_phi1 = math.cos(phi1)
+        for start, end in spans:
+            for k in range(start, end):
+                phi2 = math.radians(self.lats[k])
+                a = (math.sin((phi2 - phi1) / 2) ** 2
+                     + cos_phi1 * math.cos(phi2) * math.sin(math.radians(self.lons[k] - lon) / 2) ** 2)
+                d = 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+                if d <= radius_km:
+                    hits.append((k, d))
+        return hits
+
+    def _lake(self, k: int, distance_km: float) -> Dict[str, Any]:
+        return {
+            "id": self.ids[k],
+            "name": self.names[k],
+            "state": self.states[k],
+            "lat": self.lats[k],
+            "lon": self.lons[k],
+            "radius_km": self.radii[k],
+            "distance_km": round(distance_km, 3),
+        }
+
+    def within(self, lat: float, lon: float, radius_km: float, limit: int = 50) -> List[Dict[str, Any]]:
+        """Lakes within radius_km of the point, nearest first."""
+        self.queries += 1
+        hits = heapq.nsmallest(limit, self._hits(lat, lon, radius_km), key=lambda hit: hit[1])
+        return [self._lake(k, d) for k, d in hits]
+
+    def nearest(self, lat: float, lon: float, limit: int = 5, max_km: Optional[float] = None) -> List[Dict[str, Any]]:
+        return self.within(lat, lon, max_km or self.nearest_max_km, limit=limit)
+
+    def resolve(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        """
+        The catalog lake these coordinates are on, or None: the nearest lake
+        whose own radius_km covers the point.
+        """
+        if not self.ids:
+            return None
+        self.queries += 1
+        hits = [(k, d) for k, d in self._hits(lat, lon, self.max_radius_km) if d <= self.radii[k]]
+        if not hits:
+            return None
+        self.resolved += 1
+        return self._lake(*min(hits, key=lambda hit: hit[1]))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lakes": len(self.ids),
+            "cells": len(self._cells),
+            "cell_deg": self.cell_deg,
+            "max_radius_km": self.max_radius_km,
+            "vectorized": np is not None,
+            "queries": self.queries,
+            "resolved": self.resolved,
+        }
+
+
+_catalog: Optional[LakeCatalog] = None
+
+
+def get_catalog() -> LakeCatalog:
+    global _catalog
+    if _catalog is None:
+        _catalog = LakeCatalog()
+    return _catalog
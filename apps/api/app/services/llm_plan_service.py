@@ -18,9 +18,12 @@ import json
 import time
 import random
 import asyncio
-from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-import httpx
+from app.services.http_clients import client_for
 
 from app.canon.pools import (
     # core pools
@@ -57,6 +60,7 @@ from app.canon.validate import (
 from app.canon.retrieve_rules import LURE_TIP_BANK
 
 from app.canon.lure_selection_policy import LURE_SELECTION_POLICY_PROMPT
+from app.services.llm_validate import build_section_repair_prompt
 
 # ----------------------------------------
 # Debug + deterministic color coercion (shape-safe)
@@ -229,7 +233,7 @@ def _coerce_two_colors_to_pool(
 # ----------------------------------------
 # System Prompt (LOCKED RULES) — Bass Clarity
 # ----------------------------------------
-def build_system_prompt(include_pattern_2: bool = False) -> str:
+def _render_system_prompt(include_pattern_2: bool = False) -> str:
     """
     Bass Clarity system prompt:
     - strict JSON
@@ -513,7 +517,6 @@ NO RANKINGS (LOCKED):
 - Variety is intentional (freedom within structure), never random.
 
 ANALYSIS ORDER (NON-NEGOTIABLE):
-{LURE_SELECTION_POLICY_PROMPT}
 Season/Phase → Current Conditions → Targets → Presentation Family → Lure → Retrieves
 
 {LURE_SELECTION_POLICY_PROMPT}
@@ -774,6 +777,95 @@ You MUST choose targets ONLY from the accessible_targets list provided.
 """
 
 
+# Bump when the prompt rules change so logs/artifacts can be told apart
+SYSTEM_PROMPT_VERSION = "2026.10.1"
+
+
+@dataclass(frozen=True)
+class SystemPromptArtifact:
+    text: str
+    sha256: str
+    version: str
+    chars: int
+
+
+@lru_cache(maxsize=None)
+def get_system_prompt_artifact(include_pattern_2: bool = False) -> SystemPromptArtifact:
+    """
+    Compile the system prompt once per process.
+    The prompt is fully static (canon pools + rules + output format), so every
+    call sends a byte-identical system message first; that keeps the provider's
+    prompt-prefix cache warm. Per-request data only ever goes in the user message.
+    """
+    text = _render_system_prompt(include_pattern_2=include_pattern_2)
+    return SystemPromptArtifact(
+        text=text,
+        sha256=hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        version=SYSTEM_PROMPT_VERSION,
+        chars=len(text),
+    )
+
+
+def build_system_prompt(include_pattern_2: bool = False) -> str:
+    return get_system_prompt_artifact(include_pattern_2=include_pattern_2).text
+
+
+# Compile at import so the first request doesn't pay for it
+MEMBER_SYSTEM_PROMPT = get_system_prompt_artifact(include_pattern_2=True)
+print(
+    f"LLM_PLAN: System prompt v{MEMBER_SYSTEM_PROMPT.version} "
+    f"sha256={MEMBER_SYSTEM_PROMPT.sha256[:12]} chars={MEMBER_SYSTEM_PROMPT.chars}"
+)
+
+
+# ----------------------------------------
+# Token usage (per call + running totals)
+# ----------------------------------------
+_LLM_USAGE: Dict[str, int] = {
+    "calls": 0,
+    "prompt_tokens": 0,
+    "cached_prompt_tokens": 0,
+    "completion_tokens": 0,
+    # Full plan generations only (not section repairs); what a hedge costs
+    "attempt_calls": 0,
+    "attempt_tokens": 0,
+}
+
+
+def _record_usage(usage: Optional[Dict[str, Any]], attempt: bool = True) -> Dict[str, int]:
+    """
+    Pull token counts out of an OpenAI usage block and add them to the totals.
+    attempt=False for calls that aren't a full plan generation (section repairs).
+    """
+    usage = usage or {}
+    details = usage.get("prompt_tokens_details") or {}
+    call = {
+        "prompt_tokens": int(usage.get("prompt_tokens") or 0),
+        "cached_prompt_tokens": int(details.get("cached_tokens") or 0),
+        "completion_tokens": int(usage.get("completion_tokens") or 0),
+    }
+    _LLM_USAGE["calls"] += 1
+    for k, v in call.items():
+        _LLM_USAGE[k] += v
+    if attempt:
+        _LLM_USAGE["attempt_calls"] += 1
+        _LLM_USAGE["attempt_tokens"] += call["prompt_tokens"] + call["completion_tokens"]
+    return call
+
+
+def llm_usage_stats() -> Dict[str, Any]:
+    calls = _LLM_USAGE["calls"]
+    prompt = _LLM_USAGE["prompt_tokens"]
+    return {
+        **_LLM_USAGE,
+        "avg_prompt_tokens": round(prompt / calls, 1) if calls else 0.0,
+        "cached_prompt_ratio": round(_LLM_USAGE["cached_prompt_tokens"] / prompt, 4) if prompt else 0.0,
+        "system_prompt_sha256": MEMBER_SYSTEM_PROMPT.sha256,
+        "system_prompt_version": MEMBER_SYSTEM_PROMPT.version,
+        "system_prompt_chars": MEMBER_SYSTEM_PROMPT.chars,
+    }
+
+
 # ----------------------------------------
 # LLM Caller
 # ----------------------------------------
@@ -822,6 +914,71 @@ def _extract_first_json_object(text: str) -> Optional[str]:
                     return s[start : i + 1]
     return None
 
+class _StreamingJsonObject:
+    """
+    Incremental parser for a single streamed JSON object.
+    feed() returns the (key, value) pairs of top-level members completed by the
+    new text, so sections can be used as soon as their closing brace arrives.
+    """
+
+    def __init__(self) -> None:
+        self.buf = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_str = False
+        self.esc = False
+        self.member_start: Optional[int] = None
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        completed: List[Tuple[str, Any]] = []
+        self.buf += chunk
+        s = self.buf
+        for i in range(self.pos, len(s)):
+            if self.done:
+                break
+            ch = s[i]
+            if self.in_str:
+                if self.esc:
+                    self.esc = False
+                elif ch == "\\":
+                    self.esc = True
+                elif ch == '"':
+                    self.in_str = False
+                continue
+
+            if ch == '"':
+                self.in_str = True
+            elif ch in "{[":
+                self.depth += 1
+                if self.depth == 1:
+                    if ch != "{":
+                        self.done = True
+                    self.member_start = i + 1
+            elif ch in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    self._close_member(s, i, completed)
+                    self.done = True
+            elif ch == "," and self.depth == 1:
+                self._close_member(s, i, completed)
+                self.member_start = i + 1
+        self.pos = len(s)
+        return completed
+
+    def _close_member(self, s: str, end: int, completed: List[Tuple[str, Any]]) -> None:
+        if self.member_start is None:
+            return
+        member = s[self.member_start:end].strip()
+        if not member:
+            return
+        try:
+            obj = json.loads("{" + member + "}")
+        except json.JSONDecodeError:
+            return
+        completed.extend(obj.items())
+
+
 def expand_plan_color_zones(plan: Dict[str, Any], is_member: bool) -> Dict[str, Any]:
     """
     V1 SAFETY VERSION:
@@ -856,48 +1013,45 @@ def expand_plan_color_zones(plan: Dict[str, Any], is_member: bool) -> Dict[str,
 
     return plan
 
-async def call_openai_plan(
+def is_user_regenerating(current_lake_name: str, regen_context: Optional[dict]) -> bool:
+    """
+    True only when the regeneration rules in call_openai_plan ask for variety:
+    - same lake within the hour (FORCE VARIETY)
+    - any lake 1-3 hours later (WANTS TO TRY SOMETHING DIFFERENT)
+    Later requests, new locations and missing timing info are a fresh read of
+    conditions, so a cached plan for those conditions is still the right answer.
+    """
+    if not regen_context:
+        return False
+
+    minutes_ago = regen_context.get("minutes_since_last_gen")
+    if minutes_ago is None:
+        return False
+
+    last_lake = regen_context.get("last_lake_name")
+    same_location = (last_lake == current_lake_name) if last_lake and current_lake_name else False
+
+    if minutes_ago < 60:
+        return same_location
+    return minutes_ago < 180
+
+def _build_plan_user_input(
     weather: dict,
     phase: str,
     location: str,
-    latitude: float,
-    longitude: float,
     access_type: str = "boat",
-    is_member: bool = False,
     current_lake_name: str = "",
     recent_primary_lures: list[str] = None,
     recent_secondary_lures: list[str] = None,
     regen_context: dict = None,
-) -> dict:
+) -> Tuple[Dict[str, Any], float]:
     """
-    Generate LLM plan with access filtering and variety system.
-    
-    Flow:
-    1. Filter targets by access type (boat vs bank)
-    2. Get variety mode
-    3. LLM analyzes conditions → picks from accessible targets → presentation → lure
-    4. Return plan (variety swaps happen in generate_llm_plan_with_retries)
-    
-    Args:
-        weather: Weather data (enhanced with pressure, moon, precipitation, UV, humidity)
-        location: Location name
-        latitude: Latitude
-        longitude: Longitude
-        access_type: "boat" or "bank" - determines which targets are accessible
-        is_member: All users are members now (kept for compatibility)
-        recent_primary_lures: List of recently used primary lures
-        recent_secondary_lures: List of recently used secondary lures
-    
+    Build the per-request user message and sampling temperature.
+    Everything request-specific lives here; the system prompt stays static.
+
     Returns:
-        LLM-generated plan or None
+        (user_input, temperature)
     """
-    api_key = os.getenv("OPENAI_API_KEY", "").strip()
-    if not api_key:
-        print("LLM_PLAN: No API key")
-        return None
-
-    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini").strip()
-
     # ✅ STEP 1: Filter targets by access type
     accessible_targets = filter_targets_by_access(access_type)
     print("LLM_PLAN: Access=" + access_type + ", " + str(len(accessible_targets)) + " accessible targets")
@@ -1063,12 +1217,32 @@ Avoid: Selecting only shoreline cover (banks, docks, laydowns) when boat access
 """
         user_input["instructions"] += boat_instructions
 
-    system_prompt = build_system_prompt(include_pattern_2=True)
-    max_tokens = 1700
+    return user_input, current_temperature
+
+
+async def _openai_chat_json(
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    label: str = "LLM_PLAN",
+    attempt: bool = True,
+) -> Optional[Dict[str, Any]]:
+    """
+    POST a chat completion in JSON mode over the pooled OpenAI client.
+    Returns the parsed JSON object, or None on any transport/format failure.
+    attempt=False keeps a repair call out of the per-attempt token average.
+    """
+    api_key = os.getenv("OPENAI_API_KEY", "").strip()
+    if not api_key:
+        print(f"{label}: No API key")
+        return None
+
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini").strip()
+    system_prompt = MEMBER_SYSTEM_PROMPT
 
     try:
         t0 = time.time()
-        async with httpx.AsyncClient(timeout=70.0) as client:
+        async with client_for("openai") as client:
             response = await client.post(
                 "https://api.openai.com/v1/chat/completions",
                 headers={
@@ -1077,90 +1251,230 @@ Avoid: Selecting only shoreline cover (banks, docks, laydowns) when boat access
                 },
                 json={
                     "model": model,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": json.dumps(user_input, ensure_ascii=False)},
-                    ],
+                    "messages": messages,
                     "response_format": {"type": "json_object"},
-                    "temperature": current_temperature,
+                    "temperature": temperature,
                     "max_completion_tokens": max_tokens,
+                    # Route identical system prefixes to the same cache shard
+                    "prompt_cache_key": "bfp-system-" + system_prompt.sha256[:16],
                 },
             )
 
         dt = time.time() - t0
-        print(f"LLM_PLAN: OpenAI call took {round(dt, 2)}s | Temp: {current_temperature}")
+        print(f"{label}: OpenAI call took {round(dt, 2)}s | Temp: {temperature}")
 
         if response.status_code != 200:
-            print("LLM_PLAN: HTTP " + str(response.status_code))
-            print("LLM_PLAN BODY: " + response.text[:800])
+            print(f"{label}: HTTP " + str(response.status_code))
+            print(f"{label} BODY: " + response.text[:800])
             return None
 
         data = response.json()
+        usage = _record_usage(data.get("usage"), attempt=attempt)
+        print(
+            f"{label}: Tokens prompt={usage['prompt_tokens']} "
+            f"(cached={usage['cached_prompt_tokens']}) completion={usage['completion_tokens']} "
+            f"| prompt_sha={system_prompt.sha256[:12]}"
+        )
         if "choices" not in data or not data["choices"]:
-            print("LLM_PLAN ERROR: No choices in response")
+            print(f"{label} ERROR: No choices in response")
             return None
 
         content = data["choices"][0]["message"].get("content", "")
         if not content or not content.strip():
-            print("LLM_PLAN ERROR: Empty content from OpenAI")
+            print(f"{label} ERROR: Empty content from OpenAI")
             return None
 
         extracted = _extract_first_json_object(content)
         if not extracted:
-            print("LLM_PLAN ERROR: Could not extract JSON object")
-            print("LLM_PLAN: Content preview: " + content[:400])
+            print(f"{label} ERROR: Could not extract JSON object")
+            print(f"{label}: Content preview: " + content[:400])
             return None
 
         try:
-            plan = json.loads(extracted)
+            return json.loads(extracted)
         except json.JSONDecodeError as e:
-            print("LLM_PLAN ERROR: JSONDecodeError after extraction")
-            print("LLM_PLAN JSON ERROR: " + repr(e))
-            print("LLM_PLAN: Extracted preview: " + extracted[:500])
+            print(f"{label} ERROR: JSONDecodeError after extraction")
+            print(f"{label} JSON ERROR: " + repr(e))
+            print(f"{label}: Extracted preview: " + extracted[:500])
             return None
-      
-
 
-        def _dbg_pattern(label: str, p: dict) -> None:
-            if not isinstance(p, dict):
-                print(f"LLM_PLAN DBG {label}: <not dict> {type(p)}")
-                return
+    except Exception as e:
+        print(f"{label} ERROR: {type(e).__name__} {repr(e)}")
+        return None
 
-            lure = p.get("base_lure")
-            pres = p.get("presentation")
 
-            # key presence matters for your validator
-            has_soft = "soft_plastic" in p
-            has_trailer = "trailer" in p
+async def _openai_chat_json_stream(
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    label: str = "LLM_STREAM",
+) -> AsyncIterator[str]:
+    """
+    Streaming counterpart of _openai_chat_json: yields content deltas as they
+    arrive over SSE. Yields nothing on transport/HTTP failure.
+    """
+    api_key = os.getenv("OPENAI_API_KEY", "").strip()
+    if not api_key:
+        print(f"{label}: No API key")
+        return
 
-            soft_val = p.get("soft_plastic")
-            trailer_val = p.get("trailer")
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini").strip()
+    system_prompt = MEMBER_SYSTEM_PROMPT
 
-            # canon expectations (if these maps are imported in this file)
-            expected_pres = LURE_TO_PRESENTATION.get(lure) if lure else None
-            trailer_req = TRAILER_REQUIREMENT.get(lure) if lure else None
-            trailer_bucket = TRAILER_BUCKET_BY_LURE.get(lure) if lure else None
+    t0 = time.time()
+    first_token_at: Optional[float] = None
+    try:
+        async with client_for("openai") as client:
+            async with client.stream(
+                "POST",
+                "https://api.openai.com/v1/chat/completions",
+                headers={
+                    "Authorization": "Bearer " + api_key,
+                    "Content-Type": "application/json",
+                },
+                json={
+                    "model": model,
+                    "messages": messages,
+                    "response_format": {"type": "json_object"},
+                    "temperature": temperature,
+                    "max_completion_tokens": max_tokens,
+                    "prompt_cache_key": "bfp-system-" + system_prompt.sha256[:16],
+                    "stream": True,
+                    "stream_options": {"include_usage": True},
+                },
+            ) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    print(f"{label}: HTTP " + str(response.status_code))
+                    print(f"{label} BODY: " + body.decode("utf-8", "replace")[:800])
+                    return
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(data)
+                    except json.JSONDecodeError:
+                        continue
+
+                    if chunk.get("usage"):
+                        usage = _record_usage(chunk["usage"])
+                        print(
+                            f"{label}: Tokens prompt={usage['prompt_tokens']} "
+                            f"(cached={usage['cached_prompt_tokens']}) completion={usage['completion_tokens']}"
+                        )
+                    for choice in chunk.get("choices") or []:
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            if first_token_at is None:
+                                first_token_at = time.time()
+                                print(f"{label}: First token after {round(first_token_at - t0, 2)}s")
+                            yield delta
+    except Exception as e:
+        print(f"{label} ERROR: {type(e).__name__} {repr(e)}")
+        return
 
-            print(
-                "LLM_PLAN DBG "
-                f"{label} lure={lure!r} "
-                f"presentation={pres!r} expected_presentation={expected_pres!r} "
-                f"soft_key={has_soft} soft_val={soft_val!r} "
-                f"trailer_key={has_trailer} trailer_val={trailer_val!r} "
-                f"trailer_req={trailer_req!r} trailer_bucket={trailer_bucket!r}"
-            )
+    print(f"{label}: Stream finished in {round(time.time() - t0, 2)}s | Temp: {temperature}")
 
-        # ---- call this once per request, right after JSON parse ----
-        _dbg_pattern("primary", plan.get("primary", {}))
-        _dbg_pattern("secondary", plan.get("secondary", {}))
 
-        # Return plan
-        return plan
+async def call_openai_plan(
+    weather: dict,
+    phase: str,
+    location: str,
+    latitude: float,
+    longitude: float,
+    access_type: str = "boat",
+    is_member: bool = False,
+    current_lake_name: str = "",
+    recent_primary_lures: list[str] = None,
+    recent_secondary_lures: list[str] = None,
+    regen_context: dict = None,
+    temperature_offset: float = 0.0,
+) -> dict:
+    """
+    Generate LLM plan with access filtering and variety system.
+    
+    Flow:
+    1. Filter targets by access type (boat vs bank)
+    2. Get variety mode
+    3. LLM analyzes conditions → picks from accessible targets → presentation → lure
+    4. Return plan (variety swaps happen in generate_llm_plan_with_retries)
+    
+    Args:
+        weather: Weather data (enhanced with pressure, moon, precipitation, UV, humidity)
+        location: Location name
+        latitude: Latitude
+        longitude: Longitude
+        access_type: "boat" or "bank" - determines which targets are accessible
+        is_member: All users are members now (kept for compatibility)
+        recent_primary_lures: List of recently used primary lures
+        recent_secondary_lures: List of recently used secondary lures
+        temperature_offset: Added to the sampling temperature (hedged attempts)
+    
+    Returns:
+        LLM-generated plan or None
+    """
+    user_input, current_temperature = _build_plan_user_input(
+        weather=weather,
+        phase=phase,
+        location=location,
+        access_type=access_type,
+        current_lake_name=current_lake_name,
+        recent_primary_lures=recent_primary_lures,
+        recent_secondary_lures=recent_secondary_lures,
+        regen_context=regen_context,
+    )
 
-    except Exception as e:
-        print(f"LLM_PLAN ERROR: {type(e).__name__} {repr(e)}")
+    plan = await _openai_chat_json(
+        [
+            {"role": "system", "content": MEMBER_SYSTEM_PROMPT.text},
+            {"role": "user", "content": json.dumps(user_input, ensure_ascii=False)},
+        ],
+        temperature=round(min(current_temperature + temperature_offset, 1.2), 2),
+        max_tokens=1700,
+    )
+    if plan is None:
         return None
 
+    def _dbg_pattern(label: str, p: dict) -> None:
+        if not isinstance(p, dict):
+            print(f"LLM_PLAN DBG {label}: <not dict> {type(p)}")
+            return
+
+        lure = p.get("base_lure")
+        pres = p.get("presentation")
+
+        # key presence matters for your validator
+        has_soft = "soft_plastic" in p
+        has_trailer = "trailer" in p
+
+        soft_val = p.get("soft_plastic")
+        trailer_val = p.get("trailer")
+
+        # canon expectations (if these maps are imported in this file)
+        expected_pres = LURE_TO_PRESENTATION.get(lure) if lure else None
+        trailer_req = TRAILER_REQUIREMENT.get(lure) if lure else None
+        trailer_bucket = TRAILER_BUCKET_BY_LURE.get(lure) if lure else None
+
+        print(
+            "LLM_PLAN DBG "
+            f"{label} lure={lure!r} "
+            f"presentation={pres!r} expected_presentation={expected_pres!r} "
+            f"soft_key={has_soft} soft_val={soft_val!r} "
+            f"trailer_key={has_trailer} trailer_val={trailer_val!r} "
+            f"trailer_req={trailer_req!r} trailer_bucket={trailer_bucket!r}"
+        )
+
+    # ---- call this once per request, right after JSON parse ----
+    _dbg_pattern("primary", plan.get("primary", {}))
+    _dbg_pattern("secondary", plan.get("secondary", {}))
+
+    # Return plan
+    return plan
+
 
 # ============================================================================
 # PART 3: Post-processing and Validation functions
@@ -1390,10 +1704,495 @@ def _validate_pattern(pattern: Dict[str, Any], pattern_name: str) -> List[str]:
 
     return errors
 
+# ============================================================================
+# PART 3b: Deterministic repair (runs before any LLM retry)
+# ============================================================================
+# Most validation failures are mechanical (presentation copied wrong, plastic in
+# the trailer field, color spelled slightly off). Fix those locally, re-validate,
+# and only send the still-failing sections back to the LLM.
+
+_TRAILER_POOLS = {
+    "JIG_TRAILERS": JIG_TRAILERS,
+    "CHATTER_SWIMJIG_TRAILERS": CHATTER_SWIMJIG_TRAILERS,
+    "SPINNER_BUZZ_TRAILERS": SPINNER_BUZZ_TRAILERS,
+}
+
+_DAY_PREFIXES = {
+    "morning": "Morning:",
+    "midday": "Midday:",
+    "mid-day": "Midday:",
+    "evening": "Evening:",
+    "late": "Late:",
+}
+
+_REPAIR_STATS: Dict[str, int] = {
+    "plans_checked": 0,
+    "invalid_plans": 0,
+    "local_fixes": 0,
+    "local_repaired": 0,
+    "section_repairs": 0,
+    "section_repaired": 0,
+    "full_retries": 0,
+    "stream_resets": 0,
+}
+
+
+def plan_repair_stats() -> Dict[str, Any]:
+    invalid = _REPAIR_STATS["invalid_plans"]
+    saved = _REPAIR_STATS["local_repaired"] + _REPAIR_STATS["section_repaired"]
+    return {
+        **_REPAIR_STATS,
+        "repair_rate": round(saved / invalid, 4) if invalid else 0.0,
+    }
+
+
+def _norm_token(s: Any) -> str:
+    return " ".join(_normalize_color_token(s).replace("_", " ").split())
+
+
+def _match_canonical(value: Any, allowed: List[str]) -> Optional[str]:
+    """Canonical spelling of value when it only differs by case/whitespace/dash style."""
+    if value in allowed:
+        return value
+    vn = _norm_token(value)
+    for a in allowed:
+        if _norm_token(a) == vn:
+            return a
+    return None
+
+
+def _repair_pattern(pattern: Dict[str, Any], pattern_name: str) -> List[str]:
+    """Apply canon-driven fixes to one pattern in place. Returns a list of fixes made."""
+    fixes: List[str] = []
+    if not isinstance(pattern, dict):
+        return fixes
+
+    # base_lure spelling
+    lure = pattern.get("base_lure")
+    canon_lure = _match_canonical(lure, LURE_POOL) if lure else None
+    if canon_lure and canon_lure != lure:
+        pattern["base_lure"] = canon_lure
+        fixes.append(f"{pattern_name}: base_lure {lure!r}->{canon_lure!r}")
+    lure = pattern.get("base_lure")
+    if lure not in LURE_POOL:
+        # Unknown lure is a semantic error; everything below keys off the lure
+        return fixes
+
+    # presentation := LURE_TO_PRESENTATION[base_lure]
+    expected = LURE_TO_PRESENTATION.get(lure)
+    options = expected if isinstance(expected, list) else ([expected] if expected else [])
+    presentation = pattern.get("presentation")
+    if options and presentation not in options:
+        fixed = _match_canonical(presentation, options)
+        if fixed is None:
+            pn = _norm_token(presentation)
+            fixed = next((o for o in options if pn and (_norm_token(o).startswith(pn) or pn.startswith(_norm_token(o)))), options[0])
+        pattern["presentation"] = fixed
+        fixes.append(f"{pattern_name}: presentation {presentation!r}->{fixed!r}")
+
+    # soft_plastic vs trailer field usage (mutually exclusive by lure family)
+    if lure in TRAILER_BUCKET_BY_LURE:
+        if pattern.get("soft_plastic") and not pattern.get("trailer"):
+            pattern["trailer"] = pattern["soft_plastic"]
+            pattern["trailer_why"] = pattern.get("soft_plastic_why", "")
+            fixes.append(f"{pattern_name}: moved soft_plastic to trailer")
+        for key in ("soft_plastic", "soft_plastic_why"):
+            if key in pattern:
+                del pattern[key]
+        if pattern.get("trailer"):
+            allowed_trailers = _TRAILER_POOLS.get(TRAILER_BUCKET_BY_LURE[lure], [])
+            fixed = _match_canonical(pattern["trailer"], list(allowed_trailers))
+            if fixed and fixed != pattern["trailer"]:
+                fixes.append(f"{pattern_name}: trailer {pattern['trailer']!r}->{fixed!r}")
+                pattern["trailer"] = fixed
+    elif lure in TERMINAL_PLASTIC_MAP:
+        if pattern.get("trailer") and not pattern.get("soft_plastic"):
+            pattern["soft_plastic"] = pattern["trailer"]
+            pattern["soft_plastic_why"] = pattern.get("trailer_why", "")
+            fixes.append(f"{pattern_name}: moved trailer to soft_plastic")
+        for key in ("trailer", "trailer_why"):
+            if key in pattern:
+                del pattern[key]
+        if pattern.get("soft_plastic"):
+            fixed = _match_canonical(pattern["soft_plastic"], sorted(TERMINAL_PLASTIC_MAP[lure]))
+            if fixed and fixed != pattern["soft_plastic"]:
+                fixes.append(f"{pattern_name}: soft_plastic {pattern['soft_plastic']!r}->{fixed!r}")
+                pattern["soft_plastic"] = fixed
+    else:
+        dropped = [k for k in ("soft_plastic", "soft_plastic_why", "trailer", "trailer_why") if k in pattern]
+        for key in dropped:
+            del pattern[key]
+        if any(k in dropped for k in ("soft_plastic", "trailer")):
+            fixes.append(f"{pattern_name}: dropped soft_plastic/trailer for {lure}")
+
+    # colors: exactly two, both from the lure-specific pool
+    colors = pattern.get("color_recommendations")
+    try:
+        allowed_colors = list(get_color_pool_for_lure(lure, pattern.get("soft_plastic")))
+    except Exception:
+        allowed_colors = []
+    colors_ok = (
+        isinstance(colors, list)
+        and 1 <= len(colors) <= 2
+        and all(c in allowed_colors for c in colors)
+    )
+    if allowed_colors and not colors_ok:
+        coerced, _, reasons = _coerce_two_colors_to_pool(lure, pattern.get("soft_plastic"), colors)
+        pattern["color_recommendations"] = coerced
+        fixes.append(f"{pattern_name}: colors {reasons}")
+
+    # target spelling
+    targets = pattern.get("targets")
+    if isinstance(targets, list):
+        canonical_targets = list(TARGET_DEFINITIONS.keys())
+        for i, t in enumerate(targets):
+            fixed = _match_canonical(t, canonical_targets)
+            if fixed and fixed != t:
+                targets[i] = fixed
+                fixes.append(f"{pattern_name}: target {t!r}->{fixed!r}")
+
+    return fixes
+
+
+def _repair_day_progression(plan: Dict[str, Any]) -> List[str]:
+    fixes: List[str] = []
+    day_prog = plan.get("day_progression")
+
+    # {"morning": "...", "midday": "...", "evening": "..."} -> prefixed list
+    if isinstance(day_prog, dict) and len(day_prog) == 3:
+        lines = []
+        for key, text in day_prog.items():
+            prefix = _DAY_PREFIXES.get(_norm_token(key))
+            if not prefix:
+                return fixes
+            lines.append(f"{prefix} {str(text).strip()}")
+        plan["day_progression"] = lines
+        fixes.append("day_progression: dict->list")
+        return fixes
+
+    if not isinstance(day_prog, list):
+        return fixes
+
+    for i, line in enumerate(day_prog):
+        text = str(line).strip().lstrip("*-• ").strip()
+        head, sep, rest = text.partition(":")
+        if not sep:
+            continue
+        prefix = _DAY_PREFIXES.get(_norm_token(head.strip("* ")))
+        if prefix and not str(line).startswith(prefix):
+            day_prog[i] = f"{prefix} {rest.strip().lstrip('* ').strip()}"
+            fixes.append(f"day_progression line {i}: prefix")
+    return fixes
+
+
+def repair_plan_locally(plan: Dict[str, Any], is_member: bool = False) -> List[str]:
+    """
+    Deterministic, canon-driven fixes applied in place (microseconds, no LLM).
+    Returns the list of fixes made; empty when nothing mechanical could be fixed.
+    """
+    if not isinstance(plan, dict):
+        return []
+
+    fixes: List[str] = []
+    if is_member:
+        primary = plan.get("primary")
+        secondary = plan.get("secondary")
+        fixes.extend(_repair_pattern(primary, "primary"))
+        fixes.extend(_repair_pattern(secondary, "secondary"))
+
+        # Presentations must differ: use another mapped presentation when the lure allows one
+        if isinstance(primary, dict) and isinstance(secondary, dict) and primary.get("presentation") == secondary.get("presentation"):
+            for name, pattern, other in (("secondary", secondary, primary), ("primary", primary, secondary)):
+                expected = LURE_TO_PRESENTATION.get(pattern.get("base_lure"))
+                if isinstance(expected, list):
+                    alternative = next((o for o in expected if o != other.get("presentation")), None)
+                    if alternative:
+                        pattern["presentation"] = alternative
+                        fixes.append(f"{name}: presentation->{alternative!r} (must differ)")
+                        break
+    else:
+        fixes.extend(_repair_pattern(plan, "plan"))
+
+    fixes.extend(_repair_day_progression(plan))
+    return fixes
+
+
+def _failing_sections(plan: Dict[str, Any], errors: List[str], is_member: bool) -> Optional[Dict[str, Any]]:
+    """
+    Map validation errors to the top-level sections that need the LLM.
+    Returns None when an error isn't section-scoped (missing structure, flat plans),
+    in which case only a full retry can help.
+    """
+    if not is_member:
+        return None
+
+    keys: List[str] = []
+    for err in errors:
+        if err.startswith("primary:"):
+            keys.append("primary")
+        elif err.startswith("secondary:") or err.startswith("Primary and secondary must have DIFFERENT"):
+            keys.append("secondary")
+        elif err.startswith("day_progression"):
+            keys.append("day_progression")
+        elif err.startswith("outlook_blurb"):
+            keys.append("outlook_blurb")
+        elif err.startswith("Plan contains specific depth mention"):
+            matched = err.split(": ", 1)[-1]
+            hits = [
+                k for k in ("outlook_blurb", "primary", "secondary", "day_progression")
+                if matched and matched in json.dumps(plan.get(k), ensure_ascii=False)
+            ]
+            if not hits:
+                return None
+            keys.extend(hits)
+        else:
+            return None
+
+    sections = {k: plan.get(k) for k in dict.fromkeys(keys)}
+    if any(v is None for v in sections.values()):
+        return None
+    return sections
+
+
+async def _repair_sections_with_llm(
+    plan: Dict[str, Any],
+    errors: List[str],
+    is_member: bool,
+    user_message: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    Send only the failing sections back (same system + user prefix as the
+    original call, so the provider prompt cache covers nearly all input tokens).
+    """
+    sections = _failing_sections(plan, errors, is_member)
+    if not sections:
+        return None
+
+    _REPAIR_STATS["section_repairs"] += 1
+    print(f"LLM_REPAIR: Sending sections {sorted(sections)} back for repair")
+
+    fixed = await _openai_chat_json(
+        [
+            {"role": "system", "content": MEMBER_SYSTEM_PROMPT.text},
+            {"role": "user", "content": user_message},
+            {"role": "user", "content": build_section_repair_prompt(sections, errors)},
+        ],
+        temperature=0.2,
+        max_tokens=min(700 * len(sections), 1700),
+        label="LLM_REPAIR",
+        attempt=False,
+    )
+    if not isinstance(fixed, dict):
+        return None
+
+    merged = dict(plan)
+    for key in sections:
+        if key in fixed:
+            merged[key] = fixed[key]
+    return merged
+
+
+async def _validate_and_repair(
+    plan: Dict[str, Any],
+    is_member: bool,
+    build_user_message,
+) -> Tuple[Dict[str, Any], bool, List[str]]:
+    """
+    validate → local repair → validate → section-scoped LLM repair → validate.
+    Returns (plan, is_valid, errors).
+    """
+    _REPAIR_STATS["plans_checked"] += 1
+    is_valid, errors = validate_llm_plan(plan, is_member=is_member)
+    if is_valid:
+        return plan, True, []
+
+    _REPAIR_STATS["invalid_plans"] += 1
+    fixes = repair_plan_locally(plan, is_member=is_member)
+    if fixes:
+        _REPAIR_STATS["local_fixes"] += len(fixes)
+        print("LLM_REPAIR: Local fixes: " + "; ".join(fixes[:8]))
+        is_valid, errors = validate_llm_plan(plan, is_member=is_member)
+        if is_valid:
+            _REPAIR_STATS["local_repaired"] += 1
+            return plan, True, []
+
+    repaired = await _repair_sections_with_llm(plan, errors, is_member, build_user_message())
+    if repaired is not None:
+        repair_plan_locally(repaired, is_member=is_member)
+        ok, repaired_errors = validate_llm_plan(repaired, is_member=is_member)
+        if ok:
+            _REPAIR_STATS["section_repaired"] += 1
+            return repaired, True, []
+        errors = repaired_errors
+
+    return plan, False, errors
+
+
 # ============================================================================
 # PART 4: Main generation function with retries
 # ============================================================================
 
+# ----------------------------------------
+# Hedged attempts (optional)
+# ----------------------------------------
+# With LLM_HEDGE_ENABLED on, each attempt round starts a second call at a
+# different temperature after LLM_HEDGE_DELAY_SECONDS (or as soon as the first
+# result fails validation). The first valid plan wins; the other call is
+# cancelled. Hedges are capped per minute by count, in-flight concurrency and
+# estimated token spend so a slow OpenAI minute can't double the bill.
+
+def _hedge_enabled() -> bool:
+    return os.getenv("LLM_HEDGE_ENABLED", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+class _HedgeBudget:
+    """
+    Sliding one-minute window over launched hedges.
+      LLM_HEDGE_MAX_PER_MINUTE         hedges launched per minute (default 20)
+      LLM_HEDGE_MAX_CONCURRENT         hedges in flight at once (default 4)
+      LLM_HEDGE_TOKENS_PER_MINUTE      estimated tokens spent on hedges per minute (default 400000)
+    Token cost of a hedge is estimated from the running average of full plan
+    generations; section repair calls are much smaller and don't count.
+    """
+
+    DEFAULT_CALL_TOKENS = 20000
+
+    def __init__(self) -> None:
+        self._launches: List[Tuple[float, int]] = []
+        self.in_flight = 0
+
+    def _estimate_tokens(self) -> int:
+        calls = _LLM_USAGE["attempt_calls"]
+        if not calls:
+            return self.DEFAULT_CALL_TOKENS
+        return int(_LLM_USAGE["attempt_tokens"] / calls)
+
+    def try_acquire(self) -> Optional[str]:
+        """Reserve a hedge. Returns None on success, otherwise the reason it was refused."""
+        now = time.time()
+        self._launches = [(t, n) for t, n in self._launches if now - t < 60]
+
+        if self.in_flight >= int(_env_float("LLM_HEDGE_MAX_CONCURRENT", 4)):
+            return "concurrency"
+        if len(self._launches) >= int(_env_float("LLM_HEDGE_MAX_PER_MINUTE", 20)):
+            return "rate"
+        cost = self._estimate_tokens()
+        spent = sum(n for _, n in self._launches)
+        if spent + cost > int(_env_float("LLM_HEDGE_TOKENS_PER_MINUTE", 400000)):
+            return "spend"
+
+        self._launches.append((now, cost))
+        self.in_flight += 1
+        return None
+
+    def release(self) -> None:
+        self.in_flight = max(self.in_flight - 1, 0)
+
+    def window(self) -> Dict[str, int]:
+        now = time.time()
+        recent = [(t, n) for t, n in self._launches if now - t < 60]
+        return {
+            "in_flight": self.in_flight,
+            "launched_last_minute": len(recent),
+            "est_tokens_last_minute": sum(n for _, n in recent),
+        }
+
+
+_HEDGE_BUDGET = _HedgeBudget()
+
+_HEDGE_STATS: Dict[str, int] = {
+    "rounds": 0,
+    "launched_on_delay": 0,
+    "launched_on_invalid": 0,
+    "skipped_concurrency": 0,
+    "skipped_rate": 0,
+    "skipped_spend": 0,
+    "hedge_wins": 0,          # hedge delivered the winning plan
+    "primary_wins": 0,        # primary won even though a hedge was running
+    "both_failed": 0,
+    "cancelled": 0,
+}
+
+
+def hedge_stats() -> Dict[str, Any]:
+    launched = _HEDGE_STATS["launched_on_delay"] + _HEDGE_STATS["launched_on_invalid"]
+    return {
+        "enabled": _hedge_enabled(),
+        **_HEDGE_STATS,
+        "launched": launched,
+        "hedge_win_rate": round(_HEDGE_STATS["hedge_wins"] / launched, 4) if launched else 0.0,
+        **_HEDGE_BUDGET.window(),
+    }
+
+
+async def _hedged_round(attempt_fn) -> Tuple[Optional[Dict[str, Any]], bool, List[str]]:
+    """
+    Run one attempt round with an optional hedge.
+    attempt_fn(label, temperature_offset) -> (plan, is_valid, errors)
+    """
+    _HEDGE_STATS["rounds"] += 1
+    delay = _env_float("LLM_HEDGE_DELAY_SECONDS", 8.0)
+    offset = _env_float("LLM_HEDGE_TEMPERATURE_OFFSET", 0.2)
+
+    primary = asyncio.create_task(attempt_fn("primary", 0.0))
+    hedge: Optional[asyncio.Task] = None
+
+    def _launch(reason: str) -> bool:
+        nonlocal hedge
+        refused = _HEDGE_BUDGET.try_acquire()
+        if refused:
+            _HEDGE_STATS["skipped_" + refused] += 1
+            print(f"LLM_HEDGE: Hedge skipped ({refused})")
+            return False
+        _HEDGE_STATS["launched_on_" + reason] += 1
+        print(f"LLM_HEDGE: Launching hedge ({reason}) temp_offset=+{offset}")
+        hedge = asyncio.create_task(attempt_fn("hedge", offset))
+        hedge.add_done_callback(lambda _t: _HEDGE_BUDGET.release())
+        return True
+
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if primary in done:
+            plan, is_valid, errors = primary.result()
+            if is_valid or not _launch("invalid"):
+                return plan, is_valid, errors
+            # Primary already failed; the hedge is the only candidate left
+            plan, is_valid, errors = await hedge
+            if is_valid:
+                _HEDGE_STATS["hedge_wins"] += 1
+            else:
+                _HEDGE_STATS["both_failed"] += 1
+            return plan, is_valid, errors
+
+        if not _launch("delay"):
+            return await primary
+
+        pending = {primary, hedge}
+        last: Tuple[Optional[Dict[str, Any]], bool, List[str]] = (None, False, [])
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result[1]:
+                    _HEDGE_STATS["hedge_wins" if task is hedge else "primary_wins"] += 1
+                    return result
+                last = result
+        _HEDGE_STATS["both_failed"] += 1
+        return last
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
+                _HEDGE_STATS["cancelled"] += 1
+
+
 async def generate_llm_plan_with_retries(
     weather: dict,
     phase: str,
@@ -1423,9 +2222,24 @@ async def generate_llm_plan_with_retries(
         recent_primary_lures: List of recently used primary lures
         recent_secondary_lures: List of recently used secondary lures
         regen_context: Context dict with last_lake_name, minutes_since_last_gen, last_combination
-        max_attempts: Number of retry attempts
+        max_attempts: Number of retry attempts (rounds, when hedging is on)
     """
-    for attempt in range(max_attempts):
+    def build_user_message() -> str:
+        return json.dumps(
+            _build_plan_user_input(
+                weather=weather,
+                phase=phase,
+                location=location,
+                access_type=access_type,
+                current_lake_name=current_lake_name,
+                recent_primary_lures=recent_primary_lures,
+                recent_secondary_lures=recent_secondary_lures,
+                regen_context=regen_context,
+            )[0],
+            ensure_ascii=False,
+        )
+
+    async def attempt_fn(label: str, temperature_offset: float) -> Tuple[Optional[Dict[str, Any]], bool, List[str]]:
         plan = await call_openai_plan(
             weather=weather,
             phase=phase,
@@ -1438,20 +2252,27 @@ async def generate_llm_plan_with_retries(
             recent_primary_lures=recent_primary_lures,
             recent_secondary_lures=recent_secondary_lures,
             regen_context=regen_context,
+            temperature_offset=temperature_offset,
         )
-        if plan is not None:
-         _log_color_intent(f"raw_llm_attempt_{attempt + 1}", plan)
+        if not plan:
+            return None, False, []
+        _log_color_intent(f"raw_llm_{label}", plan)
+
+        # Validate plan (local repair + section repair before any full retry)
+        return await _validate_and_repair(plan, is_member=is_member, build_user_message=build_user_message)
+
+    hedging = _hedge_enabled()
+
+    for attempt in range(max_attempts):
+        if hedging:
+            plan, is_valid, errors = await _hedged_round(attempt_fn)
+        else:
+            plan, is_valid, errors = await attempt_fn(f"attempt_{attempt + 1}", 0.0)
 
         if not plan:
             await asyncio.sleep(0.75 * (attempt + 1))
             print("LLM_PLAN: Attempt " + str(attempt + 1) + " failed (no response)")
             continue
-        
-        
-
-
-        # Validate plan
-        is_valid, errors = validate_llm_plan(plan, is_member=is_member)
 
         if is_valid:
             try:
@@ -1467,12 +2288,163 @@ async def generate_llm_plan_with_retries(
         for err in errors[:6]:
             print("  - " + err)
 
-        await asyncio.sleep(0.75 * (attempt + 1))
+        # Content failures don't need backoff; go straight to a fresh attempt
+        if attempt + 1 < max_attempts:
+            _REPAIR_STATS["full_retries"] += 1
 
     print("LLM_PLAN: All attempts failed")
     return None
 
 
+# ============================================================================
+# PART 5: Streaming generation (SSE)
+# ============================================================================
+
+# Sections sent to the client as soon as they close in the stream
+STREAM_SECTIONS = ("forecast_rating", "weather_card_insights", "outlook_blurb", "primary", "secondary")
+
+
+def _stream_section(key: str, value: Any) -> Optional[Any]:
+    """Return the section ready to show, or None if it doesn't pass its own checks yet."""
+    if key in ("primary", "secondary"):
+        if not isinstance(value, dict):
+            return None
+        _repair_pattern(value, key)
+        if _validate_pattern(value, key):
+            return None
+        return value
+    if key == "outlook_blurb":
+        return value if isinstance(value, str) and value.strip() else None
+    return value if value not in (None, "", {}, []) else None
+
+
+def _section_snapshot(key: str, section: Any, is_member: bool) -> str:
+    """
+    The section as it will appear in the final plan (asset keys included),
+    serialized: the plan keeps being repaired in place after a section is sent.
+    """
+    section = json.loads(json.dumps(section, default=str))
+    if key in ("primary", "secondary"):
+        section = expand_plan_color_zones({key: section}, is_member=is_member)[key]
+    return json.dumps(section, sort_keys=True, default=str)
+
+
+def _final_section_events(plan: Optional[Dict[str, Any]], sent: Dict[str, str]) -> List[Tuple[str, Any]]:
+    """
+    Section events that make what the client has match the final plan.
+    If anything already sent differs from (or is missing in) the final plan
+    - repair changed it, or the fallback produced a different plan - a
+    ("reset", ...) event comes first and every final section is sent again;
+    otherwise only the sections not sent yet.
+    """
+    final = {k: plan[k] for k in STREAM_SECTIONS if plan and plan.get(k) is not None}
+    stale = [k for k, snapshot in sent.items() if json.dumps(final.get(k), sort_keys=True, default=str) != snapshot]
+    events: List[Tuple[str, Any]] = []
+    if stale:
+        _REPAIR_STATS["stream_resets"] += 1
+        events.append(("reset", {"sections": stale}))
+    for key, section in final.items():
+        if stale or key not in sent:
+            events.append((key, section))
+    return events
+
+
+async def stream_llm_plan(
+    weather: dict,
+    phase: str,
+    location: str,
+    latitude: float,
+    longitude: float,
+    access_type: str = "boat",
+    is_member: bool = False,
+    current_lake_name: str = "",
+    recent_primary_lures: list[str] = None,
+    recent_secondary_lures: list[str] = None,
+    regen_context: dict = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Stream a plan as (event, data) pairs:
+      (section_name, section) for each STREAM_SECTIONS entry that closes and validates,
+      then, once the final plan is known, ("reset", {"sections": [...]}) followed by
+      every final section if any section already sent doesn't match it (see
+      _final_section_events), or just the sections not sent yet,
+      ("plan", full_plan_or_None) last, after whole-plan validation/repair.
+    If the streamed plan can't be repaired, falls back to generate_llm_plan_with_retries
+    and the final "plan" event carries that plan instead. Either way the sections
+    the client holds when "plan" arrives are the final plan's.
+    """
+    user_input, temperature = _build_plan_user_input(
+        weather=weather,
+        phase=phase,
+        location=location,
+        access_type=access_type,
+        current_lake_name=current_lake_name,
+        recent_primary_lures=recent_primary_lures,
+        recent_secondary_lures=recent_secondary_lures,
+        regen_context=regen_context,
+    )
+    user_message = json.dumps(user_input, ensure_ascii=False)
+
+    parser = _StreamingJsonObject()
+    plan: Dict[str, Any] = {}
+    sent: Dict[str, str] = {}  # section -> what the client was sent (JSON)
+    async for delta in _openai_chat_json_stream(
+        [
+            {"role": "system", "content": MEMBER_SYSTEM_PROMPT.text},
+            {"role": "user", "content": user_message},
+        ],
+        temperature=temperature,
+        max_tokens=1700,
+    ):
+        for key, value in parser.feed(delta):
+            plan[key] = value
+            if key in STREAM_SECTIONS:
+                ready = _stream_section(key, value)
+                if ready is not None:
+                    sent[key] = _section_snapshot(key, ready, is_member)
+                    yield key, json.loads(sent[key])
+
+    is_valid = False
+    if plan:
+        _log_color_intent("raw_llm_stream", plan)
+        plan, is_valid, errors = await _validate_and_repair(
+            plan, is_member=is_member, build_user_message=lambda: user_message
+        )
+        if not is_valid:
+            print("LLM_STREAM: Streamed plan failed validation:")
+            for err in errors[:6]:
+                print("  - " + err)
+
+    if is_valid:
+        try:
+            plan = expand_plan_color_zones(plan, is_member=is_member)
+        except Exception as e:
+            print("LLM_STREAM: Color zone expansion failed: " + str(e))
+        for event in _final_section_events(plan, sent):
+            yield event
+        yield "plan", plan
+        return
+
+    print("LLM_STREAM: Falling back to non-streaming generation")
+    fallback = await generate_llm_plan_with_retries(
+        weather=weather,
+        phase=phase,
+        location=location,
+        latitude=latitude,
+        longitude=longitude,
+        access_type=access_type,
+        is_member=is_member,
+        current_lake_name=current_lake_name,
+        recent_primary_lures=recent_primary_lures,
+        recent_secondary_lures=recent_secondary_lures,
+        regen_context=regen_context,
+        max_attempts=3,
+    )
+    for event in _final_section_events(fallback, sent):
+        yield event
+    yield "plan", fallback
+
+
 def llm_enabled() -> bool:
     """Check if LLM plan generation is enabled"""
     return os.getenv("LLM_PLAN_ENABLED", "").strip().lower() in ("1", "true", "yes", "on")
\ No newline at end of file
@@ -1,5 +1,6 @@
 # apps/api/app/services/llm_validate.py
 from __future__ import annotations
+import json
 import re
 from typing import Any, Dict, List, Tuple, Set, Optional
 from app.canon.targets import CANONICAL_TARGETS
@@ -150,4 +151,19 @@ def build_repair_prompt(plan_json: Dict[str, Any], errors: List[str]) -> str:
         "Return corrected JSON ONLY (no markdown, no prose).\n\n"
         f"VALIDATION_ERRORS:\n- " + "\n- ".join(errors) + "\n\n"
         f"YOUR_JSON:\n{plan_json}"
-    )
\ No newline at end of file
+    )
+
+
+def build_section_repair_prompt(sections: Dict[str, Any], errors: List[str]) -> str:
+    """
+    Section-scoped variant of build_repair_prompt: only the failing top-level
+    sections are sent back, and only those keys may be returned.
+    """
+    keys = sorted(sections.keys())
+    return (
+        "Some sections of your JSON failed validation.\n"
+        "Fix ONLY the listed issues inside these sections. Keep everything else in them unchanged.\n"
+        f"Return a JSON object with EXACTLY these top-level keys: {keys}. No markdown, no prose.\n\n"
+        f"VALIDATION_ERRORS:\n- " + "\n- ".join(errors) + "\n\n"
+        f"SECTIONS_TO_FIX:\n{json.dumps(sections, ensure_ascii=False)}"
+    )
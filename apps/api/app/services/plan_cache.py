@@ -0,0 +1,427 @@
+# apps/api/app/services/plan_cache.py
+"""
+Validated-plan cache in front of generate_llm_plan_with_retries.
+
+Two members asking for the same water under the same conditions inside the
+same time bucket get the same validated plan instead of paying for another
+OpenAI round trip. Keys come from snapshot_hash (rounded lat/lon, phase,
+access_type, time bucket), entries expire by TTL and are evicted LRU.
+
+Backends:
+- "memory" (default): per-process OrderedDict
+- "sql": shared table (Postgres via DATABASE_URL, SQLite locally)
+
+Async handlers go through plan_cache.aio (the DB thread pool), since the sql
+backend does blocking I/O. A write is a single upsert: expired rows and
+entries over PLAN_CACHE_MAX_ENTRIES are removed by run_sweeper() every
+PLAN_CACHE_SWEEP_SECONDS instead. Reads never return an expired entry, so
+the sweep only bounds the table size.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+from app.services.snapshot_hash import SnapshotHashConfig, snapshot_hash
+from app.services import db
+
+
+# Weather fields the LLM actually sees (mirrors user_input["weather"] in call_openai_plan).
+# Display-only fields (sunrise strings etc.) stay out so they never split the key.
+CACHE_WEATHER_FIELDS = (
+    "temp_f",
+    "temp_high",
+    "temp_low",
+    "wind_mph",
+    "cloud_cover",
+    "pressure_mb",
+    "pressure_trend",
+    "precipitation_1h",
+    "has_recent_rain",
+    "uv_index",
+    "moon_phase",
+    "moon_illumination",
+    "is_major_period",
+    "humidity",
+    "clarity_estimate",
+)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def _time_bucket(now: datetime, bucket_minutes: int) -> str:
+    minute_of_day = now.hour * 60 + now.minute
+    return f"{now.strftime('%Y-%m-%d')}:{minute_of_day // max(bucket_minutes, 1)}"
+
+
+def plan_cache_key(
+    *,
+    weather: Mapping[str, Any],
+    phase: str,
+    access_type: str,
+    latitude: Optional[float],
+    longitude: Optional[float],
+    now: Optional[datetime] = None,
+    water_view_id: Optional[str] = None,
+    trip_date: Optional[date] = None,
+) -> str:
+    """
+    Condition key for a validated plan.
+    Lat/lon rounding (PLAN_CACHE_LATLON_DIGITS, default 2 ≈ 1 km) and the time
+    bucket (PLAN_CACHE_BUCKET_MINUTES, default 60) decide how aggressively
+    nearby requests share a plan. Callers that resolved a canonical lake pass
+    it as water_view_id with no lat/lon, so the whole lake shares one key.
+    Plans for a future trip_date never share a key with today's plans or
+    another day's, even when the forecast fields happen to match.
+    """
+    digits = _env_int("PLAN_CACHE_LATLON_DIGITS", 2)
+    bucket_minutes = _env_int("PLAN_CACHE_BUCKET_MINUTES", 60)
+
+    w = {k: weather.get(k) for k in CACHE_WEATHER_FIELDS}
+    w["season_phase"] = phase
+    time_bucket = _time_bucket(now or datetime.now(timezone.utc), bucket_minutes)
+    if trip_date is not None:
+        time_bucket = f"{time_bucket}|trip:{trip_date.isoformat()}"
+
+    return snapshot_hash(
+        weather=w,
+        config=SnapshotHashConfig(lat_digits=digits, lon_digits=digits),
+        lat=latitude,
+        lon=longitude,
+        time_bucket=time_bucket,
+        water_view_id=water_view_id,
+        access_type=access_type,
+    )
+
+
+def plan_combination(plan: Mapping[str, Any]) -> Optional[Tuple[str, str]]:
+    """(primary base_lure, secondary base_lure) for a member plan, if present."""
+    p_lure = (plan.get("primary") or {}).get("base_lure")
+    s_lure = (plan.get("secondary") or {}).get("base_lure")
+    if p_lure and s_lure:
+        return (p_lure, s_lure)
+    return None
+
+
+# ----------------------------------------
+# Backends
+# ----------------------------------------
+
+class InMemoryPlanCacheBackend:
+    """Per-process LRU. Payloads are JSON strings so callers never share mutable plans."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: int) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def set(self, key: str, payload: str, expires_at: int, now: int) -> int:
+        """Store payload; returns the number of entries evicted."""
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def sweep(self, now: int) -> int:
+        """Drop expired entries (set() already keeps the LRU bound). Returns the number removed."""
+        with self._lock:
+            expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class SqlPlanCacheBackend:
+    """
+    Shared cache table so every uvicorn worker (and restarts) see the same entries.
+    Supports both SQLite (local) and Postgres (Render).
+    """
+
+    name = "sql"
+
+    def __init__(self, path: str = "data/plan_cache.sqlite3", max_entries: int = 5000):
+        self.max_entries = max_entries
+        self._pg_url = os.getenv("DATABASE_URL")
+        self._use_pg = bool(self._pg_url and self._pg_url.startswith("postgres"))
+
+        if self._use_pg:
+            self._init_pg()
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.path = path
+            self._init_db()
+
+    def _conn(self):
+        if self._use_pg:
+            return db.connection(pg_url=self._pg_url)
+        return db.connection(sqlite_path=self.path)
+
+    def _get_p(self) -> str:
+        return "%s" if self._use_pg else "?"
+
+    def _init_pg(self) -> None:
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS plan_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    plan_data TEXT NOT NULL,
+                    created_at INTEGER NOT NULL,
+                    expires_at INTEGER NOT NULL,
+                    last_access INTEGER NOT NULL
+                );
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_plan_cache_last_access ON plan_cache(last_access);")
+            conn.commit()
+
+    def _init_db(self) -> None:
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS plan_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    plan_data TEXT NOT NULL,
+                    created_at INTEGER NOT NULL,
+                    expires_at INTEGER NOT NULL,
+                    last_access INTEGER NOT NULL
+                );
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_plan_cache_last_access ON plan_cache(last_access);")
+            conn.commit()
+
+    def get(self, key: str, now: int) -> Optional[str]:
+        p = self._get_p()
+        with self._conn() as conn:
+            row = conn.execute(
+                f"SELECT plan_data, expires_at FROM plan_cache WHERE cache_key={p}",
+                (key,),
+            ).fetchone()
+            if not row:
+                return None
+            if row["expires_at"] <= now:
+                conn.execute(f"DELETE FROM plan_cache WHERE cache_key={p}", (key,))
+                conn.commit()
+                return None
+            conn.execute(f"UPDATE plan_cache SET last_access={p} WHERE cache_key={p}", (now, key))
+            conn.commit()
+            return row["plan_data"]
+
+    def set(self, key: str, payload: str, expires_at: int, now: int) -> int:
+        """Upsert one entry. Expiry and the size bound are left to sweep(); returns 0."""
+        p = self._get_p()
+        with self._conn() as conn:
+            conn.execute(
+                f"""INSERT INTO plan_cache (cache_key, plan_data, created_at, expires_at, last_access)
+                    VALUES ({p}, {p}, {p}, {p}, {p})
+                    ON CONFLICT(cache_key) DO UPDATE SET
+                        plan_data = excluded.plan_data,
+                        created_at = excluded.created_at,
+                        expires_at = excluded.expires_at,
+                        last_access = excluded.last_access""",
+                (key, payload, now, expires_at, now),
+            )
+            conn.commit()
+        return 0
+
+    def sweep(self, now: int) -> int:
+        """Delete expired rows, then the least recently used beyond max_entries. Returns rows removed."""
+        p = self._get_p()
+        with self._conn() as conn:
+            expired = conn.execute(f"DELETE FROM plan_cache WHERE expires_at <= {p}", (now,)).rowcount
+
+            row = conn.execute("SELECT COUNT(*) AS count FROM plan_cache").fetchone()
+            overflow = (row["count"] if row else 0) - self.max_entries
+            evicted = 0
+            if overflow > 0:
+                evicted = conn.execute(
+                    f"""DELETE FROM plan_cache WHERE cache_key IN (
+                        SELECT cache_key FROM plan_cache ORDER BY last_access ASC LIMIT {p}
+                    )""",
+                    (overflow,),
+                ).rowcount
+            conn.commit()
+        return max(expired, 0) + max(evicted, 0)
+
+    def delete(self, key: str) -> None:
+        p = self._get_p()
+        with self._conn() as conn:
+            conn.execute(f"DELETE FROM plan_cache WHERE cache_key={p}", (key,))
+            conn.commit()
+
+    def size(self) -> int:
+        with self._conn() as conn:
+            row = conn.execute("SELECT COUNT(*) AS count FROM plan_cache").fetchone()
+            return row["count"] if row else 0
+
+
+# ----------------------------------------
+# Cache facade
+# ----------------------------------------
+
+class PlanCache:
+    """
+    LRU + TTL cache of validated LLM plans with hit/miss counters.
+    Configured from env:
+      PLAN_CACHE_ENABLED      (default: on)
+      PLAN_CACHE_BACKEND      memory | sql (default: memory)
+      PLAN_CACHE_TTL_SECONDS  (default: 1800)
+      PLAN_CACHE_MAX_ENTRIES  (default: 512)
+      PLAN_CACHE_SWEEP_SECONDS  how often expired / over-limit entries are removed (default: 60)
+    """
+
+    def __init__(self, backend: Any = None, ttl_seconds: Optional[int] = None, enabled: Optional[bool] = None):
+        if enabled is None:
+            enabled = os.getenv("PLAN_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else _env_int("PLAN_CACHE_TTL_SECONDS", 1800)
+
+        if backend is None:
+            max_entries = _env_int("PLAN_CACHE_MAX_ENTRIES", 512)
+            if os.getenv("PLAN_CACHE_BACKEND", "memory").strip().lower() == "sql":
+                backend = SqlPlanCacheBackend(max_entries=max_entries)
+            else:
+                backend = InMemoryPlanCacheBackend(max_entries=max_entries)
+        self.backend = backend
+        self.sweep_seconds = max(_env_int("PLAN_CACHE_SWEEP_SECONDS", 60), 1)
+        self.aio = db.AsyncStore(self)  # awaitable view for async handlers
+
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "bypasses": 0, "stores": 0, "evictions": 0, "errors": 0, "sweeps": 0}
+
+    def _bump(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        try:
+            payload = self.backend.get(key, int(time.time()))
+        except Exception as e:
+            print(f"PLAN_CACHE: get failed: {e}")
+            self._bump("errors")
+            return None
+
+        if payload is None:
+            self._bump("misses")
+            return None
+
+        self._bump("hits")
+        return json.loads(payload)
+
+    def lookup(
+        self,
+        key: str,
+        regenerating: bool = False,
+        avoid_combination: Optional[Sequence[str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The cached plan for a generation request, or None.
+        A regeneration (variety requested) never consults the cache, and a plan
+        repeating the member's last (primary, secondary) lures is never served.
+        """
+        if regenerating:
+            self.record_bypass()
+            return None
+        plan = self.get(key)
+        if plan and avoid_combination and plan_combination(plan) == tuple(avoid_combination):
+            return None
+        return plan
+
+    def set(self, key: str, plan: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        now = int(time.time())
+        try:
+            evicted = self.backend.set(key, json.dumps(plan), now + self.ttl_seconds, now)
+        except Exception as e:
+            print(f"PLAN_CACHE: set failed: {e}")
+            self._bump("errors")
+            return
+        self._bump("stores")
+        if evicted:
+            self._bump("evictions", evicted)
+
+    def invalidate(self, key: str) -> None:
+        try:
+            self.backend.delete(key)
+        except Exception as e:
+            print(f"PLAN_CACHE: delete failed: {e}")
+
+    def sweep(self) -> int:
+        """Remove expired and over-limit entries. Returns the number removed."""
+        removed = self.backend.sweep(int(time.time()))
+        self._bump("sweeps")
+        if removed:
+            self._bump("evictions", removed)
+        return removed
+
+    async def run_sweeper(self) -> None:
+        if not self.enabled:
+            return
+        while True:
+            await asyncio.sleep(self.sweep_seconds)
+            try:
+                await self.aio.sweep()
+            except Exception as e:
+                self._bump("errors")
+                print(f"PLAN_CACHE: sweep failed: {e}")
+
+    def record_bypass(self) -> None:
+        """Counted separately from misses: regenerations never consult the cache."""
+        self._bump("bypasses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        try:
+            size = self.backend.size()
+        except Exception:
+            size = None
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name,
+            "ttl_seconds": self.ttl_seconds,
+            "size": size,
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global instance
+plan_cache = PlanCache()
@@ -0,0 +1,257 @@
+# apps/api/app/services/plan_codec.py
+"""
+Binary storage format for plan bodies (plan_links.plan_blob).
+
+Every blob starts with an 8-byte header:
+
+    magic   2 bytes  b"BP"
+    version 1 byte   format version (1)
+    codec   1 byte   0 = plain JSON, 1 = zlib, 2 = zstd
+    dict_id 4 bytes  big-endian id of the compression dictionary (0 = none)
+
+followed by the (compressed) JSON body. Plans are a few KB of the same keys
+over and over, so a dictionary trained on real plans does most of the work:
+it is shared by every row instead of repeated inside each one.
+
+Dictionaries are stored in the same database as the blobs (the
+plan_codec_dicts table, see PlanLinkStore), keyed by dict_id and never
+rewritten, so every instance can read every row. The codec holds the ones it
+has seen in memory and asks its dict_loader for an id it doesn't know yet
+(one trained after this process started). New rows use the highest id loaded
+at startup. Train one with migrate_plan_links_codec.py --train.
+
+Configured from env:
+  PLAN_CODEC             zstd | zlib | json (default: zstd when installed, else zlib)
+  PLAN_CODEC_LEVEL       compression level (default: 6)
+  PLAN_CODEC_DICT_DIR    where dictionaries used to be saved as <id>.dict;
+                         any found there are copied into the table at startup
+                         (default: data/plan_codec)
+"""
+from __future__ import annotations
+
+import json
+import os
+import struct
+import threading
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
+# Faster JSON and zstd are optional; the stdlib fallbacks read the same blobs
+# (except zstd ones, which need zstandard)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+MAGIC = b"BP"
+VERSION = 1
+HEADER = struct.Struct(">2sBBI")
+
+CODEC_JSON = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODEC_NAMES = {"json": CODEC_JSON, "zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}
+
+DICT_DIR = os.getenv("PLAN_CODEC_DICT_DIR", "data/plan_codec")
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _default_codec() -> int:
+    name = os.getenv("PLAN_CODEC", "").strip().lower()
+    if name in CODEC_NAMES:
+        if name == "zstd" and zstandard is None:
+            print("[PlanCodec] PLAN_CODEC=zstd but zstandard is not installed; using zlib")
+            return CODEC_ZLIB
+        return CODEC_NAMES[name]
+    return CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+
+class PlanCodec:
+    """Encodes plans to header-tagged blobs and decodes any blob version it knows."""
+
+    def __init__(
+        self,
+        codec: Optional[int] = None,
+        level: Optional[int] = None,
+        dict_loader: Optional[Callable[[int], Optional[bytes]]] = None,
+    ):
+        self.codec = _default_codec() if codec is None else codec
+        try:
+            self.level = int(os.getenv("PLAN_CODEC_LEVEL", "").strip() or 6) if level is None else level
+        except ValueError:
+            self.level = 6
+        self.dict_loader = dict_loader  # dict_id -> bytes, for ids not loaded yet
+        self.dicts: Dict[int, bytes] = {}
+        self.dict_id = 0
+        self._local = threading.local()  # zstd (de)compressors are not thread-safe
+        self.stats = {"encoded": 0, "decoded": 0, "bytes_in": 0, "bytes_out": 0, "legacy_reads": 0, "dicts_fetched": 0}
+
+    def load_dicts(self, dicts: Dict[int, bytes]) -> None:
+        """Add stored dictionaries and encode with the highest id."""
+        self.dicts.update(dicts)
+        if self.dicts and max(self.dicts) != self.dict_id:
+            self.dict_id = max(self.dicts)
+            print(f"[PlanCodec] {len(self.dicts)} dictionaries loaded, encoding with #{self.dict_id}")
+
+    def _dict(self, dict_id: int) -> bytes:
+        data = self.dicts.get(dict_id)
+        if data is None and self.dict_loader is not None:
+            data = self.dict_loader(dict_id)
+            if data is not None:
+                self.dicts[dict_id] = data
+                self.stats["dicts_fetched"] += 1
+        if data is None:
+            raise ValueError(f"Plan blob needs dictionary #{dict_id}, which is not stored")
+        return data
+
+    # ----------------------------------------
+    # zstd contexts, one per thread and dictionary
+    # ----------------------------------------
+
+    def _zstd_dict(self, dict_id: int):
+        cache = getattr(self._local, "zdicts", None)
+        if cache is None:
+            cache = self._local.zdicts = {}
+        zdict = cache.get(dict_id)
+        if zdict is None:
+            zdict = cache[dict_id] = zstandard.ZstdCompressionDict(self._dict(dict_id))
+        return zdict
+
+    def _zstd_compressor(self, dict_id: int):
+        cache = getattr(self._local, "compressors", None)
+        if cache is None:
+            cache = self._local.compressors = {}
+        c = cache.get(dict_id)
+        if c is None:
+            zdict = self._zstd_dict(dict_id) if dict_id else None
+            c = cache[dict_id] = zstandard.ZstdCompressor(level=self.level, dict_data=zdict)
+        return c
+
+    def _zstd_decompressor(self, dict_id: int):
+        cache = getattr(self._local, "decompressors", None)
+        if cache is None:
+            cache = self._local.decompressors = {}
+        d = cache.get(dict_id)
+        if d is None:
+            zdict = self._zstd_dict(dict_id) if dict_id else None
+            d = cache[dict_id] = zstandard.ZstdDecompressor(dict_data=zdict)
+        return d
+
+    # ----------------------------------------
+    # Encode / decode
+    # ----------------------------------------
+
+    def encode(self, plan: Dict[str, Any], codec: Optional[int] = None, dict_id: Optional[int] = None) -> bytes:
+        codec = self.codec if codec is None else codec
+        dict_id = self.dict_id if dict_id is None else dict_id
+        raw = dumps(plan)
+
+        if codec == CODEC_ZSTD:
+            body = self._zstd_compressor(dict_id).compress(raw)
+        elif codec == CODEC_ZLIB:
+            c = zlib.compressobj(self.level, zdict=self._dict(dict_id)) if dict_id else zlib.compressobj(self.level)
+            body = c.compress(raw) + c.flush()
+        else:
+            body, dict_id = raw, 0
+
+        blob = HEADER.pack(MAGIC, VERSION, codec, dict_id) + body
+        self.stats["encoded"] += 1
+        self.stats["bytes_in"] += len(raw)
+        self.stats["bytes_out"] += len(blob)
+        return blob
+
+    def decode(self, blob: bytes) -> Dict[str, Any]:
+        blob = bytes(blob)  # psycopg returns memoryview for BYTEA
+        magic, version, codec, dict_id = HEADER.unpack_from(blob)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Unknown plan blob header {blob[:HEADER.size]!r}")
+        body = memoryview(blob)[HEADER.size:]
+
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise ValueError("Plan blob is zstd-compressed but zstandard is not installed")
+            raw = self._zstd_decompressor(dict_id).decompress(body)
+        elif codec == CODEC_ZLIB:
+            d = zlib.decompressobj(zdict=self._dict(dict_id)) if dict_id else zlib.decompressobj()
+            raw = d.decompress(body) + d.flush()
+        elif codec == CODEC_JSON:
+            raw = bytes(body)
+        else:
+            raise ValueError(f"Unknown plan blob codec {codec}")
+
+        self.stats["decoded"] += 1
+        return loads(raw)
+
+    def decode_row(self, plan_blob: Optional[bytes], plan_data: Optional[str]) -> Dict[str, Any]:
+        """A plan from either column: rows written before plan_blob only have JSON text."""
+        if plan_blob is not None:
+            return self.decode(plan_blob)
+        self.stats["legacy_reads"] += 1
+        return loads(plan_data)
+
+    def codec_stats(self) -> Dict[str, Any]:
+        bytes_in = self.stats["bytes_in"]
+        return {
+            "codec": next(n for n, c in CODEC_NAMES.items() if c == self.codec),
+            "level": self.level,
+            "dict_id": self.dict_id,
+            "ratio": round(self.stats["bytes_out"] / bytes_in, 3) if bytes_in else None,
+            **self.stats,
+        }
+
+
+def read_dict_dir(path: Optional[str] = None) -> Dict[int, bytes]:
+    """Dictionaries saved as <id>.dict files by earlier versions."""
+    path = path or DICT_DIR
+    dicts: Dict[int, bytes] = {}
+    if not os.path.isdir(path):
+        return dicts
+    for name in os.listdir(path):
+        stem, ext = os.path.splitext(name)
+        if ext != ".dict" or not stem.isdigit():
+            continue
+        with open(os.path.join(path, name), "rb") as f:
+            dicts[int(stem)] = f.read()
+    return dicts
+
+
+def train_dict(samples: List[Dict[str, Any]], size: int = 16 * 1024) -> bytes:
+    """
+    A dictionary for these sample plans. With zstandard this is a trained
+    zstd dictionary; without it, the most recent samples concatenated (zlib
+    uses the last 32 KB of a dictionary as preset history).
+    """
+    raw = [dumps(s) for s in samples]
+    if zstandard is not None and len(raw) >= 8:
+        try:
+            return zstandard.train_dictionary(size, raw).as_bytes()
+        except zstandard.ZstdError as e:
+            print(f"[PlanCodec] zstd training failed ({e}); using raw samples")
+    return b"".join(raw)[-min(size, 32 * 1024):]
+
+
+_codec: Optional[PlanCodec] = None
+
+
+def get_codec() -> PlanCodec:
+    global _codec
+    if _codec is None:
+        _codec = PlanCodec()
+    return _codec
@@ -2,22 +2,75 @@
 from __future__ import annotations
 
 import os
-import sqlite3
+import base64
 import json
+import secrets
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Optional
 
-# Postgres support
-try:
-    import psycopg
-    from psycopg.rows import dict_row
-except ImportError:
-    psycopg = None
+from app.services import db
+
+# Columns copied out of the plan at write time so history reads never load plan JSON
+DENORMALIZED_COLUMNS = (("primary_lure", "TEXT"), ("secondary_lure", "TEXT"), ("lat", "REAL"), ("lon", "REAL"), ("lake_id", "TEXT"))
+
+# conditions is JSONB on Postgres and JSON text on SQLite; these fields get expression indexes
+CONDITIONS_INDEXES = ("phase",)
+
+# (name, Postgres columns, SQLite columns). Created at startup with IF NOT EXISTS
+# unless PLAN_HISTORY_AUTO_INDEX=0; migrate_plan_history_indexes.py builds them
+# CONCURRENTLY on a live Postgres instead.
+HISTORY_INDEXES = (
+    # Listings, counts and recent lures: user + is_deleted equality, newest first on (generation_date, id)
+    (
+        "idx_plan_history_user_live",
+        "(user_email, is_deleted, generation_date DESC, id DESC) INCLUDE (plan_link_id, lake_name, plan_type, primary_lure, secondary_lure)",
+        "(user_email, is_deleted, generation_date DESC, id DESC, plan_link_id, lake_name, plan_type, primary_lure, secondary_lure)",
+    ),
+    # Retention deletes walk this oldest-first
+    ("idx_plan_history_generation_date", "(generation_date)", "(generation_date)"),
+)
+# Superseded by idx_plan_history_user_live
+DROPPED_INDEXES = ("idx_user_email", "idx_plan_history_user_date")
+
+
+def encode_cursor(generation_date: str, plan_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{generation_date}|{plan_id}".encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """(generation_date, id) from a page cursor. Raises ValueError if it's malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    except Exception:
+        raise ValueError("Invalid cursor")
+    generation_date, sep, plan_id = raw.partition("|")
+    if not sep or not generation_date or not plan_id:
+        raise ValueError("Invalid cursor")
+    return generation_date, plan_id
+
 
 class PlanHistoryStore:
+    """
+    Per-user plan history (30 days, 10 visible plans per user; trimmed by
+    PlanRetentionWorker).
+
+    since=None on the read methods means the user's whole visible history:
+    whatever retention hasn't removed yet (PLAN_RETENTION_DAYS), not a fixed
+    30 days, so listings and counts agree with or without the count cache.
+
+    With PLAN_HISTORY_COUNT_CACHE on, visible-plan counts per user are kept in
+    plan_history_counts, updated in the same transaction as each insert and
+    delete, so count_user_plans is a primary-key read. Rows are seeded from a
+    COUNT the first time a user is read or written; migrate_plan_history_indexes.py
+    --rebuild-counts recomputes them all.
+    """
+
     def __init__(self, db_path: str = "data/plan_history.sqlite3"):
         self._pg_url = os.getenv("DATABASE_URL")
         self._use_pg = bool(self._pg_url and self._pg_url.startswith("postgres"))
+        self.auto_index = os.getenv("PLAN_HISTORY_AUTO_INDEX", "true").strip().lower() in ("1", "true", "yes", "on")
+        self.count_cache = os.getenv("PLAN_HISTORY_COUNT_CACHE", "false").strip().lower() in ("1", "true", "yes", "on")
+        self.aio = db.AsyncStore(self)  # awaitable view for async handlers
         
         if self._use_pg:
             self._init_pg()
@@ -28,10 +81,8 @@ class PlanHistoryStore:
 
     def _conn(self):
         if self._use_pg:
-            return psycopg.connect(self._pg_url, row_factory=dict_row)
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+            return db.connection(pg_url=self._pg_url)
+        return db.connection(sqlite_path=self.db_path)
 
     def _get_p(self) -> str:
         return "%s" if self._use_pg else "?"
@@ -46,14 +97,34 @@ class PlanHistoryStore:
                     lake_name TEXT NOT NULL,
                     generation_date TEXT NOT NULL,
                     plan_type TEXT NOT NULL,
-                    conditions TEXT NOT NULL,
+                    conditions JSONB NOT NULL,
                     is_deleted INTEGER DEFAULT 0,
                     created_at TEXT NOT NULL,
-                    expires_at TEXT NOT NULL
+                    expires_at TEXT NOT NULL,
+                    primary_lure TEXT,
+                    secondary_lure TEXT,
+                    lat REAL,
+                    lon REAL,
+                    lake_id TEXT
+                );
+            """)
+            # Tables created before conditions was JSONB (history is kept 30 days, so the rewrite is small)
+            col = conn.execute(
+                "SELECT data_type FROM information_schema.columns WHERE table_name = 'plan_history' AND column_name = 'conditions'"
+            ).fetchone()
+            if col and col["data_type"] != "jsonb":
+                conn.execute("ALTER TABLE plan_history ALTER COLUMN conditions TYPE JSONB USING conditions::jsonb")
+                print("[PlanHistory] Converted plan_history.conditions to JSONB")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS plan_history_counts (
+                    user_email TEXT PRIMARY KEY,
+                    visible INTEGER NOT NULL
                 );
             """)
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_user_email ON plan_history(user_email);")
             conn.commit()
+        self._add_denormalized_columns()
+        if self.auto_index:
+            self.ensure_indexes()
 
     def _init_db(self) -> None:
         with self._conn() as conn:
@@ -68,92 +139,427 @@ class PlanHistoryStore:
                     conditions TEXT NOT NULL,
                     is_deleted INTEGER DEFAULT 0,
                     created_at TEXT NOT NULL,
-                    expires_at TEXT NOT NULL
+                    expires_at TEXT NOT NULL,
+                    primary_lure TEXT,
+                    secondary_lure TEXT,
+                    lat REAL,
+                    lon REAL,
+                    lake_id TEXT
                 );
             """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS plan_history_counts (
+                    user_email TEXT PRIMARY KEY,
+                    visible INTEGER NOT NULL
+                );
+            """)
+            conn.commit()
+        self._add_denormalized_columns()
+        if self.auto_index:
+            self.ensure_indexes()
+
+    def _add_denormalized_columns(self) -> None:
+        """Add the lure/location columns and later indexes to tables created before they existed."""
+        with self._conn() as conn:
+            if self._use_pg:
+                for name, col_type in DENORMALIZED_COLUMNS:
+                    conn.execute(f"ALTER TABLE plan_history ADD COLUMN IF NOT EXISTS {name} {col_type}")
+            else:
+                existing = {row["name"] for row in conn.execute("PRAGMA table_info(plan_history)").fetchall()}
+                for name, col_type in DENORMALIZED_COLUMNS:
+                    if name not in existing:
+                        conn.execute(f"ALTER TABLE plan_history ADD COLUMN {name} {col_type}")
             conn.commit()
 
-    def add_plan(self, user_email: str, plan_link_id: str, lake_name: str, plan_type: str, conditions: dict) -> str:
+    def ensure_indexes(self, concurrently: bool = False) -> List[str]:
+        """
+        Create missing indexes and drop superseded ones. concurrently=True
+        (Postgres) builds them without blocking writes. Returns the statements run.
+        """
+        defs = [(name, pg if self._use_pg else lite) for name, pg, lite in HISTORY_INDEXES]
+        defs += [(f"idx_plan_history_{field}", f"(({self._cond(field)}))") for field in CONDITIONS_INDEXES]
+        how = " CONCURRENTLY" if concurrently and self._use_pg else ""
+        statements = [f"CREATE INDEX{how} IF NOT EXISTS {name} ON plan_history {cols}" for name, cols in defs]
+        statements += [f"DROP INDEX{how} IF EXISTS {name}" for name in DROPPED_INDEXES]
+
+        if how:
+            with db.pg_autocommit(self._pg_url) as conn:
+                for sql in statements:
+                    conn.execute(sql)
+        else:
+            with self._conn() as conn:
+                for sql in statements:
+                    conn.execute(sql)
+                conn.commit()
+        return statements
+
+    def _cond(self, field: str) -> str:
+        """SQL expression for one conditions field (matches the expression indexes)."""
+        if self._use_pg:
+            return f"conditions->>'{field}'"
+        return f"json_extract(conditions, '$.{field}')"
+
+    def add_plan(
+        self,
+        user_email: str,
+        plan_link_id: str,
+        lake_name: str,
+        plan_type: str,
+        conditions: dict,
+        primary_lure: Optional[str] = None,
+        secondary_lure: Optional[str] = None,
+    ) -> str:
         email = user_email.lower().strip()
         now = datetime.now(timezone.utc)
-        plan_id = f"plan_hist_{int(now.timestamp() * 1000)}"
+        # Random suffix: concurrent requests can land in the same millisecond
+        plan_id = f"plan_hist_{int(now.timestamp() * 1000)}_{secrets.token_hex(3)}"
         p = self._get_p()
         
-        self._cleanup_expired_plans()
-        self._enforce_user_limit(email, limit=10)
-        
         cond_json = json.dumps({
             "temp_low": conditions.get("temp_low"),
             "temp_high": conditions.get("temp_high"),
             "sky_condition": conditions.get("sky_condition", ""),
             "wind_speed": conditions.get("wind_speed", 0),
+            "phase": conditions.get("phase"),
         })
 
         with self._conn() as conn:
             conn.execute(
-                f"""INSERT INTO plan_history (id, user_email, plan_link_id, lake_name, generation_date, plan_type, conditions, is_deleted, created_at, expires_at)
-                VALUES ({p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}, {p})""",
-                (plan_id, email, plan_link_id, lake_name, now.isoformat(), plan_type, cond_json, 0, now.isoformat(), (now + timedelta(days=30)).isoformat())
+                f"""INSERT INTO plan_history (id, user_email, plan_link_id, lake_name, generation_date, plan_type, conditions, is_deleted, created_at, expires_at, primary_lure, secondary_lure, lat, lon, lake_id)
+                VALUES ({p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}, {p})""",
+                (plan_id, email, plan_link_id, lake_name, now.isoformat(), plan_type, cond_json, 0, now.isoformat(), (now + timedelta(days=30)).isoformat(),
+                 primary_lure, secondary_lure, conditions.get("latitude"), conditions.get("longitude"), conditions.get("lake_id"))
             )
+            if self.count_cache:
+                self._bump_count(conn, email, 1)
             conn.commit()
         return plan_id
 
-    def _enforce_user_limit(self, email: str, limit: int = 10) -> None:
+    # ----------------------------------------
+    # Cached per-user counts (PLAN_HISTORY_COUNT_CACHE)
+    # ----------------------------------------
+
+    def _bump_count(self, conn, email: str, delta: int) -> None:
+        """
+        Apply delta to the user's cached count. Called after the insert,
+        delete or hide in the same transaction, so a user without a row yet
+        is seeded from a COUNT that already includes this change. If a
+        concurrent _cached_count seeds the row first, the upsert waits for
+        it and adds delta on top instead of losing the change.
+        """
+        p = self._get_p()
+        cur = conn.execute(f"UPDATE plan_history_counts SET visible = visible + {p} WHERE user_email = {p}", (delta, email))
+        if cur.rowcount:
+            return
+        conn.execute(
+            f"""INSERT INTO plan_history_counts (user_email, visible)
+                SELECT {p}, COUNT(*) FROM plan_history WHERE user_email = {p} AND is_deleted = 0
+                ON CONFLICT (user_email) DO UPDATE SET visible = plan_history_counts.visible + {p}""",
+            (email, email, delta),
+        )
+
+    def _hidden_per_user(self, conn, ids: List[str]) -> Dict[str, int]:
+        """Visible rows per user among ids (read before they're hidden or deleted)."""
+        p = self._get_p()
+        placeholders = ",".join(p for _ in ids)
+        rows = conn.execute(
+            f"""SELECT user_email, COUNT(*) AS n FROM plan_history
+                WHERE id IN ({placeholders}) AND is_deleted = 0 GROUP BY user_email""",
+            list(ids),
+        ).fetchall()
+        return {row["user_email"]: row["n"] for row in rows}
+
+    def _cached_count(self, email: str) -> int:
         p = self._get_p()
         with self._conn() as conn:
-            rows = conn.execute(f"SELECT id FROM plan_history WHERE user_email = {p} AND is_deleted = 0 ORDER BY generation_date DESC", (email,)).fetchall()
-            if len(rows) >= limit:
-                ids_to_delete = [row["id"] for row in rows[limit-1:]]
-                if ids_to_delete:
-                    placeholders = ",".join(p for _ in ids_to_delete)
-                    conn.execute(f"UPDATE plan_history SET is_deleted = 1 WHERE id IN ({placeholders})", ids_to_delete)
-                    conn.commit()
+            row = conn.execute(f"SELECT visible FROM plan_history_counts WHERE user_email = {p}", (email,)).fetchone()
+            if row is None:
+                conn.execute(
+                    f"""INSERT INTO plan_history_counts (user_email, visible)
+                        SELECT {p}, COUNT(*) FROM plan_history WHERE user_email = {p} AND is_deleted = 0
+                        ON CONFLICT (user_email) DO NOTHING""",
+                    (email, email),
+                )
+                conn.commit()
+                row = conn.execute(f"SELECT visible FROM plan_history_counts WHERE user_email = {p}", (email,)).fetchone()
+        return max(row["visible"], 0) if row else 0
+
+    def rebuild_counts(self) -> int:
+        """Recompute every user's cached count. Returns the number of users."""
+        with self._conn() as conn:
+            conn.execute("DELETE FROM plan_history_counts")
+            conn.execute(
+                """INSERT INTO plan_history_counts (user_email, visible)
+                   SELECT user_email, COUNT(*) FROM plan_history WHERE is_deleted = 0 GROUP BY user_email"""
+            )
+            users = conn.execute("SELECT COUNT(*) AS n FROM plan_history_counts").fetchone()["n"]
+            conn.commit()
+        return users
 
-    def _cleanup_expired_plans(self) -> None:
-        cutoff = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
+    # ----------------------------------------
+    # Retention (run by PlanRetentionWorker, not on the write path)
+    # ----------------------------------------
+
+    def claim_expired(self, cutoff: datetime, batch_size: int = 500, archive=None) -> List[dict]:
+        """
+        Delete up to batch_size rows generated before cutoff, oldest first, and
+        return them. The rows come from DELETE ... RETURNING, so concurrent
+        workers never get the same row. archive(rows), if given, runs before
+        the commit: if it raises, the delete is rolled back.
+        """
+        p = self._get_p()
+        # Postgres: skip rows another worker's batch has locked instead of waiting for them.
+        # SQLite: the DELETE holds the write lock, so batches run one at a time.
+        lock = " FOR UPDATE SKIP LOCKED" if self._use_pg else ""
+        with self._conn() as conn:
+            rows = conn.execute(
+                f"""DELETE FROM plan_history WHERE id IN (
+                        SELECT id FROM plan_history WHERE generation_date < {p}
+                        ORDER BY generation_date LIMIT {p}{lock})
+                    RETURNING id, user_email, plan_link_id, lake_name, generation_date, plan_type, conditions, is_deleted,
+                              created_at, expires_at, primary_lure, secondary_lure, lat, lon""",
+                (cutoff.isoformat(), batch_size),
+            ).fetchall()
+            rows = [dict(row) for row in rows]
+            if rows and archive is not None:
+                archive(rows)
+            if self.count_cache:
+                hidden: Dict[str, int] = {}
+                for row in rows:
+                    if not row["is_deleted"]:
+                        hidden[row["user_email"]] = hidden.get(row["user_email"], 0) + 1
+                for email, n in hidden.items():
+                    self._bump_count(conn, email, -n)
+            conn.commit()
+        return rows
+
+    def delete_ids(self, ids: List[str]) -> int:
+        if not ids: return 0
         p = self._get_p()
+        placeholders = ",".join(p for _ in ids)
         with self._conn() as conn:
-            conn.execute(f"DELETE FROM plan_history WHERE generation_date < {p}", (cutoff,))
+            hidden = self._hidden_per_user(conn, ids) if self.count_cache else {}
+            deleted = conn.execute(f"DELETE FROM plan_history WHERE id IN ({placeholders})", list(ids)).rowcount
+            for email, n in hidden.items():
+                self._bump_count(conn, email, -n)
             conn.commit()
+        return max(deleted, 0)
+
+    def users_over_limit(self, limit: int = 10, batch_size: int = 500) -> List[str]:
+        """Emails with more than limit visible plans."""
+        p = self._get_p()
+        with self._conn() as conn:
+            rows = conn.execute(
+                f"""SELECT user_email FROM plan_history WHERE is_deleted = 0
+                    GROUP BY user_email HAVING COUNT(*) > {p} LIMIT {p}""",
+                (limit, batch_size),
+            ).fetchall()
+        return [row["user_email"] for row in rows]
+
+    def enforce_user_limit(self, email: str, limit: int = 10, batch_size: int = 500) -> int:
+        """Soft-delete the user's visible plans beyond the newest limit. Returns rows hidden."""
+        p = self._get_p()
+        with self._conn() as conn:
+            rows = conn.execute(
+                f"""SELECT id FROM plan_history WHERE user_email = {p} AND is_deleted = 0
+                    ORDER BY generation_date DESC, id DESC LIMIT {p} OFFSET {p}""",
+                (email, batch_size, limit),
+            ).fetchall()
+            ids = [row["id"] for row in rows]
+            if ids:
+                placeholders = ",".join(p for _ in ids)
+                conn.execute(f"UPDATE plan_history SET is_deleted = 1 WHERE id IN ({placeholders})", ids)
+                if self.count_cache:
+                    self._bump_count(conn, email, -len(ids))
+                conn.commit()
+        return len(ids)
+
+    _PLAN_COLUMNS = "id, user_email, plan_link_id, lake_name, generation_date, plan_type, conditions, is_deleted"
 
     def get_user_plans(self, email: str, since: Optional[datetime] = None, limit: int = 10, offset: int = 0, include_deleted: bool = False) -> List[dict]:
         email = email.lower().strip()
         limit = min(limit, 10)
-        if since is None: since = datetime.now(timezone.utc) - timedelta(days=30)
         p = self._get_p()
         
-        query = f"SELECT id, user_email, plan_link_id, lake_name, generation_date, plan_type, conditions, is_deleted, created_at, expires_at FROM plan_history WHERE user_email = {p} AND generation_date >= {p}"
-        params = [email, since.isoformat()]
+        query = f"SELECT {self._PLAN_COLUMNS} FROM plan_history WHERE user_email = {p}"
+        params: list = [email]
+        if since is not None:
+            query += f" AND generation_date >= {p}"
+            params.append(since.isoformat())
         if not include_deleted: query += " AND is_deleted = 0"
-        query += f" ORDER BY generation_date DESC LIMIT {p} OFFSET {p}"
+        query += f" ORDER BY generation_date DESC, id DESC LIMIT {p} OFFSET {p}"
         params.extend([limit, offset])
 
         with self._conn() as conn:
             rows = conn.execute(query, params).fetchall()
-        
-        plans = []
-        for row in rows:
-            try: cond = json.loads(row["conditions"])
+        return [self._plan_row(row) for row in rows]
+
+    def get_user_plans_page(
+        self,
+        email: str,
+        since: Optional[datetime] = None,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        include_deleted: bool = False,
+    ) -> Dict[str, object]:
+        """
+        Keyset page of the user's plans, newest first on (generation_date, id):
+        {"plans", "next_cursor"}, next_cursor None on the last page. Pass it
+        back as cursor for the next page. Raises ValueError on a bad cursor.
+        """
+        email = email.lower().strip()
+        limit = min(limit, 10)
+        p = self._get_p()
+
+        query = f"SELECT {self._PLAN_COLUMNS} FROM plan_history WHERE user_email = {p}"
+        params: list = [email]
+        if not include_deleted: query += " AND is_deleted = 0"
+        if since is not None:
+            query += f" AND generation_date >= {p}"
+            params.append(since.isoformat())
+        if cursor:
+            query += f" AND (generation_date, id) < ({p}, {p})"
+            params.extend(decode_cursor(cursor))
+        query += f" ORDER BY generation_date DESC, id DESC LIMIT {p}"
+        params.append(limit + 1)
+
+        with self._conn() as conn:
+            rows = conn.execute(query, params).fetchall()
+        plans = [self._plan_row(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = plans[-1]
+            next_cursor = encode_cursor(last["generation_date"], last["id"])
+        return {"plans": plans, "next_cursor": next_cursor}
+
+    def _plan_row(self, row) -> dict:
+        cond = row["conditions"]  # psycopg already decodes JSONB
+        if isinstance(cond, str):
+            try: cond = json.loads(cond)
             except: cond = {}
-            plans.append({"id": row["id"], "user_email": row["user_email"], "plan_link_id": row["plan_link_id"], "lake_name": row["lake_name"], "generation_date": row["generation_date"], "plan_type": row["plan_type"], "conditions": cond, "is_deleted": bool(row["is_deleted"])})
-        return plans
+        return {"id": row["id"], "user_email": row["user_email"], "plan_link_id": row["plan_link_id"], "lake_name": row["lake_name"], "generation_date": row["generation_date"], "plan_type": row["plan_type"], "conditions": cond, "is_deleted": bool(row["is_deleted"])}
 
     def count_user_plans(self, email: str, since: Optional[datetime] = None, include_deleted: bool = False) -> int:
-        if since is None: since = datetime.now(timezone.utc) - timedelta(days=30)
+        # since=None counts every visible plan, which is exactly what the cache holds
+        if self.count_cache and since is None and not include_deleted:
+            return self._cached_count(email.lower().strip())
         p = self._get_p()
-        query = f"SELECT COUNT(*) as count FROM plan_history WHERE user_email = {p} AND generation_date >= {p}"
-        params = [email.lower().strip(), since.isoformat()]
+        query = f"SELECT COUNT(*) as count FROM plan_history WHERE user_email = {p}"
+        params = [email.lower().strip()]
         if not include_deleted: query += " AND is_deleted = 0"
+        if since is not None:
+            query += f" AND generation_date >= {p}"
+            params.append(since.isoformat())
         with self._conn() as conn:
             result = conn.execute(query, params).fetchone()
             return result["count"] if result else 0
 
+    def get_recent_lures(self, email: str, since: datetime, limit: int = 3) -> List[dict]:
+        """
+        Newest-first lure/lake rows for the variety context, from the
+        denormalized columns only (one indexed query, no plan JSON).
+        """
+        p = self._get_p()
+        query = f"""SELECT lake_name, generation_date, primary_lure, secondary_lure FROM plan_history
+                    WHERE user_email = {p} AND is_deleted = 0 AND generation_date >= {p}
+                    ORDER BY generation_date DESC, id DESC LIMIT {p}"""
+        with self._conn() as conn:
+            rows = conn.execute(query, (email.lower().strip(), since.isoformat(), limit)).fetchall()
+        return [
+            {"lake_name": row["lake_name"], "generation_date": row["generation_date"], "primary_lure": row["primary_lure"], "secondary_lure": row["secondary_lure"]}
+            for row in rows
+        ]
+
+    def backfill_denormalized(self, load_plans, batch_size: int = 200) -> Dict[str, int]:
+        """
+        Fill primary_lure/secondary_lure/lat/lon/lake_id for rows written before
+        those columns existed. load_plans(tokens) -> {token: plan dict}.
+        Returns {"scanned", "updated", "missing"} counts.
+        """
+        p = self._get_p()
+        counts = {"scanned": 0, "updated": 0, "missing": 0}
+        last_id = ""
+        while True:
+            with self._conn() as conn:
+                rows = conn.execute(
+                    f"""SELECT id, plan_link_id FROM plan_history
+                        WHERE primary_lure IS NULL AND lat IS NULL AND id > {p}
+                        ORDER BY id LIMIT {p}""",
+                    (last_id, batch_size),
+                ).fetchall()
+            if not rows:
+                return counts
+            last_id = rows[-1]["id"]
+            counts["scanned"] += len(rows)
+
+            plans = load_plans([row["plan_link_id"] for row in rows])
+            updates = []
+            for row in rows:
+                plan = plans.get(row["plan_link_id"])
+                if plan is None:
+                    counts["missing"] += 1
+                    continue
+                cond = plan.get("conditions") or {}
+                updates.append((
+                    (plan.get("primary") or {}).get("base_lure"),
+                    (plan.get("secondary") or {}).get("base_lure"),
+                    cond.get("latitude"),
+                    cond.get("longitude"),
+                    cond.get("lake_id"),
+                    row["id"],
+                ))
+            if updates:
+                with self._conn() as conn:
+                    cur = conn.cursor()
+                    cur.executemany(
+                        f"UPDATE plan_history SET primary_lure = {p}, secondary_lure = {p}, lat = {p}, lon = {p}, lake_id = {p} WHERE id = {p}",
+                        updates,
+                    )
+                    conn.commit()
+                counts["updated"] += len(updates)
+
+    def top_lakes(self, since: Optional[datetime] = None, limit: int = 50) -> List[dict]:
+        """
+        Most-planned lakes since the cutoff (all users, deleted rows included):
+        [{"lake_id", "lake_name", "plans", "plan_link_id", "lat", "lon"}].
+
+        Plans group by catalog lake_id, never by name: "Clear Lake" in two
+        states is two lakes. Plans without a lake_id group by their exact
+        point, which the caller collapses per weather grid cell. lat/lon is
+        the lake's most-planned point, never an average of several (None
+        before backfill; plan_link_id is one plan to look the point up in).
+        """
+        if since is None: since = datetime.now(timezone.utc) - timedelta(days=14)
+        p = self._get_p()
+        # Legacy rows with no id and no coordinates can only group by name
+        query = f"""SELECT lake_id, lat, lon, MAX(lake_name) AS lake_name, COUNT(*) AS plans, MAX(plan_link_id) AS plan_link_id
+                    FROM plan_history WHERE generation_date >= {p}
+                    GROUP BY lake_id, lat, lon, CASE WHEN lake_id IS NULL AND lat IS NULL THEN LOWER(lake_name) END
+                    ORDER BY plans DESC LIMIT {p}"""
+        with self._conn() as conn:
+            # One lake can span several points; over-fetch so merging them still fills limit
+            rows = conn.execute(query, (since.isoformat(), limit * 10)).fetchall()
+
+        lakes: Dict[tuple, dict] = {}
+        for row in rows:
+            key = ("id", row["lake_id"]) if row["lake_id"] else ("point", row["lat"], row["lon"], row["lake_name"].lower())
+            lake = lakes.get(key)
+            if lake is None:
+                # Rows come most-planned first, so the first point is the lake's busiest
+                lakes[key] = {"lake_id": row["lake_id"], "lake_name": row["lake_name"], "plans": row["plans"],
+                              "plan_link_id": row["plan_link_id"], "lat": row["lat"], "lon": row["lon"]}
+            else:
+                lake["plans"] += row["plans"]
+        return sorted(lakes.values(), key=lambda lake: lake["plans"], reverse=True)[:limit]
+
     def soft_delete_plan(self, plan_id: str, user_email: str) -> bool:
         p = self._get_p()
         with self._conn() as conn:
             row = conn.execute(f"SELECT user_email FROM plan_history WHERE id = {p}", (plan_id,)).fetchone()
             if not row or row["user_email"] != user_email.lower().strip(): return False
-            conn.execute(f"UPDATE plan_history SET is_deleted = 1 WHERE id = {p}", (plan_id,))
+            hidden = conn.execute(f"UPDATE plan_history SET is_deleted = 1 WHERE id = {p} AND is_deleted = 0", (plan_id,)).rowcount
+            if self.count_cache and hidden > 0:
+                self._bump_count(conn, row["user_email"], -1)
             conn.commit()
             return True
 
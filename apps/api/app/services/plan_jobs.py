@@ -0,0 +1,404 @@
+# apps/api/app/services/plan_jobs.py
+"""
+Asynchronous plan-generation jobs.
+
+POST /plan/generate?async=1 records a job and returns 202 right away; a small
+asyncio worker pool claims queued jobs from the plan_jobs table and runs the
+normal weather + LLM + persistence pipeline. Results are persisted through
+PlanLinkStore, so a finished job only stores the plan token.
+
+The queue lives in the database (Postgres via DATABASE_URL, SQLite locally),
+so queued jobs survive a restart. A running job's worker refreshes its
+heartbeat_at every few seconds; a job whose heartbeat stops (dead worker) is
+re-queued once it goes stale, however long a live job takes.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import secrets
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.services import db
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised by PlanJobQueue.submit when the pending backlog is at capacity."""
+
+
+class PermanentJobError(Exception):
+    """Job failure that retrying won't fix (access denied, bad request)."""
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+class PlanJobStore:
+    """
+    Durable job records / queue table.
+    Supports both SQLite (local) and Postgres (Render).
+    """
+
+    def __init__(self, path: str = "data/plan_jobs.sqlite3"):
+        self._pg_url = os.getenv("DATABASE_URL")
+        self._use_pg = bool(self._pg_url and self._pg_url.startswith("postgres"))
+        self.aio = db.AsyncStore(self)  # awaitable view for async handlers
+
+        if self._use_pg:
+            self._init_pg()
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.path = path
+            self._init_db()
+
+    def _conn(self):
+        if self._use_pg:
+            return db.connection(pg_url=self._pg_url)
+        return db.connection(sqlite_path=self.path)
+
+    def _get_p(self) -> str:
+        return "%s" if self._use_pg else "?"
+
+    def _init_pg(self) -> None:
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS plan_jobs (
+                    id TEXT PRIMARY KEY,
+                    email TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    request_data TEXT NOT NULL,
+                    result_token TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    created_at INTEGER NOT NULL,
+                    started_at INTEGER,
+                    finished_at INTEGER,
+                    heartbeat_at INTEGER
+                );
+            """)
+            conn.execute("ALTER TABLE plan_jobs ADD COLUMN IF NOT EXISTS heartbeat_at INTEGER")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_plan_jobs_status_created ON plan_jobs(status, created_at);")
+            conn.commit()
+
+    def _init_db(self) -> None:
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS plan_jobs (
+                    id TEXT PRIMARY KEY,
+                    email TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    request_data TEXT NOT NULL,
+                    result_token TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    created_at INTEGER NOT NULL,
+                    started_at INTEGER,
+                    finished_at INTEGER,
+                    heartbeat_at INTEGER
+                );
+            """)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(plan_jobs)").fetchall()}
+            if "heartbeat_at" not in existing:
+                conn.execute("ALTER TABLE plan_jobs ADD COLUMN heartbeat_at INTEGER")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_plan_jobs_status_created ON plan_jobs(status, created_at);")
+            conn.commit()
+
+    @staticmethod
+    def _row_to_job(row) -> Dict[str, Any]:
+        job = dict(row)
+        job["request"] = json.loads(job.pop("request_data"))
+        return job
+
+    def enqueue(self, email: str, request_data: Dict[str, Any]) -> str:
+        job_id = secrets.token_urlsafe(16)
+        p = self._get_p()
+        with self._conn() as conn:
+            conn.execute(
+                f"""INSERT INTO plan_jobs (id, email, status, request_data, created_at)
+                    VALUES ({p}, {p}, {p}, {p}, {p})""",
+                (job_id, email.lower().strip(), JOB_QUEUED, json.dumps(request_data), int(time.time())),
+            )
+            conn.commit()
+        return job_id
+
+    def claim_next(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running and return it."""
+        p = self._get_p()
+        skip_locked = "FOR UPDATE SKIP LOCKED" if self._use_pg else ""
+        now = int(time.time())
+        with self._conn() as conn:
+            row = conn.execute(
+                f"""UPDATE plan_jobs
+                    SET status={p}, worker_id={p}, started_at={p}, heartbeat_at={p}, attempts = attempts + 1
+                    WHERE id = (
+                        SELECT id FROM plan_jobs WHERE status={p}
+                        ORDER BY created_at ASC LIMIT 1 {skip_locked}
+                    ) AND status={p}
+                    RETURNING *""",
+                (JOB_RUNNING, worker_id, now, now, JOB_QUEUED, JOB_QUEUED),
+            ).fetchone()
+            conn.commit()
+        return self._row_to_job(row) if row else None
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Mark a running job as still alive. False if it is no longer this worker's."""
+        p = self._get_p()
+        with self._conn() as conn:
+            cursor = conn.execute(
+                f"UPDATE plan_jobs SET heartbeat_at={p} WHERE id={p} AND worker_id={p} AND status={p}",
+                (int(time.time()), job_id, worker_id, JOB_RUNNING),
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def complete(self, job_id: str, result_token: str) -> None:
+        p = self._get_p()
+        with self._conn() as conn:
+            conn.execute(
+                f"UPDATE plan_jobs SET status={p}, result_token={p}, error=NULL, finished_at={p} WHERE id={p}",
+                (JOB_SUCCEEDED, result_token, int(time.time()), job_id),
+            )
+            conn.commit()
+
+    def fail(self, job_id: str, error: str, retry: bool = False) -> None:
+        """Record a failure; retry=True puts the job back in the queue."""
+        p = self._get_p()
+        status = JOB_QUEUED if retry else JOB_FAILED
+        finished_at = None if retry else int(time.time())
+        with self._conn() as conn:
+            conn.execute(
+                f"UPDATE plan_jobs SET status={p}, error={p}, worker_id=NULL, finished_at={p} WHERE id={p}",
+                (status, error[:500], finished_at, job_id),
+            )
+            conn.commit()
+
+    def requeue_stale(self, stale_after_seconds: int, max_attempts: int) -> int:
+        """
+        Running jobs with no heartbeat for stale_after_seconds belong to a
+        worker that died (deploy, crash). Re-queue them, or fail them once out
+        of attempts.
+        """
+        p = self._get_p()
+        cutoff = int(time.time()) - stale_after_seconds
+        with self._conn() as conn:
+            failed = conn.execute(
+                f"""UPDATE plan_jobs SET status={p}, error={p}, finished_at={p}
+                    WHERE status={p} AND COALESCE(heartbeat_at, started_at) < {p} AND attempts >= {p}""",
+                (JOB_FAILED, "worker lost", int(time.time()), JOB_RUNNING, cutoff, max_attempts),
+            ).rowcount
+            requeued = conn.execute(
+                f"""UPDATE plan_jobs SET status={p}, worker_id=NULL
+                    WHERE status={p} AND COALESCE(heartbeat_at, started_at) < {p}""",
+                (JOB_QUEUED, JOB_RUNNING, cutoff),
+            ).rowcount
+            conn.commit()
+        if requeued or failed:
+            print(f"[PlanJobs] Re-queued {requeued} stale job(s), failed {failed}")
+        return max(requeued, 0)
+
+    def release_worker(self, worker_id: str) -> None:
+        """Put a stopping worker's in-flight jobs back in the queue."""
+        p = self._get_p()
+        with self._conn() as conn:
+            conn.execute(
+                f"UPDATE plan_jobs SET status={p}, worker_id=NULL WHERE status={p} AND worker_id={p}",
+                (JOB_QUEUED, JOB_RUNNING, worker_id),
+            )
+            conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        p = self._get_p()
+        with self._conn() as conn:
+            row = conn.execute(f"SELECT * FROM plan_jobs WHERE id={p}", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def count_by_status(self) -> Dict[str, int]:
+        with self._conn() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS count FROM plan_jobs GROUP BY status").fetchall()
+        return {row["status"]: row["count"] for row in rows}
+
+    def count_pending(self) -> int:
+        p = self._get_p()
+        with self._conn() as conn:
+            row = conn.execute(
+                f"SELECT COUNT(*) AS count FROM plan_jobs WHERE status IN ({p}, {p})",
+                (JOB_QUEUED, JOB_RUNNING),
+            ).fetchone()
+        return row["count"] if row else 0
+
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[str]]
+
+
+class PlanJobQueue:
+    """
+    Bounded asyncio worker pool over PlanJobStore.
+    Configured from env:
+      PLAN_JOB_WORKERS          concurrent jobs per process (default: 4)
+      PLAN_JOB_MAX_PENDING      queued+running jobs before submit() refuses (default: 200)
+      PLAN_JOB_MAX_ATTEMPTS     attempts before a job is failed (default: 3)
+      PLAN_JOB_HEARTBEAT_SECONDS  how often a running job's heartbeat is refreshed (default: 15)
+      PLAN_JOB_STALE_SECONDS    time without a heartbeat after which a job is presumed lost
+                                (default: 120, at least 3 heartbeats)
+      PLAN_JOB_POLL_SECONDS     idle poll interval for jobs from other processes (default: 1)
+    """
+
+    def __init__(self, store: PlanJobStore):
+        self.store = store
+        self.workers = max(_env_int("PLAN_JOB_WORKERS", 4), 1)
+        self.max_pending = _env_int("PLAN_JOB_MAX_PENDING", 200)
+        self.max_attempts = _env_int("PLAN_JOB_MAX_ATTEMPTS", 3)
+        self.heartbeat_seconds = max(_env_int("PLAN_JOB_HEARTBEAT_SECONDS", 15), 1)
+        # A couple of missed heartbeats (slow DB, busy loop) must not look like a dead worker
+        self.stale_seconds = max(_env_int("PLAN_JOB_STALE_SECONDS", 120), self.heartbeat_seconds * 3)
+        self.poll_seconds = float(_env_int("PLAN_JOB_POLL_SECONDS", 1))
+
+        self._handler: Optional[JobHandler] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._instance = uuid.uuid4().hex[:8]
+        self._counters = {"submitted": 0, "rejected": 0, "succeeded": 0, "failed": 0, "retried": 0, "heartbeat_errors": 0, "complete_retries": 0}
+        self._busy = 0
+
+    async def submit(self, email: str, request_data: Dict[str, Any]) -> str:
+        """Record a job, or raise QueueFullError when the backlog is full (backpressure)."""
+        if await self.store.aio.count_pending() >= self.max_pending:
+            self._counters["rejected"] += 1
+            raise QueueFullError("Plan queue is full")
+        job_id = await self.store.aio.enqueue(email, request_data)
+        self._counters["submitted"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def start(self, handler: JobHandler) -> None:
+        self._handler = handler
+        self._wakeup = asyncio.Event()
+        await self.store.aio.requeue_stale(self.stale_seconds, self.max_attempts)
+        self._tasks = [
+            asyncio.create_task(self._worker(f"{self._instance}-{i}"))
+            for i in range(self.workers)
+        ]
+        print(f"[PlanJobs] {self.workers} worker(s) started (max_pending={self.max_pending})")
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _worker(self, worker_id: str) -> None:
+        last_stale_check = time.time()
+        while True:
+            try:
+                if time.time() - last_stale_check > self.stale_seconds / 2:
+                    await self.store.aio.requeue_stale(self.stale_seconds, self.max_attempts)
+                    last_stale_check = time.time()
+
+                job = await self.store.aio.claim_next(worker_id)
+                if job is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self._run(job, worker_id)
+            except asyncio.CancelledError:
+                self.store.release_worker(worker_id)
+                raise
+            except Exception as e:
+                print(f"[PlanJobs] Worker {worker_id} error: {e}")
+                await asyncio.sleep(self.poll_seconds)
+
+    async def _heartbeat(self, job_id: str, worker_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                if not await self.store.aio.heartbeat(job_id, worker_id):
+                    print(f"[PlanJobs] {job_id} is no longer held by {worker_id}")
+                    return
+            except Exception as e:
+                self._counters["heartbeat_errors"] += 1
+                print(f"[PlanJobs] Heartbeat for {job_id} failed: {e}")
+
+    async def _complete(self, job_id: str, token: str, heartbeat: asyncio.Task) -> None:
+        """
+        Record the result, retrying with backoff while the heartbeat still
+        holds the job. If this gave up at the first error, the job would sit
+        in running with no heartbeat, and requeue_stale would run a job that
+        already succeeded again (a second plan and a second daily slot).
+        """
+        deadline = time.time() + self.stale_seconds
+        delay = 0.5
+        while True:
+            try:
+                await self.store.aio.complete(job_id, token)
+                return
+            except Exception as e:
+                if heartbeat.done() or time.time() + delay > deadline:
+                    raise
+                self._counters["complete_retries"] += 1
+                print(f"[PlanJobs] Completing {job_id} failed, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.heartbeat_seconds)
+
+    async def _run(self, job: Dict[str, Any], worker_id: str) -> None:
+        job_id = job["id"]
+        t0 = time.time()
+        self._busy += 1
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, worker_id))
+        try:
+            try:
+                token = await self._handler(job)
+            except PermanentJobError as e:
+                await self.store.aio.fail(job_id, str(e))
+                self._counters["failed"] += 1
+                print(f"[PlanJobs] {job_id} failed: {e}")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                retry = job["attempts"] < self.max_attempts
+                await self.store.aio.fail(job_id, f"{type(e).__name__}: {e}", retry=retry)
+                self._counters["retried" if retry else "failed"] += 1
+                print(f"[PlanJobs] {job_id} attempt {job['attempts']} failed ({'retrying' if retry else 'giving up'}): {e}")
+                return
+
+            # The heartbeat keeps running until the result is recorded
+            await self._complete(job_id, token, heartbeat)
+            self._counters["succeeded"] += 1
+            print(f"[PlanJobs] {job_id} done in {round(time.time() - t0, 2)}s by {worker_id}")
+        finally:
+            heartbeat.cancel()
+            self._busy -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            by_status = self.store.count_by_status()
+        except Exception:
+            by_status = {}
+        return {
+            "workers": len(self._tasks),
+            "busy_workers": self._busy,
+            "stale_seconds": self.stale_seconds,
+            "max_pending": self.max_pending,
+            **self._counters,
+            "by_status": by_status,
+        }
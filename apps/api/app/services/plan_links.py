@@ -1,24 +1,70 @@
 # apps/api/app/services/plan_links.py
 from __future__ import annotations
 
+import asyncio
 import os
-import sqlite3
-import secrets
 import json
+import secrets
+import threading
 import time
 from typing import Optional, Dict, Any
 
-# Postgres support
-try:
-    import psycopg
-    from psycopg.rows import dict_row
-except ImportError:
-    psycopg = None
+from app.services import db
+from app.services.plan_codec import get_codec, read_dict_dir
+
+# Fields copied from the plan into plan_links.summary (JSONB on Postgres, JSON
+# text on SQLite) so listings and lookups never decode the plan body
+SUMMARY_FIELDS = ("location_name", "lake_id", "phase", "primary_lure", "secondary_lure", "latitude", "longitude")
+# Summary fields with an expression index
+SUMMARY_INDEXES = ("location_name", "phase", "primary_lure")
+
+
+def plan_summary(plan: Dict[str, Any]) -> Dict[str, Any]:
+    conditions = plan.get("conditions") or {}
+    return {
+        "location_name": conditions.get("location_name"),
+        "lake_id": conditions.get("lake_id"),
+        "phase": conditions.get("phase") or plan.get("phase"),
+        "primary_lure": (plan.get("primary") or {}).get("base_lure"),
+        "secondary_lure": (plan.get("secondary") or {}).get("base_lure"),
+        "latitude": conditions.get("latitude"),
+        "longitude": conditions.get("longitude"),
+    }
+
 
 class PlanLinkStore:
+    """
+    Shareable plan links.
+
+    Plan bodies are stored in plan_blob through the plan codec (compressed,
+    header-tagged; see plan_codec.py). Rows written before that column existed
+    keep their JSON text in plan_data and are read from there. Codec
+    dictionaries are kept in plan_codec_dicts next to the rows, so any
+    instance can decode any blob.
+
+    A small summary document (SUMMARY_FIELDS) sits next to the body; methods
+    that only need those fields select them with _field() and skip the body.
+
+    View counts are write-behind by default: get_plan adds to an in-memory
+    tally and flush_views writes the tallies back in one batched UPDATE
+    (every PLAN_VIEWS_FLUSH_SECONDS and at shutdown), so reads never take a
+    row lock. PLAN_VIEWS_MODE=exact restores the per-read UPDATE.
+    """
+
     def __init__(self, path: str = "data/plan_links.sqlite3"):
+        self.views_exact = os.getenv("PLAN_VIEWS_MODE", "batched").strip().lower() == "exact"
+        try:
+            self.views_flush_seconds = float(os.getenv("PLAN_VIEWS_FLUSH_SECONDS", "").strip() or 10)
+        except ValueError:
+            self.views_flush_seconds = 10.0
+        self._pending_views: Dict[str, int] = {}
+        self._views_lock = threading.Lock()
+        self._view_stats = {"counted": 0, "flushes": 0, "flushed_views": 0, "flush_errors": 0}
+
         self._pg_url = os.getenv("DATABASE_URL")
         self._use_pg = bool(self._pg_url and self._pg_url.startswith("postgres"))
+        self.aio = db.AsyncStore(self)  # awaitable view for async handlers
+        self.codec = get_codec()
         
         if self._use_pg:
             self._init_pg()
@@ -26,13 +72,12 @@ class PlanLinkStore:
             os.makedirs(os.path.dirname(path), exist_ok=True)
             self.path = path
             self._init_db()
+        self._load_codec_dicts()
 
     def _conn(self):
         if self._use_pg:
-            return psycopg.connect(self._pg_url, row_factory=dict_row)
-        conn = sqlite3.connect(self.path)
-        conn.row_factory = sqlite3.Row
-        return conn
+            return db.connection(pg_url=self._pg_url)
+        return db.connection(sqlite_path=self.path)
 
     def _get_placeholder(self) -> str:
         return "%s" if self._use_pg else "?"
@@ -46,11 +91,23 @@ class PlanLinkStore:
                     is_member INTEGER NOT NULL,
                     plan_data TEXT NOT NULL,
                     created_at INTEGER NOT NULL,
-                    views INTEGER DEFAULT 0
+                    views INTEGER DEFAULT 0,
+                    plan_blob BYTEA,
+                    summary JSONB
                 );
             """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS plan_codec_dicts (
+                    dict_id INTEGER PRIMARY KEY,
+                    data BYTEA NOT NULL,
+                    created_at INTEGER NOT NULL
+                );
+            """)
+            conn.execute("ALTER TABLE plan_links ADD COLUMN IF NOT EXISTS plan_blob BYTEA")
+            conn.execute("ALTER TABLE plan_links ADD COLUMN IF NOT EXISTS summary JSONB")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_plan_links_email ON plan_links(email);")
             conn.commit()
+        self._create_summary_indexes()
 
     def _init_db(self) -> None:
         with self._conn() as conn:
@@ -61,11 +118,75 @@ class PlanLinkStore:
                     is_member INTEGER NOT NULL,
                     plan_data TEXT NOT NULL,
                     created_at INTEGER NOT NULL,
-                    views INTEGER DEFAULT 0
+                    views INTEGER DEFAULT 0,
+                    plan_blob BLOB,
+                    summary TEXT
+                );
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS plan_codec_dicts (
+                    dict_id INTEGER PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    created_at INTEGER NOT NULL
                 );
             """)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(plan_links)").fetchall()}
+            if "plan_blob" not in existing:
+                conn.execute("ALTER TABLE plan_links ADD COLUMN plan_blob BLOB")
+            if "summary" not in existing:
+                conn.execute("ALTER TABLE plan_links ADD COLUMN summary TEXT")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_plan_links_email ON plan_links(email);")
             conn.commit()
+        self._create_summary_indexes()
+
+    def _create_summary_indexes(self) -> None:
+        with self._conn() as conn:
+            for field in SUMMARY_INDEXES:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_plan_links_{field} ON plan_links(({self._field(field)}));")
+            conn.commit()
+
+    def _load_codec_dicts(self) -> None:
+        p = self._get_placeholder()
+        local = read_dict_dir()
+        with self._conn() as conn:
+            if local:
+                # Dictionaries from before the table existed, so rows encoded with them stay readable
+                cur = conn.cursor()
+                cur.executemany(
+                    f"""INSERT INTO plan_codec_dicts (dict_id, data, created_at) VALUES ({p}, {p}, {p})
+                        ON CONFLICT(dict_id) DO NOTHING""",
+                    [(dict_id, data, int(time.time())) for dict_id, data in local.items()],
+                )
+                conn.commit()
+            rows = conn.execute("SELECT dict_id, data FROM plan_codec_dicts").fetchall()
+        self.codec.dict_loader = self.get_codec_dict
+        self.codec.load_dicts({row["dict_id"]: bytes(row["data"]) for row in rows})
+
+    def get_codec_dict(self, dict_id: int) -> Optional[bytes]:
+        p = self._get_placeholder()
+        with self._conn() as conn:
+            row = conn.execute(f"SELECT data FROM plan_codec_dicts WHERE dict_id={p}", (dict_id,)).fetchone()
+        return bytes(row["data"]) if row else None
+
+    def add_codec_dict(self, data: bytes) -> int:
+        """Store a new dictionary under the next id and start encoding with it here."""
+        p = self._get_placeholder()
+        with self._conn() as conn:
+            row = conn.execute(
+                f"""INSERT INTO plan_codec_dicts (dict_id, data, created_at)
+                    SELECT COALESCE(MAX(dict_id), 0) + 1, {p}, {p} FROM plan_codec_dicts
+                    RETURNING dict_id""",
+                (data, int(time.time())),
+            ).fetchone()
+            conn.commit()
+        self.codec.load_dicts({row["dict_id"]: data})
+        return row["dict_id"]
+
+    def _field(self, name: str) -> str:
+        """SQL expression for one summary field (matches the expression indexes)."""
+        if self._use_pg:
+            return f"summary->>'{name}'"
+        return f"json_extract(summary, '$.{name}')"
 
     def generate_token(self) -> str:
         return secrets.token_urlsafe(32)
@@ -76,52 +197,261 @@ class PlanLinkStore:
         
         with self._conn() as conn:
             conn.execute(
-                f"INSERT INTO plan_links (token, email, is_member, plan_data, created_at) VALUES ({p}, {p}, {p}, {p}, {p});",
-                (token, email.lower().strip(), 1 if is_member else 0, json.dumps(plan_data), int(time.time())),
+                # plan_data stays NOT NULL for older readers; '' means "see plan_blob"
+                f"INSERT INTO plan_links (token, email, is_member, plan_data, plan_blob, summary, created_at) VALUES ({p}, {p}, {p}, '', {p}, {p}, {p});",
+                (token, email.lower().strip(), 1 if is_member else 0, self.codec.encode(plan_data),
+                 json.dumps(plan_summary(plan_data)), int(time.time())),
             )
             conn.commit()
         return token
 
-    def get_plan(self, token: str) -> Optional[Dict[str, Any]]:
+    def get_plan(self, token: str, count_view: bool = True) -> Optional[Dict[str, Any]]:
         p = self._get_placeholder()
         with self._conn() as conn:
             row = conn.execute(
-                f"SELECT email, is_member, plan_data, created_at, views FROM plan_links WHERE token={p}",
+                f"SELECT email, is_member, plan_data, plan_blob, created_at, views FROM plan_links WHERE token={p}",
                 (token,),
             ).fetchone()
             
             if not row: return None
             
-            conn.execute(f"UPDATE plan_links SET views = views + 1 WHERE token={p}", (token,))
-            conn.commit()
-            
-            return {
-                "email": row["email"],
-                "is_member": bool(row["is_member"]),
-                "plan": json.loads(row["plan_data"]),
-                "created_at": row["created_at"],
-                "views": row["views"] + 1,
-            }
+            views = row["views"]
+            if count_view and self.views_exact:
+                conn.execute(f"UPDATE plan_links SET views = views + 1 WHERE token={p}", (token,))
+                conn.commit()
+                views += 1
+        
+        if count_view and not self.views_exact:
+            with self._views_lock:
+                self._pending_views[token] = self._pending_views.get(token, 0) + 1
+                self._view_stats["counted"] += 1
+        views += self._pending_views.get(token, 0)
+        
+        return {
+            "email": row["email"],
+            "is_member": bool(row["is_member"]),
+            "plan": self.codec.decode_row(row["plan_blob"], row["plan_data"]),
+            "created_at": row["created_at"],
+            "views": views,
+        }
+
+    def peek(self, token: str) -> Optional[Dict[str, Any]]:
+        """Read-only lookup for internal callers: never counts a view."""
+        return self.get_plan(token, count_view=False)
+
+    # ----------------------------------------
+    # Write-behind view counts
+    # ----------------------------------------
+
+    def flush_views(self) -> int:
+        """Write pending view tallies in one batch. Returns the number of views written."""
+        with self._views_lock:
+            pending, self._pending_views = self._pending_views, {}
+        if not pending:
+            return 0
+
+        p = self._get_placeholder()
+        try:
+            with self._conn() as conn:
+                cur = conn.cursor()
+                cur.executemany(
+                    f"UPDATE plan_links SET views = views + {p} WHERE token = {p}",
+                    [(n, token) for token, n in pending.items()],
+                )
+                conn.commit()
+        except Exception:
+            # Keep the tallies for the next flush
+            with self._views_lock:
+                for token, n in pending.items():
+                    self._pending_views[token] = self._pending_views.get(token, 0) + n
+                self._view_stats["flush_errors"] += 1
+            raise
+
+        flushed = sum(pending.values())
+        self._view_stats["flushes"] += 1
+        self._view_stats["flushed_views"] += flushed
+        return flushed
+
+    async def run_view_flusher(self) -> None:
+        """Flush view tallies on an interval; cancel it and call flush_views() at shutdown."""
+        if self.views_exact:
+            return
+        while True:
+            await asyncio.sleep(self.views_flush_seconds)
+            try:
+                await self.aio.flush_views()
+            except Exception as e:
+                print(f"[PlanLinks] View flush failed: {e}")
+
+    def view_stats(self) -> Dict[str, Any]:
+        with self._views_lock:
+            pending_tokens = len(self._pending_views)
+            pending_views = sum(self._pending_views.values())
+        return {
+            "mode": "exact" if self.views_exact else "batched",
+            "flush_seconds": self.views_flush_seconds,
+            "pending_tokens": pending_tokens,
+            "pending_views": pending_views,
+            **self._view_stats,
+        }
 
     def get_user_plans(self, email: str, limit: int = 10) -> list[Dict[str, Any]]:
         p = self._get_placeholder()
         with self._conn() as conn:
             rows = conn.execute(
-                f"SELECT token, is_member, plan_data, created_at, views FROM plan_links WHERE email={p} ORDER BY created_at DESC LIMIT {p}",
+                f"""SELECT token, is_member, created_at, views, summary IS NULL AS no_summary,
+                           {self._field("location_name")} AS location_name
+                    FROM plan_links WHERE email={p} ORDER BY created_at DESC LIMIT {p}""",
                 (email.lower().strip(), limit),
             ).fetchall()
-            
-            results = []
+
+        # Rows from before the summary column: read the location from the body
+        legacy = self.get_plans([row["token"] for row in rows if row["no_summary"]])
+
+        results = []
+        for row in rows:
+            location = row["location_name"]
+            if row["token"] in legacy:
+                location = (legacy[row["token"]].get("conditions") or {}).get("location_name")
+            results.append({
+                "token": row["token"],
+                "is_member": bool(row["is_member"]),
+                "created_at": row["created_at"],
+                "views": row["views"] + self._pending_views.get(row["token"], 0),
+                "location": location or "Unknown",
+            })
+        return results
+
+    def get_plans(self, tokens: list[str]) -> Dict[str, Dict[str, Any]]:
+        """Plan bodies keyed by token, in one query (no view counting)."""
+        if not tokens: return {}
+        p = self._get_placeholder()
+        placeholders = ",".join(p for _ in tokens)
+        with self._conn() as conn:
+            rows = conn.execute(
+                f"SELECT token, plan_data, plan_blob FROM plan_links WHERE token IN ({placeholders})",
+                list(tokens),
+            ).fetchall()
+
+        plans = {}
+        for row in rows:
+            try:
+                plans[row["token"]] = self.codec.decode_row(row["plan_blob"], row["plan_data"])
+            except ValueError:
+                continue
+        return plans
+
+    def get_locations(self, tokens: list[str]) -> Dict[str, tuple[float, float]]:
+        """(latitude, longitude) stored in each plan's conditions, keyed by token."""
+        if not tokens: return {}
+        p = self._get_placeholder()
+        placeholders = ",".join(p for _ in tokens)
+        with self._conn() as conn:
+            rows = conn.execute(
+                f"""SELECT token, summary IS NULL AS no_summary,
+                           {self._field("latitude")} AS lat, {self._field("longitude")} AS lon
+                    FROM plan_links WHERE token IN ({placeholders})""",
+                list(tokens),
+            ).fetchall()
+
+        points = {row["token"]: (row["lat"], row["lon"]) for row in rows if not row["no_summary"]}
+        for token, plan in self.get_plans([row["token"] for row in rows if row["no_summary"]]).items():
+            conditions = plan.get("conditions") or {}
+            points[token] = (conditions.get("latitude"), conditions.get("longitude"))
+
+        locations = {}
+        for token, (lat, lon) in points.items():
+            try:
+                locations[token] = (float(lat), float(lon))
+            except (ValueError, TypeError):
+                continue
+        return locations
+
+    def backfill_summaries(self, batch_size: int = 200) -> Dict[str, int]:
+        """Fill summary for rows written before it existed. Returns {"updated", "failed"}."""
+        p = self._get_placeholder()
+        counts = {"updated": 0, "failed": 0}
+        last_token = ""
+        while True:
+            with self._conn() as conn:
+                rows = conn.execute(
+                    f"""SELECT token, plan_data, plan_blob FROM plan_links
+                        WHERE summary IS NULL AND token > {p}
+                        ORDER BY token LIMIT {p}""",
+                    (last_token, batch_size),
+                ).fetchall()
+            if not rows:
+                return counts
+            last_token = rows[-1]["token"]
+
+            updates = []
+            for row in rows:
+                try:
+                    plan = self.codec.decode_row(row["plan_blob"], row["plan_data"])
+                except ValueError:
+                    counts["failed"] += 1
+                    continue
+                updates.append((json.dumps(plan_summary(plan)), row["token"]))
+            if updates:
+                with self._conn() as conn:
+                    cur = conn.cursor()
+                    cur.executemany(f"UPDATE plan_links SET summary = {p} WHERE token = {p}", updates)
+                    conn.commit()
+                counts["updated"] += len(updates)
+
+    # ----------------------------------------
+    # Plan codec migration
+    # ----------------------------------------
+
+    def sample_plans(self, limit: int = 500) -> list[Dict[str, Any]]:
+        """The most recent plan bodies, e.g. to train a codec dictionary."""
+        p = self._get_placeholder()
+        with self._conn() as conn:
+            rows = conn.execute(
+                f"SELECT plan_data, plan_blob FROM plan_links ORDER BY created_at DESC LIMIT {p}",
+                (limit,),
+            ).fetchall()
+        return [self.codec.decode_row(row["plan_blob"], row["plan_data"]) for row in rows]
+
+    def encode_legacy_rows(self, batch_size: int = 200) -> Dict[str, int]:
+        """
+        Move JSON text rows into plan_blob (plan_data becomes ''), keyset-paged
+        on token. Returns {"converted", "failed", "bytes_before", "bytes_after"}.
+        """
+        p = self._get_placeholder()
+        counts = {"converted": 0, "failed": 0, "bytes_before": 0, "bytes_after": 0}
+        last_token = ""
+        while True:
+            with self._conn() as conn:
+                rows = conn.execute(
+                    f"""SELECT token, plan_data FROM plan_links
+                        WHERE plan_blob IS NULL AND token > {p}
+                        ORDER BY token LIMIT {p}""",
+                    (last_token, batch_size),
+                ).fetchall()
+            if not rows:
+                return counts
+            last_token = rows[-1]["token"]
+
+            updates = []
             for row in rows:
-                plan_data = json.loads(row["plan_data"])
-                results.append({
-                    "token": row["token"],
-                    "is_member": bool(row["is_member"]),
-                    "created_at": row["created_at"],
-                    "views": row["views"],
-                    "location": plan_data.get("conditions", {}).get("location_name", "Unknown"),
-                })
-            return results
+                try:
+                    blob = self.codec.encode(self.codec.decode_row(None, row["plan_data"]))
+                except ValueError:
+                    counts["failed"] += 1
+                    continue
+                counts["bytes_before"] += len(row["plan_data"].encode("utf-8"))
+                counts["bytes_after"] += len(blob)
+                updates.append((blob, row["token"]))
+            if updates:
+                with self._conn() as conn:
+                    cur = conn.cursor()
+                    cur.executemany(
+                        f"UPDATE plan_links SET plan_blob = {p}, plan_data = '' WHERE token = {p} AND plan_blob IS NULL",
+                        updates,
+                    )
+                    conn.commit()
+                counts["converted"] += len(updates)
 
     def delete_plan(self, token: str) -> bool:
         p = self._get_placeholder()
@@ -0,0 +1,147 @@
+# apps/api/app/services/plan_retention.py
+"""
+Plan history retention.
+
+add_plan used to delete expired rows (table-wide) and trim the user's history
+inline on every plan generation. This background task does both on a timer
+instead, so the write path is a single INSERT:
+
+- Expired rows (generation_date older than PLAN_RETENTION_DAYS) are deleted
+  oldest-first in PLAN_RETENTION_BATCH_SIZE batches on the generation_date
+  index, one short transaction per batch.
+- Users with more than PLAN_RETENTION_USER_LIMIT visible plans get the older
+  ones soft-deleted, as before. Between passes a user can briefly be over the
+  cap; nothing reads more than 10 plans at a time.
+- With PLAN_RETENTION_ARCHIVE_PATH set, expired rows are appended to that
+  file as gzip-compressed JSON lines (one gzip member per batch; zcat reads
+  the whole file) before the delete commits. A batch that can't be archived
+  is not deleted.
+
+Each batch is claimed with DELETE ... RETURNING and only the returned rows
+are archived, so several API workers can run passes at once without
+archiving a row twice.
+"""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from app.services import db
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+class PlanRetentionWorker:
+    """
+    Scheduled plan_history cleanup.
+    Configured from env:
+      PLAN_RETENTION_ENABLED            (default: on)
+      PLAN_RETENTION_DAYS               delete plans older than this (default: 30)
+      PLAN_RETENTION_USER_LIMIT         visible plans kept per user (default: 10)
+      PLAN_RETENTION_BATCH_SIZE         rows per delete / users per pass (default: 500)
+      PLAN_RETENTION_INTERVAL_SECONDS   (default: 300)
+      PLAN_RETENTION_ARCHIVE_PATH       gzip JSON-lines archive of deleted rows (default: off)
+    """
+
+    def __init__(self, history_store) -> None:
+        self.store = history_store
+        self.enabled = os.getenv("PLAN_RETENTION_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+        self.days = _env_float("PLAN_RETENTION_DAYS", 30)
+        self.user_limit = int(_env_float("PLAN_RETENTION_USER_LIMIT", 10))
+        self.batch_size = max(int(_env_float("PLAN_RETENTION_BATCH_SIZE", 500)), 1)
+        self.interval = _env_float("PLAN_RETENTION_INTERVAL_SECONDS", 300)
+        self.archive_path = os.getenv("PLAN_RETENTION_ARCHIVE_PATH", "").strip() or None
+
+        self.passes = 0
+        self.deleted = 0
+        self.archived = 0
+        self.hidden = 0
+        self.failures = 0
+        self.last_pass_at: Optional[float] = None
+        self.last_pass_ms: Optional[float] = None
+
+    def _archive(self, rows: List[dict]) -> None:
+        os.makedirs(os.path.dirname(self.archive_path) or ".", exist_ok=True)
+        lines = []
+        for row in rows:
+            if isinstance(row.get("conditions"), str):
+                try:
+                    row["conditions"] = json.loads(row["conditions"])
+                except ValueError:
+                    pass
+            lines.append(json.dumps(row, default=str))
+        data = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"))
+        with open(self.archive_path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def purge_expired(self, now: Optional[datetime] = None) -> int:
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=self.days)
+        total = 0
+        while True:
+            archive = self._archive if self.archive_path else None
+            rows = self.store.claim_expired(cutoff, batch_size=self.batch_size, archive=archive)
+            if not rows:
+                return total
+            if archive:
+                self.archived += len(rows)
+            total += len(rows)
+            if len(rows) < self.batch_size:
+                return total
+
+    def enforce_user_limits(self) -> int:
+        hidden = 0
+        for email in self.store.users_over_limit(self.user_limit, batch_size=self.batch_size):
+            hidden += self.store.enforce_user_limit(email, limit=self.user_limit)
+        return hidden
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        t0 = time.perf_counter()
+        deleted = self.purge_expired(now)
+        hidden = self.enforce_user_limits()
+        self.passes += 1
+        self.deleted += deleted
+        self.hidden += hidden
+        self.last_pass_at = time.time()
+        self.last_pass_ms = round((time.perf_counter() - t0) * 1000, 1)
+        if deleted or hidden:
+            print(f"[PlanRetention] Deleted {deleted} expired plan(s), hid {hidden} over the per-user limit")
+        return {"deleted": deleted, "hidden": hidden}
+
+    async def run(self) -> None:
+        if not self.enabled:
+            return
+        while True:
+            try:
+                await db.run(self.run_once)
+            except Exception as e:
+                self.failures += 1
+                print(f"[PlanRetention] Pass failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "days": self.days,
+            "user_limit": self.user_limit,
+            "batch_size": self.batch_size,
+            "archive": bool(self.archive_path),
+            "passes": self.passes,
+            "deleted": self.deleted,
+            "archived": self.archived,
+            "hidden": self.hidden,
+            "failures": self.failures,
+            "last_pass_at": self.last_pass_at,
+            "last_pass_ms": self.last_pass_ms,
+        }
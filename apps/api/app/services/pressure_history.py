@@ -0,0 +1,306 @@
+# apps/api/app/services/pressure_history.py
+"""
+Barometric pressure history per weather grid cell.
+
+Each cell keeps a fixed ring of hourly slots (PRESSURE_RING_HOURS, default 72)
+in the pressure_ring table: slot = epoch_hour % ring size, so a cell never
+grows past ring-size rows. Readings inside the same hour are downsampled to
+their running mean. Slots are filled from every observed snapshot and from
+One Call hourly forecasts; an observation always replaces a forecast for the
+same hour.
+
+An in-memory mirror of each ring makes the 3h/6h/12h change a pair of index
+lookups. When the past reading for a window is missing, the forecast for the
+same window ahead is used as the tendency instead.
+
+Every method does blocking DB I/O; async callers go through .aio (the DB
+thread pool), and a lock keeps the mirrors consistent across those threads.
+
+Forecast slots run FORECAST_HOURS ahead, so the ring must also hold the
+longest lookback behind them or a forecast would wrap onto an observed slot
+that trend() still reads: the ring is at least MIN_RING_HOURS, and forecasts
+further ahead than the ring leaves room for are dropped. Rows older than the
+ring can't be read back, so retention is capped at the ring size.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.services import db
+
+
+# Change (mb) over each window that counts as rising/falling
+TREND_THRESHOLDS_MB = {3: 1.0, 6: 2.0, 12: 3.0}
+LOOKBACK_HOURS = max(TREND_THRESHOLDS_MB)
+# One Call hourly forecasts run 48 hours ahead
+FORECAST_HOURS = 48
+# Current hour + lookback behind it + forecasts ahead of it, none sharing a slot
+MIN_RING_HOURS = FORECAST_HOURS + LOOKBACK_HOURS + 1
+
+# (hour, pressure_mb, samples, is_forecast)
+Slot = Tuple[int, float, int, bool]
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+class PressureHistoryStore:
+    """
+    Ring-buffer pressure series per grid cell.
+    Supports both SQLite (local) and Postgres (Render).
+    Configured from env:
+      PRESSURE_RING_HOURS        slots per cell (default: 72, at least MIN_RING_HOURS)
+      PRESSURE_RETENTION_HOURS   drop rows older than this (default and maximum: the ring size)
+      PRESSURE_MAX_CACHED_CELLS  rings mirrored in memory (default: 5000)
+    """
+
+    def __init__(self, path: str = "data/pressure_history.sqlite3"):
+        ring_hours = _env_int("PRESSURE_RING_HOURS", 72)
+        if ring_hours < MIN_RING_HOURS:
+            print(f"[PressureHistory] PRESSURE_RING_HOURS={ring_hours} can't hold {FORECAST_HOURS}h of "
+                  f"forecasts plus {LOOKBACK_HOURS}h of history; using {MIN_RING_HOURS}")
+            ring_hours = MIN_RING_HOURS
+        self.ring_hours = ring_hours
+        # Forecasts further ahead would land on slots the lookback still reads
+        self.max_ahead_hours = self.ring_hours - LOOKBACK_HOURS - 1
+        self.retention_hours = min(_env_int("PRESSURE_RETENTION_HOURS", self.ring_hours), self.ring_hours)
+        self.max_cached_cells = _env_int("PRESSURE_MAX_CACHED_CELLS", 5000)
+        self._rings: "OrderedDict[str, List[Optional[Slot]]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.aio = db.AsyncStore(self)  # awaitable view for async handlers
+
+        self._pg_url = os.getenv("DATABASE_URL")
+        self._use_pg = bool(self._pg_url and self._pg_url.startswith("postgres"))
+
+        if self._use_pg:
+            self._init_pg()
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.path = path
+            self._init_db()
+
+    def _conn(self):
+        if self._use_pg:
+            return db.connection(pg_url=self._pg_url)
+        return db.connection(sqlite_path=self.path)
+
+    def _get_p(self) -> str:
+        return "%s" if self._use_pg else "?"
+
+    def _init_pg(self) -> None:
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pressure_ring (
+                    cell TEXT NOT NULL,
+                    slot INTEGER NOT NULL,
+                    hour INTEGER NOT NULL,
+                    pressure_mb REAL NOT NULL,
+                    samples INTEGER NOT NULL DEFAULT 1,
+                    is_forecast INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (cell, slot)
+                );
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pressure_ring_hour ON pressure_ring(hour);")
+            conn.commit()
+
+    def _init_db(self) -> None:
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pressure_ring (
+                    cell TEXT NOT NULL,
+                    slot INTEGER NOT NULL,
+                    hour INTEGER NOT NULL,
+                    pressure_mb REAL NOT NULL,
+                    samples INTEGER NOT NULL DEFAULT 1,
+                    is_forecast INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (cell, slot)
+                );
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pressure_ring_hour ON pressure_ring(hour);")
+            conn.commit()
+
+    # ----------------------------------------
+    # Ring access
+    # ----------------------------------------
+
+    def _ring(self, cell: str) -> List[Optional[Slot]]:
+        ring = self._rings.get(cell)
+        if ring is not None:
+            self._rings.move_to_end(cell)
+            return ring
+
+        ring = [None] * self.ring_hours
+        p = self._get_p()
+        with self._conn() as conn:
+            rows = conn.execute(
+                f"SELECT slot, hour, pressure_mb, samples, is_forecast FROM pressure_ring WHERE cell={p}",
+                (cell,),
+            ).fetchall()
+        for row in rows:
+            slot = row["slot"]
+            if 0 <= slot < self.ring_hours:
+                ring[slot] = (row["hour"], row["pressure_mb"], row["samples"], bool(row["is_forecast"]))
+
+        self._rings[cell] = ring
+        while len(self._rings) > self.max_cached_cells:
+            self._rings.popitem(last=False)
+        return ring
+
+    def record_many(self, cell: str, readings: Iterable[Tuple[int, float, bool]]) -> int:
+        """
+        Merge (unix_ts, pressure_mb, is_forecast) readings into the cell's ring.
+        Returns the number of slots written.
+        """
+        with self._lock:
+            return self._record_many(cell, readings)
+
+    def _record_many(self, cell: str, readings: Iterable[Tuple[int, float, bool]]) -> int:
+        ring = self._ring(cell)
+        changed: Dict[int, Slot] = {}
+        horizon = int(time.time()) // 3600 + self.max_ahead_hours
+
+        for ts, pressure, is_forecast in readings:
+            if pressure is None:
+                continue
+            hour = int(ts) // 3600
+            if hour > horizon:
+                continue
+            slot = hour % self.ring_hours
+            cur = ring[slot]
+
+            if cur is not None and cur[0] > hour:
+                continue  # slot already holds a newer hour
+            if cur is not None and cur[0] == hour:
+                if is_forecast and not cur[3]:
+                    continue  # never overwrite an observation with a forecast
+                if not is_forecast and not cur[3]:
+                    # Downsample: running mean of observations within the hour
+                    samples = cur[2] + 1
+                    new = (hour, cur[1] + (float(pressure) - cur[1]) / samples, samples, False)
+                else:
+                    new = (hour, float(pressure), 1, is_forecast)
+            else:
+                new = (hour, float(pressure), 1, is_forecast)
+
+            ring[slot] = new
+            changed[slot] = new
+
+        if changed:
+            p = self._get_p()
+            with self._conn() as conn:
+                cur = conn.cursor()
+                cur.executemany(
+                    f"""INSERT INTO pressure_ring (cell, slot, hour, pressure_mb, samples, is_forecast)
+                        VALUES ({p}, {p}, {p}, {p}, {p}, {p})
+                        ON CONFLICT(cell, slot) DO UPDATE SET
+                            hour = excluded.hour,
+                            pressure_mb = excluded.pressure_mb,
+                            samples = excluded.samples,
+                            is_forecast = excluded.is_forecast""",
+                    [(cell, slot, s[0], s[1], s[2], 1 if s[3] else 0) for slot, s in changed.items()],
+                )
+                conn.commit()
+        return len(changed)
+
+    def record(self, cell: str, pressure_mb: float, ts: Optional[int] = None) -> None:
+        self.record_many(cell, [(ts or int(time.time()), pressure_mb, False)])
+
+    def observe(self, cell: str, readings: Iterable[Tuple[int, float, bool]], now_ts: Optional[int] = None) -> Dict[str, Any]:
+        """record_many() then trend(), in one trip to the DB thread pool."""
+        with self._lock:
+            self._record_many(cell, readings)
+            return self.trend(cell, now_ts)
+
+    def value_at(self, cell: str, hour: int) -> Optional[float]:
+        with self._lock:
+            slot = self._ring(cell)[hour % self.ring_hours]
+        if slot is None or slot[0] != hour:
+            return None
+        return slot[1]
+
+    def change(self, cell: str, window_hours: int, now_ts: Optional[int] = None) -> Optional[float]:
+        """
+        Pressure change over the last window_hours (mb). Falls back to the
+        forecast change over the next window_hours when the past reading is missing.
+        """
+        hour = (now_ts or int(time.time())) // 3600
+        current = self.value_at(cell, hour)
+        if current is None:
+            return None
+        past = self.value_at(cell, hour - window_hours)
+        if past is not None:
+            return round(current - past, 2)
+        ahead = self.value_at(cell, hour + window_hours)
+        if ahead is not None:
+            return round(ahead - current, 2)
+        return None
+
+    def trend(self, cell: str, now_ts: Optional[int] = None) -> Dict[str, Any]:
+        """
+        {"pressure_trend": rising|falling|stable|None, "pressure_change_3h": ..., ...}
+        The trend comes from the shortest window with data.
+        """
+        out: Dict[str, Any] = {"pressure_trend": None}
+        with self._lock:
+            for window, threshold in TREND_THRESHOLDS_MB.items():
+                delta = self.change(cell, window, now_ts)
+                out[f"pressure_change_{window}h"] = delta
+                if delta is not None and out["pressure_trend"] is None:
+                    if delta >= threshold:
+                        out["pressure_trend"] = "rising"
+                    elif delta <= -threshold:
+                        out["pressure_trend"] = "falling"
+                    else:
+                        out["pressure_trend"] = "stable"
+        return out
+
+    # ----------------------------------------
+    # Retention
+    # ----------------------------------------
+
+    def prune(self) -> int:
+        """Drop slots older than the retention window (cells nobody has fetched lately)."""
+        cutoff = int(time.time()) // 3600 - self.retention_hours
+        p = self._get_p()
+        with self._conn() as conn:
+            deleted = conn.execute(f"DELETE FROM pressure_ring WHERE hour < {p}", (cutoff,)).rowcount
+            conn.commit()
+
+        with self._lock:
+            for cell in list(self._rings):
+                ring = self._rings[cell]
+                newest = max((s[0] for s in ring if s is not None), default=None)
+                if newest is None or newest < cutoff:
+                    del self._rings[cell]
+        return max(deleted, 0)
+
+    async def run_pruner(self, interval_seconds: int = 3600) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                deleted = await self.aio.prune()
+                if deleted:
+                    print(f"[PressureHistory] Pruned {deleted} old reading(s)")
+            except Exception as e:
+                print(f"[PressureHistory] Prune failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ring_hours": self.ring_hours,
+            "max_ahead_hours": self.max_ahead_hours,
+            "retention_hours": self.retention_hours,
+            "cached_cells": len(self._rings),
+        }
+
+
+# Global instance
+pressure_history = PressureHistoryStore()
@@ -1,41 +1,70 @@
 # app/services/rate_limits.py
 from __future__ import annotations
 
+import asyncio
 import os
-import sqlite3
+import threading
 import time
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
 
-# Postgres support
-try:
-    import psycopg
-    from psycopg.rows import dict_row
-except ImportError:
-    psycopg = None
+from app.services import db
 
 class RateLimitStore:
     """
     Manages a simple 20-plan-per-day limit for members.
     Supports both SQLite (local) and Postgres (Vercel).
+
+    The cap is enforced by reserve(): it takes a slot atomically when a
+    request starts, and release() hands it back if generation fails.
+    Concurrent requests therefore can't all pass a check made before any of
+    them is counted.
+
+    RATE_LIMIT_MODE picks where the live counts are:
+      shared   (default) Counts live in daily_usage. A reservation is one
+               conditional upsert:
+                 ... DO UPDATE SET count = count + 1 WHERE count < limit RETURNING count
+               so the cap holds across workers and instances.
+      memory   Opt-in, for a single API process only. Today's counts are
+               held in process and loaded from daily_usage at startup, so
+               a check is a dict lookup. Increments are written back in
+               batches every RATE_LIMIT_FLUSH_SECONDS and at shutdown. Any
+               other process writing daily_usage breaks the cap.
+    Either way the cap is per local calendar day, as before.
     """
     def __init__(self, path: str = "data/rate_limits.sqlite3"):
         self._pg_url = os.getenv("DATABASE_URL")
         self._use_pg = bool(self._pg_url and self._pg_url.startswith("postgres"))
+        self.aio = db.AsyncStore(self)  # awaitable view for async handlers
         
+        # In-process counts are only exact with a single process, so they must be asked for
+        self.shared = os.getenv("RATE_LIMIT_MODE", "shared").strip().lower() != "memory"
+        try:
+            self.flush_seconds = float(os.getenv("RATE_LIMIT_FLUSH_SECONDS", "").strip() or 5)
+        except ValueError:
+            self.flush_seconds = 5.0
+        self.bypass = {e.strip().lower() for e in os.getenv("RATE_LIMIT_BYPASS_EMAILS", "").split(",") if e.strip()}
+
+        self._day = self._today()
+        self._day_ends = self._next_midnight()
+        self._counts: Dict[str, int] = {}   # email -> today's count (memory mode)
+        self._pending: Dict[tuple, int] = {}  # (email, day) -> increments not yet written
+        self._lock = threading.Lock()
+        self._stats = {"checks": 0, "reserved": 0, "rejected": 0, "released": 0, "increments": 0, "flushes": 0, "flushed": 0, "flush_errors": 0, "warmed": 0}
+
         if self._use_pg:
             self._init_pg()
         else:
             os.makedirs(os.path.dirname(path), exist_ok=True)
             self.path = path
             self._init_db()
+        if not self.shared:
+            self._warm()
     
     def _conn(self):
         if self._use_pg:
-            return psycopg.connect(self._pg_url, row_factory=dict_row)
-        conn = sqlite3.connect(self.path)
-        conn.row_factory = sqlite3.Row
-        return conn
+            return db.connection(pg_url=self._pg_url)
+        return db.connection(sqlite_path=self.path)
 
     def _get_p(self) -> str:
         return "%s" if self._use_pg else "?"
@@ -65,43 +94,198 @@ class RateLimitStore:
             """)
             conn.commit()
 
+    @staticmethod
+    def _today() -> str:
+        return datetime.now().strftime("%Y-%m-%d")
+
+    @staticmethod
+    def _next_midnight() -> float:
+        now = datetime.now()
+        return (now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)).timestamp()
+
+    # ----------------------------------------
+    # In-memory counters (memory mode)
+    # ----------------------------------------
+
+    def _warm(self) -> None:
+        """Load today's counts from daily_usage."""
+        p = self._get_p()
+        with self._conn() as conn:
+            rows = conn.execute(f"SELECT email, count FROM daily_usage WHERE day={p}", (self._day,)).fetchall()
+        with self._lock:
+            self._counts = {row["email"]: row["count"] for row in rows}
+            self._stats["warmed"] = len(self._counts)
+
+    def _roll_day(self) -> None:
+        # Caller holds self._lock. Yesterday's pending increments stay keyed by their day.
+        if time.time() < self._day_ends:
+            return
+        today = self._today()
+        self._day_ends = self._next_midnight()
+        if today != self._day:
+            self._day = today
+            self._counts = {}
+
+    def flush_usage(self) -> int:
+        """Write pending increments in one batch. Returns the number of increments written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        p = self._get_p()
+        try:
+            with self._conn() as conn:
+                cur = conn.cursor()
+                cur.executemany(
+                    f"""INSERT INTO daily_usage (email, day, count) VALUES ({p}, {p}, {p})
+                        ON CONFLICT(email, day) DO UPDATE SET count = daily_usage.count + excluded.count""",
+                    [(email, day, n) for (email, day), n in pending.items()],
+                )
+                conn.commit()
+        except Exception:
+            # Keep the increments for the next flush
+            with self._lock:
+                for key, n in pending.items():
+                    self._pending[key] = self._pending.get(key, 0) + n
+                self._stats["flush_errors"] += 1
+            raise
+
+        flushed = sum(pending.values())
+        self._stats["flushes"] += 1
+        self._stats["flushed"] += flushed
+        return flushed
+
+    async def run_flusher(self) -> None:
+        """Flush on an interval; cancel it and call flush_usage() at shutdown."""
+        if self.shared:
+            return
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.aio.flush_usage()
+            except Exception as e:
+                print(f"[RateLimits] Usage flush failed: {e}")
+
+    # ----------------------------------------
+    # Shared mode
+    # ----------------------------------------
+
+    def _increment_shared(self, email: str, day: str, limit: Optional[int] = None) -> Optional[int]:
+        """Add one to today's row; with a limit, only while it is below it. Returns the new count or None."""
+        p = self._get_p()
+        sql = f"""INSERT INTO daily_usage (email, day, count) VALUES ({p}, {p}, 1)
+                  ON CONFLICT(email, day) DO UPDATE SET count = daily_usage.count + 1"""
+        params: tuple = (email, day)
+        if limit is not None:
+            sql += f" WHERE daily_usage.count < {p}"
+            params += (limit,)
+        with self._conn() as conn:
+            row = conn.execute(sql + " RETURNING count", params).fetchone()
+            conn.commit()
+        return row["count"] if row else None
+
+    # ----------------------------------------
+    # Public API
+    # ----------------------------------------
+
     def get_daily_count(self, email: str) -> int:
         """Returns the number of plans generated by this email today."""
-        today = datetime.now().strftime("%Y-%m-%d")
+        email_clean = email.lower().strip()
+        if not self.shared:
+            with self._lock:
+                self._roll_day()
+                return self._counts.get(email_clean, 0)
+
         p = self._get_p()
         with self._conn() as conn:
             row = conn.execute(
                 f"SELECT count FROM daily_usage WHERE email={p} AND day={p}",
-                (email.lower().strip(), today)
+                (email_clean, self._today())
             ).fetchone()
             return row["count"] if row else 0
 
+    def reserve(self, email: str, limit: int = 20) -> Optional[str]:
+        """
+        Take one of today's plans for this member if they're under the cap.
+        Returns the day the slot was taken on (pass it to release() if the
+        plan isn't delivered), or None when the cap is reached. Bypass
+        accounts always get a slot and are still counted.
+        """
+        email_clean = email.lower().strip()
+        cap = None if email_clean in self.bypass else limit
+
+        if self.shared:
+            day = self._today()
+            taken = self._increment_shared(email_clean, day, limit=cap) is not None
+        else:
+            with self._lock:
+                self._roll_day()
+                day = self._day
+                taken = cap is None or self._counts.get(email_clean, 0) < cap
+                if taken:
+                    self._counts[email_clean] = self._counts.get(email_clean, 0) + 1
+                    key = (email_clean, day)
+                    self._pending[key] = self._pending.get(key, 0) + 1
+
+        self._stats["reserved" if taken else "rejected"] += 1
+        return day if taken else None
+
+    def release(self, email: str, day: str) -> None:
+        """Give back a slot taken by reserve() on that day."""
+        email_clean = email.lower().strip()
+        self._stats["released"] += 1
+        if self.shared:
+            p = self._get_p()
+            with self._conn() as conn:
+                conn.execute(
+                    f"UPDATE daily_usage SET count = count - 1 WHERE email={p} AND day={p} AND count > 0",
+                    (email_clean, day)
+                )
+                conn.commit()
+            return
+
+        with self._lock:
+            if day == self._day and self._counts.get(email_clean, 0) > 0:
+                self._counts[email_clean] -= 1
+            key = (email_clean, day)
+            self._pending[key] = self._pending.get(key, 0) - 1
+
     def increment_daily_count(self, email: str) -> None:
-        """Increments the daily plan tally for a member."""
-        today = datetime.now().strftime("%Y-%m-%d")
+        """Increments the daily plan tally for a member (no cap; see reserve())."""
         email_clean = email.lower().strip()
-        p = self._get_p()
-        
-        with self._conn() as conn:
-            conn.execute(
-                f"""INSERT INTO daily_usage (email, day, count) VALUES ({p}, {p}, 1)
-                   ON CONFLICT(email, day) DO UPDATE SET count = daily_usage.count + 1""",
-                (email_clean, today)
-            )
-            conn.commit()
+        self._stats["increments"] += 1
+        if self.shared:
+            self._increment_shared(email_clean, self._today())
+            return
+
+        with self._lock:
+            self._roll_day()
+            self._counts[email_clean] = self._counts.get(email_clean, 0) + 1
+            key = (email_clean, self._day)
+            self._pending[key] = self._pending.get(key, 0) + 1
 
     def is_within_daily_limit(self, email: str, limit: int = 20) -> bool:
         """Check if the user is under the daily cap."""
-        # Bypass for admin/test accounts
-        # Fix: Ensure we strip whitespace from env vars and ignore empty strings
-        bypass_env = os.getenv("RATE_LIMIT_BYPASS_EMAILS", "")
-        bypass_list = [
-            e.strip().lower() 
-            for e in bypass_env.split(",") 
-            if e.strip()
-        ]
-        
-        if email.lower().strip() in bypass_list:
+        self._stats["checks"] += 1
+        # Bypass for admin/test accounts (RATE_LIMIT_BYPASS_EMAILS, read at startup)
+        if email.lower().strip() in self.bypass:
             return True
-            
-        return self.get_daily_count(email) < limit
\ No newline at end of file
+
+        return self.get_daily_count(email) < limit
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = sum(self._pending.values())
+            tracked = len(self._counts)
+        return {
+            "mode": "shared" if self.shared else "memory",
+            "flush_seconds": self.flush_seconds,
+            "tracked_emails": tracked,
+            "pending_increments": pending,
+            **self._stats,
+        }
+
+
+# Global instance: memory mode keeps the counts here, so every caller must share it
+rate_limits = RateLimitStore()
@@ -68,6 +68,7 @@ def build_hash_input(
     lon: Optional[float] = None,
     time_bucket: Optional[str] = None,
     water_view_id: Optional[str] = None,
+    access_type: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Returns the dict that will be hashed.
@@ -102,6 +103,9 @@ def build_hash_input(
     if water_view_id is not None:
         out["water_view_id"] = str(water_view_id).strip()
 
+    if access_type is not None:
+        out["access_type"] = str(access_type).strip().lower()
+
     return out
 
 
@@ -113,6 +117,7 @@ def snapshot_hash(
     lon: Optional[float] = None,
     time_bucket: Optional[str] = None,
     water_view_id: Optional[str] = None,
+    access_type: Optional[str] = None,
 ) -> str:
     return sha256_hex(
         build_hash_input(
@@ -122,5 +127,6 @@ def snapshot_hash(
             lon=lon,
             time_bucket=time_bucket,
             water_view_id=water_view_id,
+            access_type=access_type,
         )
     )
\ No newline at end of file
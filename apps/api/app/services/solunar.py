@@ -0,0 +1,366 @@
+# apps/api/app/services/solunar.py
+"""
+Vectorized solunar engine.
+
+Computes moon transit (overhead), underfoot, moonrise and moonset for arrays of
+(lat, lon, date) in one NumPy pass, using the low-precision lunar series from
+the Astronomical Almanac (~0.3° in position, a few minutes in event times).
+
+Solunar windows (standard tables):
+- Major: moon overhead or underfoot, ±MAJOR_HALF_WIDTH_MIN
+- Minor: moonrise or moonset, ±MINOR_HALF_WIDTH_MIN
+
+Per-day event tables for a lat/lon grid are precomputed by
+build_solunar_tables.py and memory-mapped at runtime, so a plan request reads
+its windows with an array index. Points outside the table fall back to a
+direct (cached) computation for that point.
+
+Event times are stored as minutes after 00:00 UTC of the table date (float32,
+NaN when the event doesn't occur that local day). The "day" is the local mean
+solar day at the point's longitude.
+"""
+from __future__ import annotations
+
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAJOR_HALF_WIDTH_MIN = 60
+MINOR_HALF_WIDTH_MIN = 30
+
+SAMPLE_MINUTES = 10
+EVENTS = ("transit", "underfoot", "rise", "set")
+
+TABLE_PATH = os.getenv("SOLUNAR_TABLE_PATH", "data/solunar/solunar_table.npy")
+
+_J2000_UNIX = 946728000.0  # 2000-01-01 12:00 UTC
+_RAD = np.pi / 180.0
+
+
+# ----------------------------------------
+# Astronomy (vectorized over any array shape)
+# ----------------------------------------
+
+def _moon_equatorial(unix_ts: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Geocentric moon (ra_deg, dec_deg, horizontal_parallax_deg) for unix timestamps."""
+    d = (unix_ts - _J2000_UNIX) / 86400.0
+    t = d / 36525.0
+
+    lam = (
+        218.32 + 481267.881 * t
+        + 6.29 * np.sin((135.0 + 477198.87 * t) * _RAD)
+        - 1.27 * np.sin((259.3 - 413335.36 * t) * _RAD)
+        + 0.66 * np.sin((235.7 + 890534.22 * t) * _RAD)
+        + 0.21 * np.sin((269.9 + 954397.74 * t) * _RAD)
+        - 0.19 * np.sin((357.5 + 35999.05 * t) * _RAD)
+        - 0.11 * np.sin((186.5 + 966404.03 * t) * _RAD)
+    )
+    beta = (
+        5.13 * np.sin((93.3 + 483202.02 * t) * _RAD)
+        + 0.28 * np.sin((228.2 + 960400.89 * t) * _RAD)
+        - 0.28 * np.sin((318.3 + 6003.15 * t) * _RAD)
+        - 0.17 * np.sin((217.6 - 407332.21 * t) * _RAD)
+    )
+    parallax = (
+        0.9508
+        + 0.0518 * np.cos((135.0 + 477198.87 * t) * _RAD)
+        + 0.0095 * np.cos((259.3 - 413335.36 * t) * _RAD)
+        + 0.0078 * np.cos((235.7 + 890534.22 * t) * _RAD)
+        + 0.0028 * np.cos((269.9 + 954397.74 * t) * _RAD)
+    )
+    eps = (23.439 - 0.0000004 * d) * _RAD
+
+    lam_r = lam * _RAD
+    beta_r = beta * _RAD
+    x = np.cos(beta_r) * np.cos(lam_r)
+    y = np.cos(eps) * np.cos(beta_r) * np.sin(lam_r) - np.sin(eps) * np.sin(beta_r)
+    z = np.sin(eps) * np.cos(beta_r) * np.sin(lam_r) + np.cos(eps) * np.sin(beta_r)
+
+    ra = np.degrees(np.arctan2(y, x))
+    dec = np.degrees(np.arcsin(np.clip(z, -1.0, 1.0)))
+    return ra, dec, parallax
+
+
+def _gmst_deg(unix_ts: np.ndarray) -> np.ndarray:
+    d = (unix_ts - _J2000_UNIX) / 86400.0
+    return np.mod(280.46061837 + 360.98564736629 * d, 360.0)
+
+
+def moon_illumination(unix_ts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (illuminated_fraction 0-1, elongation_deg 0-360) for unix timestamps.
+    Elongation 0 = new moon, 180 = full moon.
+    """
+    unix_ts = np.asarray(unix_ts, dtype=np.float64)
+    d = (unix_ts - _J2000_UNIX) / 86400.0
+    t = d / 36525.0
+
+    g = (357.528 + 0.9856003 * d) * _RAD
+    sun_lon = 280.460 + 0.9856474 * d + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g)
+    moon_lon = (
+        218.32 + 481267.881 * t
+        + 6.29 * np.sin((135.0 + 477198.87 * t) * _RAD)
+        - 1.27 * np.sin((259.3 - 413335.36 * t) * _RAD)
+        + 0.66 * np.sin((235.7 + 890534.22 * t) * _RAD)
+        + 0.21 * np.sin((269.9 + 954397.74 * t) * _RAD)
+    )
+    elongation = np.mod(moon_lon - sun_lon, 360.0)
+    return (1.0 - np.cos(elongation * _RAD)) / 2.0, elongation
+
+
+def _first_crossing(values: np.ndarray, rising: bool, guard: Optional[float] = None) -> np.ndarray:
+    """
+    Fractional sample index of the first sign change along the last axis
+    (neg→pos when rising, pos→neg otherwise). NaN where there is none.
+    guard skips wrap-around jumps (both neighbours must be within ±guard).
+    """
+    a = values[..., :-1]
+    b = values[..., 1:]
+    hit = (a < 0) & (b >= 0) if rising else (a >= 0) & (b < 0)
+    if guard is not None:
+        hit &= (np.abs(a) < guard) & (np.abs(b) < guard)
+
+    any_hit = hit.any(axis=-1)
+    idx = np.argmax(hit, axis=-1)
+    a_i = np.take_along_axis(a, idx[..., None], axis=-1)[..., 0]
+    b_i = np.take_along_axis(b, idx[..., None], axis=-1)[..., 0]
+    denom = np.where(b_i - a_i == 0, 1.0, b_i - a_i)
+    frac = idx + (-a_i / denom)
+    return np.where(any_hit, frac, np.nan)
+
+
+def solunar_events(
+    lats: Sequence[float],
+    lons: Sequence[float],
+    day_epochs: Sequence[float],
+) -> np.ndarray:
+    """
+    Moon events for N points in one pass.
+
+    Args:
+        lats, lons: degrees (east-positive longitude), length N
+        day_epochs: unix time of 00:00 UTC of each point's date, length N
+
+    Returns:
+        float32 array (N, 4): minutes after day_epoch for transit, underfoot,
+        rise, set within the point's local mean solar day (NaN if none).
+    """
+    lats = np.asarray(lats, dtype=np.float64).reshape(-1)
+    lons = np.asarray(lons, dtype=np.float64).reshape(-1)
+    day_epochs = np.asarray(day_epochs, dtype=np.float64).reshape(-1)
+
+    # Local mean solar day: starts at 00:00 UTC - lon/15 h
+    start_min = -lons / 15.0 * 60.0
+    steps = np.arange(0, 24 * 60 + SAMPLE_MINUTES, SAMPLE_MINUTES, dtype=np.float64)
+    minutes = start_min[:, None] + steps[None, :]            # (N, K)
+    ts = day_epochs[:, None] + minutes * 60.0
+
+    ra, dec, parallax = _moon_equatorial(ts)
+    lst = _gmst_deg(ts) + lons[:, None]
+    hour_angle = np.mod(lst - ra, 360.0)
+
+    # Transit: hour angle through 0; underfoot: through 180
+    h_transit = np.mod(hour_angle + 180.0, 360.0) - 180.0
+    h_underfoot = hour_angle - 180.0
+
+    phi = lats[:, None] * _RAD
+    dec_r = dec * _RAD
+    alt = np.degrees(np.arcsin(np.clip(
+        np.sin(phi) * np.sin(dec_r) + np.cos(phi) * np.cos(dec_r) * np.cos(hour_angle * _RAD),
+        -1.0, 1.0,
+    )))
+    # Standard altitude for moonrise/set (parallax, semi-diameter, refraction)
+    alt_rel = alt - (0.7275 * parallax - 0.5667)
+
+    out = np.empty((lats.shape[0], 4), dtype=np.float32)
+    for col, (vals, rising, guard) in enumerate((
+        (h_transit, True, 90.0),
+        (h_underfoot, True, 90.0),
+        (alt_rel, True, None),
+        (alt_rel, False, None),
+    )):
+        idx = _first_crossing(vals, rising=rising, guard=guard)
+        out[:, col] = start_min + idx * SAMPLE_MINUTES
+    return out
+
+
+# ----------------------------------------
+# Precomputed tables
+# ----------------------------------------
+
+def _day_epoch(d: date) -> float:
+    return datetime(d.year, d.month, d.day, tzinfo=timezone.utc).timestamp()
+
+
+def build_table(
+    start: date,
+    days: int,
+    lat_min: float,
+    lat_max: float,
+    lon_min: float,
+    lon_max: float,
+    resolution: float,
+    path: str = TABLE_PATH,
+) -> Dict[str, Any]:
+    """Compute and save a (days, n_lat, n_lon, 4) float32 event table + JSON metadata."""
+    lat_axis = np.arange(lat_min, lat_max + resolution / 2, resolution)
+    lon_axis = np.arange(lon_min, lon_max + resolution / 2, resolution)
+    grid_lat, grid_lon = np.meshgrid(lat_axis, lon_axis, indexing="ij")
+    flat_lat = grid_lat.reshape(-1)
+    flat_lon = grid_lon.reshape(-1)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    table = np.lib.format.open_memmap(
+        path, mode="w+", dtype=np.float32, shape=(days, len(lat_axis), len(lon_axis), 4)
+    )
+    for i in range(days):
+        epoch = _day_epoch(start + timedelta(days=i))
+        events = solunar_events(flat_lat, flat_lon, np.full(flat_lat.shape, epoch))
+        table[i] = events.reshape(len(lat_axis), len(lon_axis), 4)
+    table.flush()
+    del table
+
+    meta = {
+        "version": 1,
+        "start_date": start.isoformat(),
+        "days": days,
+        "lat_min": float(lat_axis[0]),
+        "lon_min": float(lon_axis[0]),
+        "n_lat": int(len(lat_axis)),
+        "n_lon": int(len(lon_axis)),
+        "resolution": resolution,
+        "sample_minutes": SAMPLE_MINUTES,
+        "events": list(EVENTS),
+    }
+    with open(_meta_path(path), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def _meta_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".json"
+
+
+class SolunarTable:
+    """Memory-mapped per-day event table (see build_table)."""
+
+    def __init__(self, path: str = TABLE_PATH):
+        self.path = path
+        self.table: Optional[np.ndarray] = None
+        self.meta: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not (os.path.exists(self.path) and os.path.exists(_meta_path(self.path))):
+            return
+        try:
+            with open(_meta_path(self.path)) as f:
+                self.meta = json.load(f)
+            self.table = np.load(self.path, mmap_mode="r")
+            self._start_ordinal = date.fromisoformat(self.meta["start_date"]).toordinal()
+            print(f"[Solunar] Table loaded: {self.path} {self.table.shape} from {self.meta['start_date']}")
+        except Exception as e:
+            print(f"[Solunar] Could not load table {self.path}: {e}")
+            self.table = None
+
+    def lookup(self, lat: float, lon: float, d: date) -> Optional[np.ndarray]:
+        """Events row (4,) for the nearest grid point, or None if outside the table."""
+        if self.table is None:
+            return None
+        m = self.meta
+        day = d.toordinal() - self._start_ordinal
+        i = int(round((lat - m["lat_min"]) / m["resolution"]))
+        j = int(round((lon - m["lon_min"]) / m["resolution"]))
+        if not (0 <= day < m["days"] and 0 <= i < m["n_lat"] and 0 <= j < m["n_lon"]):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.table[day, i, j]
+
+
+_table: Optional[SolunarTable] = None
+
+
+def get_table() -> SolunarTable:
+    global _table
+    if _table is None:
+        _table = SolunarTable()
+    return _table
+
+
+@lru_cache(maxsize=4096)
+def _computed_events(lat_r: float, lon_r: float, ordinal: int) -> Tuple[float, ...]:
+    d = date.fromordinal(ordinal)
+    row = solunar_events([lat_r], [lon_r], [_day_epoch(d)])[0]
+    return tuple(float(v) for v in row)
+
+
+def day_events(lat: float, lon: float, d: date) -> Tuple[float, ...]:
+    """(transit, underfoot, rise, set) minutes after 00:00 UTC of d."""
+    row = get_table().lookup(lat, lon, d)
+    if row is not None:
+        return tuple(float(v) for v in row)
+    # Outside the table: compute for a 0.1° point (cached; transit shifts ~0.4 min per 0.1°)
+    return _computed_events(round(lat, 1), round(lon, 1), d.toordinal())
+
+
+def solunar_windows(lat: float, lon: float, when: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Major/minor windows around `when` (default now).
+    Checks the local day before/after too, so windows spanning midnight count.
+    """
+    when = when or datetime.now(timezone.utc)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now_ts = when.timestamp()
+    local_day = (when + timedelta(hours=lon / 15.0)).date()
+
+    majors = []
+    minors = []
+    for offset in (-1, 0, 1):
+        d = local_day + timedelta(days=offset)
+        epoch = _day_epoch(d)
+        transit, underfoot, rise, set_ = day_events(lat, lon, d)
+        for center in (transit, underfoot):
+            if center == center:  # not NaN
+                majors.append(epoch + center * 60)
+        for center in (rise, set_):
+            if center == center:
+                minors.append(epoch + center * 60)
+
+    def _in_window(centers, half_min):
+        return any(abs(now_ts - c) <= half_min * 60 for c in centers)
+
+    upcoming_major = min((c for c in majors if c - MAJOR_HALF_WIDTH_MIN * 60 > now_ts), default=None)
+    return {
+        "is_major_period": _in_window(majors, MAJOR_HALF_WIDTH_MIN),
+        "is_minor_period": _in_window(minors, MINOR_HALF_WIDTH_MIN),
+        "next_major_start": (
+            datetime.fromtimestamp(upcoming_major - MAJOR_HALF_WIDTH_MIN * 60, tz=timezone.utc).isoformat()
+            if upcoming_major else None
+        ),
+    }
+
+
+def is_major_period(lat: float, lon: float, when: Optional[datetime] = None) -> bool:
+    return solunar_windows(lat, lon, when)["is_major_period"]
+
+
+def stats() -> Dict[str, Any]:
+    table = get_table()
+    info = _computed_events.cache_info()
+    return {
+        "table_loaded": table.table is not None,
+        "table_shape": list(table.table.shape) if table.table is not None else None,
+        "table_start": table.meta.get("start_date"),
+        "table_hits": table.hits,
+        "table_misses": table.misses,
+        "computed_cache_hits": info.hits,
+        "computed_cache_misses": info.misses,
+    }
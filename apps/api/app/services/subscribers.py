@@ -2,12 +2,10 @@
 from __future__ import annotations
 
 import os
-import sqlite3
 from dataclasses import dataclass
 from typing import Optional
 
-import psycopg
-from psycopg.rows import dict_row
+from app.services import db
 
 
 @dataclass(frozen=True)
@@ -28,6 +26,7 @@ class SubscriberStore:
     def __init__(self) -> None:
         self._pg_url = os.getenv("DATABASE_URL")
         self._use_pg = bool(self._pg_url and self._pg_url.startswith("postgres"))
+        self.aio = db.AsyncStore(self)  # awaitable view for async handlers
 
         if self._use_pg:
             self._init_pg()
@@ -40,7 +39,7 @@ class SubscriberStore:
     # -------------------------
     def _pg_conn(self):
         assert self._pg_url, "DATABASE_URL is required for Postgres mode"
-        return psycopg.connect(self._pg_url, row_factory=dict_row)
+        return db.connection(pg_url=self._pg_url)
 
     def _init_pg(self) -> None:
         with self._pg_conn() as conn:
@@ -126,9 +125,7 @@ class SubscriberStore:
         return os.path.join(data_dir, "subscribers.sqlite3")
 
     def _sqlite_conn(self):
-        conn = sqlite3.connect(self._sqlite_path())
-        conn.row_factory = sqlite3.Row
-        return conn
+        return db.connection(sqlite_path=self._sqlite_path())
 
     def _init_sqlite(self) -> None:
         with self._sqlite_conn() as conn:
@@ -12,9 +12,20 @@ ENHANCED FOR BASS FISHING:
 """
 import os
 import math
-from datetime import datetime, timezone, timedelta
-from typing import Any, Dict, Tuple
-import httpx
+import asyncio
+from datetime import date, datetime, timezone, timedelta
+from typing import Any, Dict, List, Tuple
+
+from app.services.http_clients import client_for
+from app.services.weather_cache import grid_cell, weather_cache
+from app.services.pressure_history import pressure_history
+from app.services.weather_providers import ProviderChain, WeatherProvider
+
+# Solunar engine needs NumPy; fall back to the phase proxy without it
+try:
+    from app.services import solunar
+except ImportError:
+    solunar = None
 
 
 def _cloud_cover_from_pct(pct: float) -> str:
@@ -42,6 +53,16 @@ def _calculate_moon_phase(date: datetime = None) -> Tuple[str, float]:
     if date is None:
         date = datetime.now(timezone.utc)
     
+    if solunar is not None:
+        fraction, elongation = solunar.moon_illumination([date.timestamp()])
+        # Eight 45° bins centered on new / first quarter / full / last quarter
+        names = [
+            "new", "waxing crescent", "first quarter", "waxing gibbous",
+            "full", "waning gibbous", "last quarter", "waning crescent",
+        ]
+        phase_name = names[int(((float(elongation[0]) + 22.5) % 360) // 45)]
+        return phase_name, round(float(fraction[0]) * 100, 1)
+    
     # Known new moon: Jan 6, 2000 18:14 UTC
     known_new_moon = datetime(2000, 1, 6, 18, 14, tzinfo=timezone.utc)
     
@@ -57,33 +78,66 @@ def _calculate_moon_phase(date: datetime = None) -> Tuple[str, float]:
     # Illumination percentage (0-100)
     illumination = (1 - math.cos(2 * math.pi * phase_days / lunar_cycle)) / 2 * 100
     
-    # Determine phase name
+    return _phase_name(phase_days), round(illumination, 1)
+
+
+def _phase_name(phase_days: float) -> str:
+    """Phase name for days since new moon (0-29.53)."""
     if phase_days < 1.84566:
-        phase_name = "new"
+        return "new"
     elif phase_days < 7.38264:
-        phase_name = "waxing crescent"
+        return "waxing crescent"
     elif phase_days < 9.22830:
-        phase_name = "first quarter"
+        return "first quarter"
     elif phase_days < 14.76528:
-        phase_name = "waxing gibbous"
+        return "waxing gibbous"
     elif phase_days < 16.61094:
-        phase_name = "full"
+        return "full"
     elif phase_days < 22.14792:
-        phase_name = "waning gibbous"
+        return "waning gibbous"
     elif phase_days < 23.99358:
-        phase_name = "last quarter"
+        return "last quarter"
     else:
-        phase_name = "waning crescent"
-    
-    return phase_name, round(illumination, 1)
+        return "waning crescent"
 
 
-def _detect_pressure_trend(current_pressure: float, lat: float, lon: float) -> str:
+async def _pressure_trend_from_history(
+    lat: float,
+    lon: float,
+    current_pressure: float,
+    onecall: Dict[str, Any] = None,
+) -> Dict[str, Any]:
+    """
+    Record this reading (plus any One Call hourly forecast) in the cell's
+    pressure ring and return the trend fields:
+        pressure_trend, pressure_change_3h, pressure_change_6h, pressure_change_12h
+    pressure_trend is None when the cell has no usable history yet.
+    Only the upstream fetch paths call this; the ring runs on the DB thread pool.
+    """
+    cell, _, _ = grid_cell(lat, lon)
+    now_ts = int(datetime.now(timezone.utc).timestamp())
+    readings = []
+    if current_pressure is not None:
+        readings.append((now_ts, current_pressure, False))
+    for hour in (onecall or {}).get("hourly", []) or []:
+        if hour.get("dt") and hour.get("pressure") is not None:
+            # The first hourly entry is the current hour; treat it as forecast so the observation wins
+            readings.append((hour["dt"], hour["pressure"], True))
+
+    try:
+        return await pressure_history.aio.observe(cell, readings, now_ts)
+    except Exception as e:
+        print(f"[Weather] Pressure history unavailable: {e}")
+        return {"pressure_trend": None}
+
+
+def _detect_pressure_trend(current_pressure: float, history_trend: str = None) -> str:
     """
     Detect barometric pressure trend.
     
-    In production, you'd store historical pressure readings in DB.
-    For now, we use a heuristic based on standard pressure.
+    Uses the trend from the grid cell's pressure history when there is one
+    (see _pressure_trend_from_history). Until a cell has history, falls back
+    to a heuristic based on standard pressure.
     
     Standard pressure: 1013.25 mb
     Rising: > 1015 mb
@@ -92,8 +146,11 @@ def _detect_pressure_trend(current_pressure: float, lat: float, lon: float) -> s
     
     Returns: "rising", "falling", "stable"
     """
-    # TODO: Store pressure history in DB for accurate 3-hour trend detection
-    # For now, use simplified heuristic
+    if history_trend:
+        return history_trend
+
+    if current_pressure is None:
+        return "stable"
     if current_pressure > 1015:
         return "rising"
     elif current_pressure < 1010:
@@ -106,14 +163,20 @@ def _is_major_solunar_period(date: datetime, lat: float, lon: float) -> bool:
     """
     Detect major solunar feeding periods (moon overhead or underfoot).
     
-    Major periods: Moon is directly overhead or underfoot (±2 hours)
-    Minor periods: Moon is rising or setting (±1 hour)
+    Major periods: Moon is directly overhead or underfoot (±1 hour)
+    Minor periods: Moon is rising or setting (±30 minutes)
     
-    For MVP, we use simplified moon phase correlation.
-    Full implementation would calculate moon transit times.
+    Uses the solunar engine (precomputed moon transit tables). Without NumPy,
+    falls back to a moon phase correlation.
     
     Returns: True if currently in major feeding period
     """
+    if solunar is not None:
+        try:
+            return solunar.is_major_period(lat, lon, date)
+        except Exception as e:
+            print(f"[Weather] Solunar lookup failed: {e}")
+    
     # Simplified: Major periods correlate with full/new moon ±3 days
     phase_name, illumination = _calculate_moon_phase(date)
     
@@ -138,22 +201,301 @@ def format_local_time(unix_ts: int, offset_seconds: int) -> str:
     # Format as "6:42 AM" (removes leading zero)
     return local_dt.strftime("%-I:%M %p")
 
-async def get_weather_snapshot(lat: float, lon: float) -> Dict[str, Any]:
+async def get_weather_snapshot(lat: float, lon: float, endpoint: str = "default") -> Dict[str, Any]:
+    """
+    Current snapshot for a location, served through the grid-cell weather cache.
+    endpoint labels the caller for per-endpoint hit rates.
+    """
+    snapshot = await weather_cache.get(lat, lon, fetch=fetch_weather_snapshot, endpoint=endpoint)
+    # Solunar windows move by the minute and by location; read them per request, not per cache entry
+    snapshot["is_major_period"] = _is_major_solunar_period(datetime.now(timezone.utc), lat, lon)
+    return snapshot
+
+
+def _batch_concurrency() -> int:
+    try:
+        return max(int(os.getenv("WEATHER_BATCH_CONCURRENCY", "").strip() or 4), 1)
+    except ValueError:
+        return 4
+
+
+async def get_weather_snapshots(
+    points: List[Tuple[float, float]],
+    endpoint: str = "weather_batch",
+) -> List[Dict[str, Any]]:
+    """
+    Snapshots for many locations in one call. Points are deduped into grid
+    cells, so each cell is read (or fetched) once; at most
+    WEATHER_BATCH_CONCURRENCY cells are in flight upstream at a time.
+
+    Returns one item per input point, in order:
+      {"lat", "lon", "cell", "ok": True, "weather": {...}}
+      {"lat", "lon", "cell", "ok": False, "error": "..."}
+    """
+    cells: Dict[str, Tuple[float, float]] = {}
+    point_cells: List[str] = []
+    for lat, lon in points:
+        cell, _, _ = grid_cell(lat, lon, weather_cache.resolution)
+        cells.setdefault(cell, (lat, lon))
+        point_cells.append(cell)
+
+    semaphore = asyncio.Semaphore(_batch_concurrency())
+
+    async def load(lat: float, lon: float) -> Dict[str, Any]:
+        async with semaphore:
+            return await weather_cache.get(lat, lon, fetch=fetch_weather_snapshot, endpoint=endpoint)
+
+    results = await asyncio.gather(*(load(lat, lon) for lat, lon in cells.values()), return_exceptions=True)
+    by_cell = dict(zip(cells.keys(), results))
+
+    now = datetime.now(timezone.utc)
+    items: List[Dict[str, Any]] = []
+    for (lat, lon), cell in zip(points, point_cells):
+        result = by_cell[cell]
+        item: Dict[str, Any] = {"lat": lat, "lon": lon, "cell": cell}
+        if isinstance(result, BaseException):
+            print(f"[WeatherBatch] {cell} failed: {type(result).__name__} {result}")
+            item.update(ok=False, error="Weather unavailable")
+        else:
+            # Points in the same cell share the cached snapshot; solunar windows are per point
+            weather = dict(result)
+            weather["is_major_period"] = _is_major_solunar_period(now, lat, lon)
+            item.update(ok=True, weather=weather)
+        items.append(item)
+    return items
+
+
+# One Call returns today + 7 days of daily forecast
+FORECAST_DAYS = 8
+
+
+def local_date(snapshot: Dict[str, Any], lon: float) -> date:
+    """
+    Today's date at the snapshot's location, from the provider's UTC offset
+    (estimated from longitude for snapshots cached before it was recorded).
+    """
+    offset = snapshot.get("tz_offset")
+    if offset is None:
+        offset = round(lon / 15) * 3600
+    return datetime.now(timezone(timedelta(seconds=offset))).date()
+
+
+async def get_forecast_snapshot(
+    lat: float,
+    lon: float,
+    trip_date: date,
+    endpoint: str = "default",
+) -> Dict[str, Any]:
+    """
+    Snapshot for a trip date within the next 7 days, built from the daily
+    forecast stored by the last One Call fetch for the grid cell. Today's date
+    returns the live snapshot. Only fetches upstream when the cell has no
+    fresh forecast.
+
+    Raises ValueError when trip_date is outside the forecast range.
+    """
+    day = trip_date.isoformat()
+    snapshot = weather_cache.get_forecast_day(lat, lon, day)
+    if snapshot is None:
+        current = await get_weather_snapshot(lat, lon, endpoint=endpoint)
+        if current.get("forecast_date") == day:
+            return current
+        snapshot = weather_cache.get_forecast_day(lat, lon, day)
+        if snapshot is None:
+            # Snapshot was still fresh but its forecast had expired (or was never stored)
+            await weather_cache.refresh(lat, lon, fetch=fetch_weather_snapshot)
+            snapshot = weather_cache.get_forecast_day(lat, lon, day)
+    if snapshot is None:
+        raise ValueError(f"No forecast available for {day}")
+    if snapshot.get("is_today"):
+        return await get_weather_snapshot(lat, lon, endpoint=endpoint)
+    return snapshot
+
+
+def _parse_daily_forecast(data: Dict[str, Any], lat: float, lon: float) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-day snapshots (same keys as get_weather_snapshot) for every daily
+    entry in a One Call response, keyed by local date (YYYY-MM-DD).
+    Hourly entries for the day are attached as a compact "hourly" list.
+    """
+    tz_offset = data.get("timezone_offset", 0)
+    tz = timezone(timedelta(seconds=tz_offset))
+
+    hourly_by_day: Dict[str, list] = {}
+    for hour in data.get("hourly", []) or []:
+        if not hour.get("dt"):
+            continue
+        local = datetime.fromtimestamp(hour["dt"], tz=tz)
+        hourly_by_day.setdefault(local.date().isoformat(), []).append({
+            "time": local.strftime("%-I %p"),
+            "temp_f": hour.get("temp"),
+            "wind_mph": hour.get("wind_speed"),
+            "pressure_mb": hour.get("pressure"),
+            "cloud_pct": hour.get("clouds"),
+            "pop": hour.get("pop"),
+        })
+
+    days: Dict[str, Dict[str, Any]] = {}
+    daily = data.get("daily", []) or []
+    for i, entry in enumerate(daily[:FORECAST_DAYS]):
+        if not entry.get("dt"):
+            continue
+        local_day = datetime.fromtimestamp(entry["dt"], tz=tz).date()
+        temps = entry.get("temp", {}) or {}
+        pressure_mb = entry.get("pressure")
+
+        # Day-over-day pressure change stands in for the 3h trend on future days
+        prev_pressure = daily[i - 1].get("pressure") if i > 0 else None
+        if pressure_mb is not None and prev_pressure is not None:
+            delta = pressure_mb - prev_pressure
+            pressure_trend = "rising" if delta >= 3 else "falling" if delta <= -3 else "stable"
+        else:
+            pressure_trend = "stable"
+
+        sunrise_unix = entry.get("sunrise")
+        sunset_unix = entry.get("sunset")
+        solar_noon_unix = (sunrise_unix + sunset_unix) // 2 if sunrise_unix and sunset_unix else None
+        rain = entry.get("rain", 0) or 0
+        prev_rain = (daily[i - 1].get("rain", 0) or 0) if i > 0 else 0
+
+        moon_phase, moon_illumination = _calculate_moon_phase(
+            datetime(local_day.year, local_day.month, local_day.day, 12, tzinfo=tz)
+        )
+
+        days[local_day.isoformat()] = {
+            "temp_f": temps.get("day"),
+            "temp_high": temps.get("max"),
+            "temp_low": temps.get("min"),
+            "wind_mph": entry.get("wind_speed"),
+            "cloud_cover": (entry.get("weather") or [{}])[0].get("description", "clear"),
+            "pressure_mb": pressure_mb,
+            "pressure_trend": pressure_trend,
+            "uv_index": entry.get("uvi"),
+            "precipitation_1h": 0,
+            "has_recent_rain": rain > 0 or prev_rain > 0,
+            "moon_phase": moon_phase,
+            "moon_illumination": moon_illumination,
+            # Solunar windows are time-of-day specific; a whole-day forecast has none
+            "is_major_period": False,
+            "humidity": entry.get("humidity"),
+            "sunriseTime": format_local_time(sunrise_unix, tz_offset),
+            "solarNoonTime": format_local_time(solar_noon_unix, tz_offset),
+            "sunsetTime": format_local_time(sunset_unix, tz_offset),
+            "forecast_date": local_day.isoformat(),
+            "is_today": i == 0,
+            "hourly": hourly_by_day.get(local_day.isoformat(), []),
+        }
+    return days
+
+
+# ----------------------------------------
+# Provider chain: One Call 3.0 → 2.5 current+forecast → last cached snapshot
+# ----------------------------------------
+
+# Every provider's result is normalized to these keys (value = default)
+SNAPSHOT_DEFAULTS: Dict[str, Any] = {
+    "temp_f": None,
+    "temp_high": None,
+    "temp_low": None,
+    "wind_mph": None,
+    "cloud_cover": "partly cloudy",
+    "pressure_mb": None,
+    "pressure_trend": "stable",
+    "pressure_change_3h": None,
+    "pressure_change_6h": None,
+    "pressure_change_12h": None,
+    "uv_index": None,
+    "precipitation_1h": 0.0,
+    "has_recent_rain": False,
+    "moon_phase": None,
+    "moon_illumination": None,
+    "is_major_period": False,
+    "humidity": None,
+    "sunriseTime": "--:--",
+    "solarNoonTime": "--:--",
+    "sunsetTime": "--:--",
+    "forecast_date": None,
+    "tz_offset": None,  # location's UTC offset in seconds, from the provider
+}
+
+_FLOAT_FIELDS = (
+    "temp_f", "temp_high", "temp_low", "wind_mph", "pressure_mb",
+    "uv_index", "precipitation_1h", "moon_illumination",
+)
+
+
+def _normalize_snapshot(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Same dict shape and units (imperial, precipitation in inches) from every provider."""
+    out = dict(SNAPSHOT_DEFAULTS)
+    out.update({k: v for k, v in raw.items() if v is not None})
+    for key in _FLOAT_FIELDS:
+        if out[key] is not None:
+            try:
+                out[key] = float(out[key])
+            except (TypeError, ValueError):
+                out[key] = SNAPSHOT_DEFAULTS[key]
+    if out["humidity"] is not None:
+        out["humidity"] = int(out["humidity"])
+    out["has_recent_rain"] = bool(out["has_recent_rain"])
+    if out["moon_illumination"] is None:
+        # One Call only gives a 0-1 phase fraction; use the named phase + illumination everywhere
+        out["moon_phase"], out["moon_illumination"] = _calculate_moon_phase()
+    return out
+
+
+def _api_key() -> str:
     api_key = os.getenv("OPENWEATHER_API_KEY")
     if not api_key:
         raise RuntimeError("Missing OPENWEATHER_API_KEY")
+    return api_key
+
+
+async def _provider_onecall(lat: float, lon: float) -> Dict[str, Any]:
+    return _normalize_snapshot(await _get_weather_onecall(lat, lon, _api_key()))
+
+
+async def _provider_owm25(lat: float, lon: float) -> Dict[str, Any]:
+    return _normalize_snapshot(await _get_weather_fallback(lat, lon, _api_key()))
+
+
+async def _provider_last_cached(lat: float, lon: float) -> Dict[str, Any]:
+    cached = weather_cache.peek(lat, lon)
+    if cached is None:
+        raise RuntimeError("no cached snapshot for cell")
+    age_seconds, snapshot = cached
+    snapshot["weather_age_seconds"] = int(age_seconds)
+    return snapshot
 
+
+weather_providers = ProviderChain([
+    WeatherProvider("onecall", _provider_onecall, timeout=float(os.getenv("WEATHER_ONECALL_TIMEOUT", "2.5"))),
+    WeatherProvider("owm25", _provider_owm25, timeout=float(os.getenv("WEATHER_OWM25_TIMEOUT", "2.5"))),
+    WeatherProvider("last_cached", _provider_last_cached, timeout=0, use_breaker=False),
+])
+
+
+async def fetch_weather_snapshot(lat: float, lon: float) -> Dict[str, Any]:
+    """
+    One upstream fetch through the provider chain (within its latency budget),
+    bypassing the cache. This is the fetch= the weather cache and the
+    prefetcher use; it also records the cell's pressure history and forecast.
+    """
+    return await weather_providers.fetch(lat, lon)
+
+
+async def _get_weather_onecall(lat: float, lon: float, api_key: str) -> Dict[str, Any]:
     url = "https://api.openweathermap.org/data/3.0/onecall"
     params = {
         "lat": lat,
         "lon": lon,
         "appid": api_key,
         "units": "imperial",
-        "exclude": "minutely,hourly"
+        # hourly feeds the pressure history (forecast pressure per hour)
+        "exclude": "minutely"
     }
 
     # ✅ THIS WAS MISSING: Actually make the API call
-    async with httpx.AsyncClient() as client:
+    async with client_for("openweather") as client:
         response = await client.get(url, params=params)
         response.raise_for_status()
         data = response.json()
@@ -174,9 +516,19 @@ async def get_weather_snapshot(lat: float, lon: float) -> Dict[str, Any]:
     else:
         solar_noon_unix = None
 
-    # Calculate Pressure Trend (Simple logic)
+    # Pressure trend from the cell's pressure history
     pressure_mb = current.get("pressure")
-    pressure_trend = "stable" # Placeholder for complex trend logic
+    pressure = await _pressure_trend_from_history(lat, lon, pressure_mb, data)
+    pressure_trend = pressure["pressure_trend"] or "stable"
+
+    # Keep the whole forecast from this call for trip-date plans
+    try:
+        forecast = _parse_daily_forecast(data, lat, lon)
+        weather_cache.put_forecast(lat, lon, forecast)
+    except Exception as e:
+        print(f"[Weather] Forecast parse failed: {e}")
+        forecast = {}
+    today = next((day for day, snap in forecast.items() if snap.get("is_today")), None)
 
     return {
         "temp_f": current.get("temp"),
@@ -186,18 +538,24 @@ async def get_weather_snapshot(lat: float, lon: float) -> Dict[str, Any]:
         "cloud_cover": current.get("weather", [{}])[0].get("description", "clear"),
         "pressure_mb": pressure_mb,
         "pressure_trend": pressure_trend,
+        "pressure_change_3h": pressure.get("pressure_change_3h"),
+        "pressure_change_6h": pressure.get("pressure_change_6h"),
+        "pressure_change_12h": pressure.get("pressure_change_12h"),
         "uv_index": current.get("uvi"),
-        "precipitation_1h": current.get("rain", {}).get("1h", 0),
+        # OpenWeather reports rain in mm even with units=imperial
+        "precipitation_1h": round(current.get("rain", {}).get("1h", 0) * 0.0393701, 2),
         "has_recent_rain": daily_today.get("rain", 0) > 0,
         "moon_phase": str(daily_today.get("moon_phase")),
         "moon_illumination": daily_today.get("moon_illumination"),
-        "is_major_period": False, 
+        "is_major_period": _is_major_solunar_period(datetime.now(timezone.utc), lat, lon),
         "humidity": current.get("humidity"),
         
         # ✅ TIMEZONE FIXED SOLAR DATA
         "sunriseTime": format_local_time(sunrise_unix, tz_offset),
         "solarNoonTime": format_local_time(solar_noon_unix, tz_offset),
         "sunsetTime": format_local_time(sunset_unix, tz_offset),
+        "forecast_date": today,
+        "tz_offset": tz_offset,
     }
 
 def format_weather_time(unix_timestamp: int, tz_offset: int = 0) -> str:
@@ -208,70 +566,6 @@ def format_weather_time(unix_timestamp: int, tz_offset: int = 0) -> str:
     dt = datetime.fromtimestamp(unix_timestamp, tz=timezone.utc)
     return dt.strftime("%-I:%M %p")
 
-async def _get_weather_onecall(lat: float, lon: float, api_key: str) -> Dict[str, Any]:
-    url = "https://api.openweathermap.org/data/3.0/onecall"
-    params = {
-        "lat": lat,
-        "lon": lon,
-        "appid": api_key,
-        "units": "imperial",
-        "exclude": "minutely,hourly"
-    }
-
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-    current = data.get("current", {})
-    daily_today = data.get("daily", [{}])[0]
-    
-    # ☀️ SOLAR PLUMBING: Extract and Format
-    sunrise_unix = daily_today.get("sunrise")
-    sunset_unix = daily_today.get("sunset")
-    
-    # Calculate Solar Noon (Midpoint) since OpenWeather doesn't provide it directly
-    solar_noon_unix = (sunrise_unix + sunset_unix) // 2 if sunrise_unix and sunset_unix else None
-
-    # Determine Pressure Trend (Logic for Bass activity)
-    # Simple logic: Compare current pressure to a baseline or daily average if available
-    pressure_mb = current.get("pressure")
-    pressure_trend = "stable"
-    # (Advanced: You could compare this against 'daily_today' if your API provides 3hr steps)
-
-    return {
-        # Temperature
-        "temp_f": current.get("temp"),
-        "temp_high": daily_today.get("temp", {}).get("max"),
-        "temp_low": daily_today.get("temp", {}).get("min"),
-        
-        # Wind & Sky
-        "wind_mph": current.get("wind_speed"),
-        "cloud_cover": current.get("weather", [{}])[0].get("description", "clear"),
-        
-        # Barometric Pressure
-        "pressure_mb": pressure_mb,
-        "pressure_trend": pressure_trend,
-        
-        # Precipitation
-        "precipitation_1h": current.get("rain", {}).get("1h", 0),
-        "has_recent_rain": daily_today.get("rain", 0) > 0,
-        
-        # Light & Moon
-        "uv_index": current.get("uvi"),
-        "moon_phase": str(daily_today.get("moon_phase")),
-        "moon_illumination": daily_today.get("moon_illumination"),
-        "is_major_period": False, # Placeholder for Solunar logic
-        
-        # Other
-        "humidity": current.get("humidity"),
-        
-        # ✅ STRATEGIC FIX: Added keys for the Frontend Solar Strip
-        "sunriseTime": format_weather_time(sunrise_unix),
-        "solarNoonTime": format_weather_time(solar_noon_unix),
-        "sunsetTime": format_weather_time(sunset_unix)
-    }
-
 async def _get_weather_fallback(lat: float, lon: float, api_key: str) -> Dict[str, Any]:
     """
     Fallback: Use current weather + 5-day forecast (free tier).
@@ -282,7 +576,7 @@ async def _get_weather_fallback(lat: float, lon: float, api_key: str) -> Dict[st
     current_url = "https://api.openweathermap.org/data/2.5/weather"
     current_params = {"lat": lat, "lon": lon, "appid": api_key, "units": "imperial"}
     
-    async with httpx.AsyncClient(timeout=10) as client:
+    async with client_for("openweather") as client:
         r = await client.get(current_url, params=current_params)
         r.raise_for_status()
         current_data = r.json()
@@ -299,7 +593,9 @@ async def _get_weather_fallback(lat: float, lon: float, api_key: str) -> Dict[st
     humidity = main.get("humidity", 50)  # Default to 50% if missing
     
     # UV index not available in free tier, estimate from cloud cover
-    if clouds_pct < 20:
+    if clouds_pct is None:
+        uv_index = 4.0
+    elif clouds_pct < 20:
         uv_index = 7.0  # Clear day estimate
     elif clouds_pct < 60:
         uv_index = 4.0  # Partly cloudy
@@ -316,7 +612,7 @@ async def _get_weather_fallback(lat: float, lon: float, api_key: str) -> Dict[st
     has_recent_rain = rain_1h > 0
     
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
+        async with client_for("openweather") as client:
             r = await client.get(forecast_url, params=forecast_params)
             r.raise_for_status()
             forecast_data = r.json()
@@ -348,13 +644,21 @@ async def _get_weather_fallback(lat: float, lon: float, api_key: str) -> Dict[st
     
     cloud_cover = _cloud_cover_from_pct(clouds_pct)
     
-    # Barometric pressure trend
-    pressure_trend = _detect_pressure_trend(pressure_mb, lat, lon)
+    # Barometric pressure trend (history first, then the standard-pressure heuristic)
+    pressure = await _pressure_trend_from_history(lat, lon, pressure_mb)
+    pressure_trend = _detect_pressure_trend(pressure_mb, pressure.get("pressure_trend"))
     
     # Moon phase
     moon_phase, moon_illumination = _calculate_moon_phase()
     is_major_period = _is_major_solunar_period(datetime.now(timezone.utc), lat, lon)
     
+    # Solar times (2.5 current weather carries sunrise/sunset + timezone offset)
+    sys_data = current_data.get("sys", {})
+    tz_offset = current_data.get("timezone", 0)
+    sunrise_unix = sys_data.get("sunrise")
+    sunset_unix = sys_data.get("sunset")
+    solar_noon_unix = (sunrise_unix + sunset_unix) // 2 if sunrise_unix and sunset_unix else None
+    
     return {
         # Temperature
         "temp_f": float(temp_f),
@@ -381,4 +685,9 @@ async def _get_weather_fallback(lat: float, lon: float, api_key: str) -> Dict[st
         
         # Other
         "humidity": int(humidity),
+        
+        "sunriseTime": format_local_time(sunrise_unix, tz_offset),
+        "solarNoonTime": format_local_time(solar_noon_unix, tz_offset),
+        "sunsetTime": format_local_time(sunset_unix, tz_offset),
+        "tz_offset": tz_offset,
     }
\ No newline at end of file
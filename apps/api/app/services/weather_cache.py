@@ -0,0 +1,238 @@
+# apps/api/app/services/weather_cache.py
+"""
+Geo-bucketed weather snapshot cache.
+
+Snapshots are keyed on a lat/lon grid cell (WEATHER_CACHE_CELL_DEG, default
+0.1° ≈ 11 km) and fetched for the cell center, so every request inside the
+cell shares one OpenWeather call per TTL.
+
+- Fresh (age < TTL): served from memory.
+- Stale (TTL ≤ age < TTL + STALE): served immediately, refreshed in the background.
+- Older / missing: fetched; concurrent misses for a cell share one upstream call
+  (single-flight). If the fetch fails or exceeds the refresh wait, the last
+  known snapshot is served instead of an error.
+
+The same fetch also stores per-day forecast snapshots for the cell (trip-date
+plans read those instead of calling upstream again).
+
+Hit rates are tracked per calling endpoint.
+"""
+from __future__ import annotations
+
+import asyncio
+import copy
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+Fetcher = Callable[[float, float], Awaitable[Dict[str, Any]]]
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def grid_cell(lat: float, lon: float, resolution_deg: Optional[float] = None) -> Tuple[str, float, float]:
+    """
+    Snap a coordinate to its grid cell.
+    Returns (cell_id, center_lat, center_lon).
+    """
+    res = resolution_deg or _env_float("WEATHER_CACHE_CELL_DEG", 0.1)
+    i = math.floor(lat / res)
+    j = math.floor(lon / res)
+    digits = max(len(f"{res:.6f}".rstrip("0").split(".")[1]), 1) + 1
+    center_lat = round((i + 0.5) * res, digits)
+    center_lon = round((j + 0.5) * res, digits)
+    return f"{res:g}:{i}:{j}", center_lat, center_lon
+
+
+class _EndpointStats:
+    __slots__ = ("hits", "stale_hits", "misses", "coalesced", "fallbacks", "errors")
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.fallbacks = 0
+        self.errors = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        served = self.hits + self.stale_hits + self.misses + self.coalesced
+        cached = self.hits + self.stale_hits + self.coalesced
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "fallbacks": self.fallbacks,
+            "errors": self.errors,
+            "hit_rate": round(cached / served, 4) if served else 0.0,
+        }
+
+
+class WeatherCache:
+    """
+    In-process cache of weather snapshots per grid cell.
+    Configured from env:
+      WEATHER_CACHE_ENABLED               (default: on)
+      WEATHER_CACHE_CELL_DEG              grid resolution in degrees (default: 0.1)
+      WEATHER_CACHE_TTL_SECONDS           fresh window (default: 600)
+      WEATHER_CACHE_STALE_SECONDS         serve-while-revalidate window after TTL (default: 1800)
+      WEATHER_CACHE_REFRESH_WAIT_SECONDS  max wait on a refresh before falling back to old data (default: 6)
+      WEATHER_CACHE_MAX_CELLS             (default: 5000)
+      WEATHER_FORECAST_TTL_SECONDS        daily forecast freshness for trip-date plans (default: 10800)
+    """
+
+    def __init__(self) -> None:
+        self.enabled = os.getenv("WEATHER_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+        self.resolution = _env_float("WEATHER_CACHE_CELL_DEG", 0.1)
+        self.ttl = _env_float("WEATHER_CACHE_TTL_SECONDS", 600)
+        self.stale = _env_float("WEATHER_CACHE_STALE_SECONDS", 1800)
+        self.refresh_wait = _env_float("WEATHER_CACHE_REFRESH_WAIT_SECONDS", 6)
+        self.max_cells = int(_env_float("WEATHER_CACHE_MAX_CELLS", 5000))
+        self.forecast_ttl = _env_float("WEATHER_FORECAST_TTL_SECONDS", 10800)
+
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # cell -> (fetched_at, {"YYYY-MM-DD": day snapshot}) from the same One Call fetch
+        self._forecasts: "OrderedDict[str, Tuple[float, Dict[str, Dict[str, Any]]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats: Dict[str, _EndpointStats] = {}
+        self.upstream_calls = 0
+
+    def _endpoint(self, name: str) -> _EndpointStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = _EndpointStats()
+        return stats
+
+    def _store(self, cell: str, snapshot: Dict[str, Any]) -> None:
+        self._entries[cell] = (time.time(), snapshot)
+        self._entries.move_to_end(cell)
+        while len(self._entries) > self.max_cells:
+            self._entries.popitem(last=False)
+
+    def peek(self, lat: float, lon: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """(age_seconds, snapshot copy) for the cell, without fetching."""
+        cell, _, _ = grid_cell(lat, lon, self.resolution)
+        entry = self._entries.get(cell)
+        if entry is None:
+            return None
+        return time.time() - entry[0], copy.deepcopy(entry[1])
+
+    def put(self, lat: float, lon: float, snapshot: Dict[str, Any]) -> None:
+        """Seed the cell with a snapshot fetched elsewhere."""
+        cell, _, _ = grid_cell(lat, lon, self.resolution)
+        self._store(cell, copy.deepcopy(snapshot))
+
+    def put_forecast(self, lat: float, lon: float, days: Dict[str, Dict[str, Any]]) -> None:
+        """Store per-day forecast snapshots parsed from a fetch for this cell."""
+        cell, _, _ = grid_cell(lat, lon, self.resolution)
+        self._forecasts[cell] = (time.time(), days)
+        self._forecasts.move_to_end(cell)
+        while len(self._forecasts) > self.max_cells:
+            self._forecasts.popitem(last=False)
+
+    def get_forecast_day(self, lat: float, lon: float, day: str) -> Optional[Dict[str, Any]]:
+        """Fresh forecast snapshot for day (YYYY-MM-DD) in this cell, or None."""
+        cell, _, _ = grid_cell(lat, lon, self.resolution)
+        entry = self._forecasts.get(cell)
+        if entry is None or time.time() - entry[0] >= self.forecast_ttl:
+            return None
+        snapshot = entry[1].get(day)
+        return copy.deepcopy(snapshot) if snapshot is not None else None
+
+    async def refresh(self, lat: float, lon: float, fetch: Fetcher) -> Dict[str, Any]:
+        """Fetch the cell now regardless of freshness (still single-flight)."""
+        cell, center_lat, center_lon = grid_cell(lat, lon, self.resolution)
+        snapshot = await asyncio.shield(self._refresh(cell, center_lat, center_lon, fetch))
+        return copy.deepcopy(snapshot)
+
+    def _refresh(self, cell: str, lat: float, lon: float, fetch: Fetcher) -> asyncio.Task:
+        """Start (or join) the single upstream fetch for this cell."""
+        task = self._inflight.get(cell)
+        if task is not None:
+            return task
+
+        async def run() -> Dict[str, Any]:
+            try:
+                self.upstream_calls += 1
+                snapshot = await fetch(lat, lon)
+                # A fetcher falling back to this cache's own entry must not refresh its age
+                if snapshot.get("weather_source") != "last_cached":
+                    self._store(cell, snapshot)
+                return snapshot
+            finally:
+                self._inflight.pop(cell, None)
+
+        task = asyncio.create_task(run())
+        # Background refreshes may never be awaited; don't let their errors go unobserved
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[cell] = task
+        return task
+
+    async def get(self, lat: float, lon: float, fetch: Fetcher, endpoint: str = "default") -> Dict[str, Any]:
+        stats = self._endpoint(endpoint)
+        if not self.enabled:
+            stats.misses += 1
+            return await fetch(lat, lon)
+
+        cell, center_lat, center_lon = grid_cell(lat, lon, self.resolution)
+        entry = self._entries.get(cell)
+        now = time.time()
+
+        if entry is not None:
+            age = now - entry[0]
+            if age < self.ttl:
+                stats.hits += 1
+                self._entries.move_to_end(cell)
+                return copy.deepcopy(entry[1])
+            if age < self.ttl + self.stale:
+                stats.stale_hits += 1
+                self._refresh(cell, center_lat, center_lon, fetch)
+                return copy.deepcopy(entry[1])
+
+        joined = cell in self._inflight
+        task = self._refresh(cell, center_lat, center_lon, fetch)
+        if joined:
+            stats.coalesced += 1
+        else:
+            stats.misses += 1
+
+        try:
+            if entry is None:
+                snapshot = await asyncio.shield(task)
+            else:
+                snapshot = await asyncio.wait_for(asyncio.shield(task), timeout=self.refresh_wait)
+        except Exception as e:
+            if entry is None:
+                stats.errors += 1
+                raise
+            # Upstream slow or down: keep serving the last snapshot for this cell
+            stats.fallbacks += 1
+            print(f"[WeatherCache] Serving last snapshot for {cell} ({type(e).__name__})")
+            return copy.deepcopy(entry[1])
+
+        return copy.deepcopy(snapshot)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "cell_deg": self.resolution,
+            "ttl_seconds": self.ttl,
+            "stale_seconds": self.stale,
+            "cells": len(self._entries),
+            "forecast_cells": len(self._forecasts),
+            "inflight": len(self._inflight),
+            "upstream_calls": self.upstream_calls,
+            "endpoints": {name: s.snapshot() for name, s in sorted(self._stats.items())},
+        }
+
+
+# Global instance
+weather_cache = WeatherCache()
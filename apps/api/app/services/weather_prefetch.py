@@ -0,0 +1,208 @@
+# apps/api/app/services/weather_prefetch.py
+"""
+Popular-lake weather prefetcher.
+
+Plan traffic clusters on a few dozen lakes around dawn. This background task
+keeps those lakes' grid cells warm in the weather cache so peak-hour
+/plan/generate is served from memory instead of waiting on OpenWeather.
+
+- Every WEATHER_PREFETCH_RELOAD_SECONDS the top-N lakes are mined from
+  plan_history (plan counts per lake over the lookback window), with their
+  coordinates from plan_history's lat/lon (or, for older rows, the plan's
+  stored conditions in plan_links). Lakes sharing a grid cell collapse into
+  one target.
+- Every tick, targets whose local solar time is inside the morning window
+  (WEATHER_PREFETCH_WINDOW_START_HOUR..END_HOUR, starting before the peak) are
+  refreshed when their cached snapshot is missing or about to go stale. The
+  refresh goes through the provider chain, so pressure history and the daily
+  forecast for the cell are recorded at the same time.
+- Refreshes are paced to WEATHER_PREFETCH_MAX_PER_MINUTE, leaving the rest of
+  the provider's rate limit to live traffic. A pass stops early when upstream
+  is failing (the chain fell back to the last cached snapshot).
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.services.lake_catalog import get_catalog
+from app.services.weather import fetch_weather_snapshot
+from app.services.weather_cache import grid_cell, weather_cache
+
+Fetcher = Callable[[float, float], Awaitable[Dict[str, Any]]]
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def local_solar_hour(lon: float, now: Optional[datetime] = None) -> float:
+    """Approximate local hour of day from longitude (15° per hour), 0..24."""
+    now = now or datetime.now(timezone.utc)
+    utc_hour = now.hour + now.minute / 60 + now.second / 3600
+    return (utc_hour + lon / 15.0) % 24
+
+
+class WeatherPrefetcher:
+    """
+    Scheduled weather refresh for the most-planned lakes.
+    Configured from env:
+      WEATHER_PREFETCH_ENABLED             (default: on)
+      WEATHER_PREFETCH_TOP_N               lakes to keep warm (default: 50)
+      WEATHER_PREFETCH_LOOKBACK_DAYS       plan history window for popularity (default: 14)
+      WEATHER_PREFETCH_WINDOW_START_HOUR   local solar hour to start prefetching (default: 3.5)
+      WEATHER_PREFETCH_WINDOW_END_HOUR     local solar hour to stop (default: 9)
+      WEATHER_PREFETCH_MAX_PER_MINUTE      upstream refreshes per minute (default: 20)
+      WEATHER_PREFETCH_MARGIN_SECONDS      refresh this long before the cache TTL expires (default: 120)
+      WEATHER_PREFETCH_TICK_SECONDS        (default: 60)
+      WEATHER_PREFETCH_RELOAD_SECONDS      how often to re-mine the top-N list (default: 3600)
+    """
+
+    def __init__(self, history_store, link_store, fetch: Optional[Fetcher] = None) -> None:
+        self.history_store = history_store
+        self.link_store = link_store
+        self.fetch = fetch or fetch_weather_snapshot
+
+        self.enabled = os.getenv("WEATHER_PREFETCH_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+        self.top_n = int(_env_float("WEATHER_PREFETCH_TOP_N", 50))
+        self.lookback_days = _env_float("WEATHER_PREFETCH_LOOKBACK_DAYS", 14)
+        self.window_start = _env_float("WEATHER_PREFETCH_WINDOW_START_HOUR", 3.5)
+        self.window_end = _env_float("WEATHER_PREFETCH_WINDOW_END_HOUR", 9)
+        self.max_per_minute = max(_env_float("WEATHER_PREFETCH_MAX_PER_MINUTE", 20), 1)
+        self.margin = _env_float("WEATHER_PREFETCH_MARGIN_SECONDS", 120)
+        self.tick = _env_float("WEATHER_PREFETCH_TICK_SECONDS", 60)
+        self.reload_seconds = _env_float("WEATHER_PREFETCH_RELOAD_SECONDS", 3600)
+
+        self.targets: List[Dict[str, Any]] = []
+        self._loaded_at = 0.0
+        self._last_call = 0.0
+        self.passes = 0
+        self.refreshed = 0
+        self.skipped_fresh = 0
+        self.failures = 0
+        self.aborted_passes = 0
+        self.last_pass_at: Optional[float] = None
+
+    # ----------------------------------------
+    # Target selection
+    # ----------------------------------------
+
+    def load_targets(self) -> List[Dict[str, Any]]:
+        """Top-N lakes with coordinates, one entry per grid cell."""
+        since = datetime.now(timezone.utc) - timedelta(days=self.lookback_days)
+        # Over-fetch: some lakes share a cell and old plans may lack coordinates
+        lakes = self.history_store.top_lakes(since=since, limit=self.top_n * 2)
+        # Rows written before plan_history stored coordinates fall back to the plan itself
+        locations = self.link_store.get_locations([lake["plan_link_id"] for lake in lakes if lake["lat"] is None])
+
+        by_cell: Dict[str, Dict[str, Any]] = {}
+        for lake in lakes:
+            if lake["lat"] is not None and lake["lon"] is not None:
+                loc = (lake["lat"], lake["lon"])
+            else:
+                loc = locations.get(lake["plan_link_id"])
+            if loc is None:
+                continue
+            cell, _, _ = grid_cell(loc[0], loc[1], weather_cache.resolution)
+            # Label with the catalog name when the lake is known, not the client's spelling
+            known = get_catalog().resolve(loc[0], loc[1])
+            name = known["name"] if known else lake["lake_name"]
+            target = by_cell.get(cell)
+            if target is None:
+                if len(by_cell) >= self.top_n:
+                    continue
+                by_cell[cell] = {"cell": cell, "lat": loc[0], "lon": loc[1], "lakes": [name], "plans": lake["plans"]}
+            else:
+                if name not in target["lakes"]:
+                    target["lakes"].append(name)
+                target["plans"] += lake["plans"]
+
+        return sorted(by_cell.values(), key=lambda t: t["plans"], reverse=True)
+
+    def in_window(self, lon: float, now: Optional[datetime] = None) -> bool:
+        hour = local_solar_hour(lon, now)
+        if self.window_start <= self.window_end:
+            return self.window_start <= hour < self.window_end
+        return hour >= self.window_start or hour < self.window_end
+
+    def _needs_refresh(self, lat: float, lon: float) -> bool:
+        cached = weather_cache.peek(lat, lon)
+        return cached is None or cached[0] >= weather_cache.ttl - self.margin
+
+    # ----------------------------------------
+    # Refresh
+    # ----------------------------------------
+
+    async def _pace(self) -> None:
+        gap = 60.0 / self.max_per_minute
+        wait = self._last_call + gap - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._last_call = time.monotonic()
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """One pass over in-window targets. Returns the number of cells refreshed."""
+        if time.time() - self._loaded_at >= self.reload_seconds:
+            try:
+                self.targets = await asyncio.to_thread(self.load_targets)
+                self._loaded_at = time.time()
+                print(f"[WeatherPrefetch] Tracking {len(self.targets)} popular cell(s)")
+            except Exception as e:
+                print(f"[WeatherPrefetch] Loading popular lakes failed: {e}")
+
+        self.passes += 1
+        self.last_pass_at = time.time()
+        refreshed = 0
+        for target in self.targets:
+            if not self.in_window(target["lon"], now):
+                continue
+            if not self._needs_refresh(target["lat"], target["lon"]):
+                self.skipped_fresh += 1
+                continue
+
+            await self._pace()
+            try:
+                snapshot = await weather_cache.refresh(target["lat"], target["lon"], fetch=self.fetch)
+            except Exception as e:
+                self.failures += 1
+                print(f"[WeatherPrefetch] Refresh failed for {target['cell']}: {type(e).__name__} {e}")
+                continue
+
+            if snapshot.get("weather_source") == "last_cached":
+                # Upstream is down or rate limited; don't spend the rest of the pass on it
+                self.aborted_passes += 1
+                break
+            refreshed += 1
+            self.refreshed += 1
+        return refreshed
+
+    async def run(self) -> None:
+        if not self.enabled:
+            return
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"[WeatherPrefetch] Pass failed: {e}")
+            await asyncio.sleep(self.tick)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "targets": len(self.targets),
+            "top_lakes": [t["lakes"][0] for t in self.targets[:10]],
+            "window_hours": [self.window_start, self.window_end],
+            "max_per_minute": self.max_per_minute,
+            "passes": self.passes,
+            "refreshed": self.refreshed,
+            "skipped_fresh": self.skipped_fresh,
+            "failures": self.failures,
+            "aborted_passes": self.aborted_passes,
+            "last_pass_at": self.last_pass_at,
+        }
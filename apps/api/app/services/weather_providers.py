@@ -0,0 +1,197 @@
+# apps/api/app/services/weather_providers.py
+"""
+Weather provider failover chain.
+
+Providers are tried in order inside one overall latency budget
+(WEATHER_LATENCY_BUDGET_SECONDS, default 4s). Each provider has its own
+timeout cap and circuit breaker:
+
+- closed:    calls go through; WEATHER_BREAKER_FAILURES consecutive failures open it
+             (an HTTP 429 opens it immediately)
+- open:      calls are skipped for WEATHER_BREAKER_RESET_SECONDS
+- half-open: one trial call; success closes, failure re-opens. A trial that
+             is cancelled (client gone, shutdown) is released, and one that
+             never reports back is abandoned after the reset window
+
+Per-provider calls, successes, failures, timeouts, skips and latency are
+recorded for /metrics.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+Fetcher = Callable[[float, float], Awaitable[Dict[str, Any]]]
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+class WeatherUnavailableError(RuntimeError):
+    """Every provider in the chain failed or was skipped."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_started_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open":
+            now = time.time()
+            if self._trial_started_at is None or now - self._trial_started_at >= self.reset_seconds:
+                self._trial_started_at = now
+                return True
+        return False
+
+    def release_trial(self) -> None:
+        """The trial call ended without a result (cancelled); let the next call try."""
+        self._trial_started_at = None
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_started_at = None
+
+    def record_failure(self, open_now: bool = False) -> None:
+        self.failures += 1
+        self._trial_started_at = None
+        if open_now or self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = time.time()
+
+
+@dataclass
+class WeatherProvider:
+    name: str
+    fetch: Fetcher
+    timeout: float
+    use_breaker: bool = True
+
+
+class _ProviderStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.skipped = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "skipped": self.skipped,
+            "success_rate": round(self.successes / self.calls, 4) if self.calls else 0.0,
+            "avg_latency_ms": round(self.total_ms / self.calls, 1) if self.calls else 0.0,
+            "max_latency_ms": round(self.max_ms, 1),
+        }
+
+
+class ProviderChain:
+    def __init__(self, providers: List[WeatherProvider], budget_seconds: Optional[float] = None):
+        self.providers = providers
+        self.budget_seconds = budget_seconds or _env_float("WEATHER_LATENCY_BUDGET_SECONDS", 4.0)
+        threshold = int(_env_float("WEATHER_BREAKER_FAILURES", 3))
+        reset = _env_float("WEATHER_BREAKER_RESET_SECONDS", 30)
+        self.breakers = {p.name: CircuitBreaker(threshold, reset) for p in providers}
+        self._stats = {p.name: _ProviderStats() for p in providers}
+        self.exhausted = 0
+
+    async def fetch(self, lat: float, lon: float) -> Dict[str, Any]:
+        """First successful provider's snapshot, tagged with weather_source."""
+        deadline = time.perf_counter() + self.budget_seconds
+        errors: List[str] = []
+
+        for provider in self.providers:
+            stats = self._stats[provider.name]
+            breaker = self.breakers[provider.name]
+            if provider.use_breaker and not breaker.allow():
+                stats.skipped += 1
+                errors.append(f"{provider.name}: circuit open")
+                continue
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 and provider.use_breaker:
+                stats.skipped += 1
+                errors.append(f"{provider.name}: budget exhausted")
+                continue
+
+            stats.calls += 1
+            t0 = time.perf_counter()
+            try:
+                if provider.use_breaker:
+                    snapshot = await asyncio.wait_for(provider.fetch(lat, lon), timeout=min(provider.timeout, remaining))
+                else:
+                    # Local tiers (last cached snapshot) are instant and always allowed
+                    snapshot = await provider.fetch(lat, lon)
+            except asyncio.CancelledError:
+                # Neither success nor failure: don't leave a half-open trial marked as running
+                breaker.release_trial()
+                raise
+            except asyncio.TimeoutError:
+                stats.timeouts += 1
+                stats.failures += 1
+                breaker.record_failure()
+                errors.append(f"{provider.name}: timeout")
+                print(f"[WeatherChain] {provider.name} timed out")
+                continue
+            except Exception as e:
+                stats.failures += 1
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                breaker.record_failure(open_now=status == 429)
+                errors.append(f"{provider.name}: {type(e).__name__} {e}")
+                print(f"[WeatherChain] {provider.name} failed: {type(e).__name__} {e}")
+                continue
+            finally:
+                stats.observe((time.perf_counter() - t0) * 1000)
+
+            stats.successes += 1
+            breaker.record_success()
+            snapshot["weather_source"] = provider.name
+            return snapshot
+
+        self.exhausted += 1
+        raise WeatherUnavailableError("; ".join(errors) or "no weather providers configured")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "budget_seconds": self.budget_seconds,
+            "exhausted": self.exhausted,
+            "providers": {
+                p.name: {
+                    **self._stats[p.name].snapshot(),
+                    "timeout_seconds": p.timeout,
+                    "breaker": self.breakers[p.name].state if p.use_breaker else None,
+                }
+                for p in self.providers
+            },
+        }
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark: store calls inline on the event loop vs through the async (aio) views
+
+Simulates concurrent /plan/generate requests doing the same store work as the
+real handler (access check, quota, recent plans, plan lookups, save, history,
+usage increment) and reports, for each mode:
+  - throughput (requests/s)
+  - event-loop lag (how late a 10 ms ticker wakes up while requests run)
+
+Usage:
+    python bench_store_concurrency.py
+    python bench_store_concurrency.py --requests 400 --concurrency 50
+    python bench_store_concurrency.py --rtt-ms 2
+    DATABASE_URL=postgres://... python bench_store_concurrency.py
+
+Runs against scratch SQLite files in a temp directory unless DATABASE_URL is
+set (then it writes bench rows to that database). Local SQLite has no network
+round trip, so --rtt-ms adds a blocking delay to every store call to model
+the hosted Postgres.
+"""
+
+import argparse
+import asyncio
+import functools
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Module-level store instances open data/*.sqlite3 relative to the cwd on
+# import, so move to the scratch directory before importing them
+if not os.getenv("DATABASE_URL"):
+    os.chdir(tempfile.mkdtemp(prefix="bench_db_"))
+
+from app.services import db
+from app.services.plan_history import PlanHistoryStore
+from app.services.plan_links import PlanLinkStore
+from app.services.rate_limits import RateLimitStore
+from app.services.subscribers import SubscriberStore
+
+
+PLAN = {"primary": {"base_lure": "jig"}, "secondary": {"base_lure": "crankbait"}, "conditions": {"latitude": 32.8, "longitude": -95.6}}
+
+
+STORE_METHODS = (
+    "is_active", "is_within_daily_limit", "get_user_plans", "get_plan",
+    "save_plan", "add_plan", "increment_daily_count",
+)
+
+
+def add_round_trip(stores, rtt_ms: float) -> None:
+    """Make every benchmarked store call block for rtt_ms first."""
+    for store in stores:
+        for name in STORE_METHODS:
+            method = getattr(store, name, None)
+            if method is None:
+                continue
+
+            @functools.wraps(method)
+            def slow(*args, _method=method, **kwargs):
+                time.sleep(rtt_ms / 1000)
+                return _method(*args, **kwargs)
+
+            setattr(store, name, slow)
+
+
+def request_sync(stores, email: str) -> None:
+    subs, limits, links, history = stores
+    subs.is_active(email)
+    limits.is_within_daily_limit(email)
+    for plan in history.get_user_plans(email=email, limit=2):
+        links.get_plan(plan["plan_link_id"], count_view=False)
+    token = links.save_plan(email=email, is_member=True, plan_data=PLAN)
+    history.add_plan(user_email=email, plan_link_id=token, lake_name="Bench Lake", plan_type="member", conditions={})
+    limits.increment_daily_count(email)
+
+
+async def request_async(stores, email: str) -> None:
+    subs, limits, links, history = stores
+    await subs.aio.is_active(email)
+    await limits.aio.is_within_daily_limit(email)
+    for plan in await history.aio.get_user_plans(email=email, limit=2):
+        await links.aio.get_plan(plan["plan_link_id"], count_view=False)
+    token = await links.aio.save_plan(email=email, is_member=True, plan_data=PLAN)
+    await history.aio.add_plan(user_email=email, plan_link_id=token, lake_name="Bench Lake", plan_type="member", conditions={})
+    await limits.aio.increment_daily_count(email)
+
+
+async def run_mode(mode: str, stores, requests: int, concurrency: int) -> dict:
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - t0 - 0.01)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            email = f"bench{i % 50}@example.com"
+            if mode == "inline":
+                request_sync(stores, email)  # what the handlers did before: blocks the loop
+                await asyncio.sleep(0)
+            else:
+                await request_async(stores, email)
+
+    tick = asyncio.create_task(ticker())
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - t0
+    done.set()
+    await tick
+
+    lags.sort()
+    return {
+        "rps": requests / elapsed,
+        "elapsed": elapsed,
+        "lag_p50_ms": lags[len(lags) // 2] * 1000 if lags else 0.0,
+        "lag_max_ms": lags[-1] * 1000 if lags else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Store concurrency benchmark")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Simulated database round trip per call")
+    args = parser.parse_args()
+
+    stores = (SubscriberStore(), RateLimitStore(), PlanLinkStore(), PlanHistoryStore())
+    backend = "postgres" if stores[2]._use_pg else "sqlite"
+    if args.rtt_ms:
+        add_round_trip(stores, args.rtt_ms)
+
+    print("=" * 60)
+    print(f"Store concurrency benchmark ({backend})")
+    print("=" * 60)
+    print(f"  requests={args.requests} concurrency={args.concurrency} rtt_ms={args.rtt_ms}")
+
+    for mode in ("inline", "aio"):
+        r = asyncio.run(run_mode(mode, stores, args.requests, args.concurrency))
+        print(
+            f"  {mode:<7} {r['rps']:8.1f} req/s  {r['elapsed']:6.2f}s  "
+            f"loop lag p50={r['lag_p50_ms']:.1f}ms max={r['lag_max_ms']:.1f}ms"
+        )
+    db.close_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Build the lake catalog used by app/services/lake_catalog.py
+(LAKE_CATALOG_PATH, default data/lakes/lakes.csv).
+
+The source is the frontend's lake list (bfp-frontend/src/data/lakes.json:
+name, state, city, latitude, longitude, acres, tier), so the API resolves
+the same lakes the map offers. Generated placeholder entries are skipped
+(see PLACEHOLDER_NAME). Each lake gets:
+  - id          "<state>-<name>" slug, stable across rebuilds (the plan cache
+                keys on it, so renaming a lake starts a new cache entry)
+  - radius_km   match radius from surface area: the radius of a circle with
+                the lake's area, times --radius-factor (reservoirs are long
+                and the point is often a town on one end), clamped to
+                [--min-radius-km, --max-radius-km]
+
+Usage:
+    python build_lake_catalog.py
+    python build_lake_catalog.py --source ../../bfp-frontend/src/data/lakes.json --out data/lakes/lakes.csv
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import re
+import sys
+import time
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.lake_catalog import CATALOG_PATH
+
+DEFAULT_SOURCE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "bfp-frontend", "src", "data", "lakes.json"
+)
+KM2_PER_ACRE = 0.0040468564
+# The frontend list pads each state with generated "<State> Lake <n>" entries
+# (city "Various") on a synthetic grid; they aren't real water bodies
+PLACEHOLDER_NAME = re.compile(r" Lake \d+$")
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def lake_radius_km(acres: float, factor: float, min_km: float, max_km: float) -> float:
+    if not acres or acres <= 0:
+        return min_km
+    r = math.sqrt(acres * KM2_PER_ACRE / math.pi) * factor
+    return round(min(max(r, min_km), max_km), 2)
+
+
+def build_rows(lakes, factor: float, min_km: float, max_km: float):
+    rows = {}
+    for lake in lakes:
+        name, state = (lake.get("name") or "").strip(), (lake.get("state") or "").strip()
+        if not name or lake.get("latitude") is None or lake.get("longitude") is None:
+            continue
+        if lake.get("city") == "Various" and PLACEHOLDER_NAME.search(name):
+            continue
+        lake_id = _slug(f"{state} {name}")
+        if lake_id in rows:
+            prev = rows[lake_id]
+            if (prev["lat"], prev["lon"]) == (round(lake["latitude"], 5), round(lake["longitude"], 5)):
+                continue  # same lake listed twice (e.g. under two tiers)
+            lake_id = _slug(f"{state} {name} {lake.get('city') or ''}")
+        rows[lake_id] = {
+            "id": lake_id,
+            "name": name,
+            "state": state,
+            "lat": round(lake["latitude"], 5),
+            "lon": round(lake["longitude"], 5),
+            "radius_km": lake_radius_km(lake.get("acres") or 0, factor, min_km, max_km),
+        }
+    return sorted(rows.values(), key=lambda r: r["id"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the lake catalog CSV")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="lakes.json from the frontend")
+    parser.add_argument("--out", default=CATALOG_PATH)
+    parser.add_argument("--radius-factor", type=float, default=1.5)
+    parser.add_argument("--min-radius-km", type=float, default=1.0)
+    parser.add_argument("--max-radius-km", type=float, default=60.0)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Lake catalog build")
+    print("=" * 60)
+
+    t0 = time.time()
+    with open(args.source, encoding="utf-8") as f:
+        lakes = json.load(f)
+    rows = build_rows(lakes, args.radius_factor, args.min_radius_km, args.max_radius_km)
+    print(f"  {len(lakes)} lakes in {args.source}, {len(rows)} after dropping placeholders and duplicates")
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    tmp = f"{args.out}.tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["id", "name", "state", "lat", "lon", "radius_km"])
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, args.out)
+    print(f"✓ Wrote {args.out} ({len(rows)} lakes) in {time.time() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
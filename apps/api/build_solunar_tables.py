@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Precompute solunar event tables (moon transit / underfoot / rise / set)
+
+Writes a memory-mappable float32 table plus JSON metadata that
+app/services/solunar.py loads at runtime (SOLUNAR_TABLE_PATH).
+
+Usage:
+    python build_solunar_tables.py
+    python build_solunar_tables.py --days 400 --resolution 0.5
+    python build_solunar_tables.py --start 2026-01-01 --bbox 24,50,-125,-66
+
+Default grid is the continental US at 0.5° for 400 days from today
+(about 40 MB). Rerun before the table runs out; requests outside the table
+fall back to computing the point directly.
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.solunar import TABLE_PATH, build_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build solunar event tables")
+    parser.add_argument("--start", default=date.today().isoformat(), help="First date (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=400)
+    parser.add_argument("--resolution", type=float, default=0.5, help="Grid step in degrees")
+    parser.add_argument("--bbox", default="24,50,-125,-66", help="lat_min,lat_max,lon_min,lon_max")
+    parser.add_argument("--out", default=TABLE_PATH)
+    args = parser.parse_args()
+
+    lat_min, lat_max, lon_min, lon_max = (float(x) for x in args.bbox.split(","))
+
+    print("=" * 60)
+    print("Solunar table build")
+    print("=" * 60)
+    print(f"  start={args.start} days={args.days} res={args.resolution}° bbox={args.bbox}")
+
+    t0 = time.time()
+    meta = build_table(
+        start=date.fromisoformat(args.start),
+        days=args.days,
+        lat_min=lat_min,
+        lat_max=lat_max,
+        lon_min=lon_min,
+        lon_max=lon_max,
+        resolution=args.resolution,
+        path=args.out,
+    )
+    size_mb = os.path.getsize(args.out) / 1e6
+    print(f"✓ Wrote {args.out} ({meta['days']}×{meta['n_lat']}×{meta['n_lon']}×4, {size_mb:.1f} MB) in {time.time() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
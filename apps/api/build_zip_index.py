@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Build the offline US ZIP centroid index used by app/services/geo.py
+(ZIP_INDEX_PATH, default data/geo/zip_index.npy).
+
+Run it as a deploy build step so instances start with the index; the API
+otherwise builds it itself in the background on first start
+(geo.ensure_zip_index).
+
+Source data:
+  - GeoNames postal codes, US.txt (tab-separated, includes place names):
+      https://download.geonames.org/export/zip/US.zip  (--download fetches it)
+  - Census ZCTA Gazetteer (tab-separated, centroids only, no place names):
+      https://www.census.gov/geographies/reference-files/time-series/geo/gazetteer-files.html
+
+Usage:
+    python build_zip_index.py --download
+    python build_zip_index.py --source US.txt
+    python build_zip_index.py --source 2023_Gaz_zcta_national.txt --format gazetteer
+    python build_zip_index.py --source US.txt --include-cache
+
+--include-cache also folds in ZIPs previously resolved through the remote API
+(zip_cache table), so they stop costing a lookup after the next deploy.
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import sys
+import time
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.geo import (
+    ZIP_INDEX_PATH,
+    ZIP_INDEX_SOURCE_URL,
+    ZipCacheStore,
+    build_zip_index,
+    download_zip_source,
+    geonames_archive_rows,
+    geonames_rows,
+)
+
+
+def _geonames_rows(path):
+    with open(path, encoding="utf-8") as f:
+        yield from geonames_rows(f)
+
+
+def _gazetteer_rows(path):
+    with open(path, encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter="\t")
+        header = [h.strip() for h in next(reader)]
+        zi, lat_i, lon_i = header.index("GEOID"), header.index("INTPTLAT"), header.index("INTPTLONG")
+        for cols in reader:
+            yield cols[zi].strip(), float(cols[lat_i]), float(cols[lon_i]), ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline ZIP centroid index")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--source", help="GeoNames US.txt or Census ZCTA gazetteer file")
+    source.add_argument("--download", action="store_true", help=f"Fetch GeoNames US.zip ({ZIP_INDEX_SOURCE_URL})")
+    parser.add_argument("--format", choices=["geonames", "gazetteer"], default="geonames")
+    parser.add_argument("--include-cache", action="store_true", help="Add ZIPs from the zip_cache table")
+    parser.add_argument("--out", default=ZIP_INDEX_PATH)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ZIP index build")
+    print("=" * 60)
+
+    t0 = time.time()
+    if args.download:
+        rows = list(geonames_archive_rows(asyncio.run(download_zip_source())))
+        print(f"  {len(rows)} rows from {ZIP_INDEX_SOURCE_URL}")
+    else:
+        rows = list(_geonames_rows(args.source) if args.format == "geonames" else _gazetteer_rows(args.source))
+        print(f"  {len(rows)} rows from {args.source} ({args.format})")
+
+    if args.include_cache:
+        cached = ZipCacheStore().all()
+        print(f"  {len(cached)} rows from zip_cache")
+        rows.extend(cached)  # source file wins for ZIPs present in both
+
+    count = build_zip_index(rows, path=args.out)
+    size_mb = os.path.getsize(args.out) / 1e6
+    print(f"✓ Wrote {args.out} ({count} ZIPs, {size_mb:.1f} MB) in {time.time() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Create the plan_history indexes on an existing database
+
+The store creates its indexes at startup with plain CREATE INDEX, which holds
+a write lock on plan_history while it builds. On a live Postgres, run this
+first: it builds them with CREATE INDEX CONCURRENTLY (and drops the indexes
+they replace the same way), so the next deploy finds them already there.
+Set PLAN_HISTORY_AUTO_INDEX=0 on the app to leave index changes to this
+script entirely.
+
+Usage:
+    python migrate_plan_history_indexes.py
+    python migrate_plan_history_indexes.py --rebuild-counts
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Build the indexes below, not in the store constructor
+os.environ["PLAN_HISTORY_AUTO_INDEX"] = "0"
+
+from app.services.plan_history import PlanHistoryStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create plan_history indexes")
+    parser.add_argument("--rebuild-counts", action="store_true", help="Recompute plan_history_counts")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Plan History Migration: indexes")
+    print("=" * 60)
+
+    history = PlanHistoryStore()
+    backend = "postgres" if history._use_pg else "sqlite"
+
+    t0 = time.time()
+    for sql in history.ensure_indexes(concurrently=True):
+        print(f"  {sql}")
+    print(f"✓ Indexes ready ({backend}) in {time.time() - t0:.1f}s")
+
+    if args.rebuild_counts:
+        t0 = time.time()
+        users = history.rebuild_counts()
+        print(f"✓ Rebuilt cached counts for {users} users in {time.time() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
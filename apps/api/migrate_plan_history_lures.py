@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Backfill plan_history.primary_lure / secondary_lure / lat / lon / lake_id
+
+Rows written before these columns existed get them from the stored plan in
+plan_links. New rows are filled by add_plan, so this only needs to run once
+per database (rerunning is safe: it only touches rows still missing them).
+
+Usage:
+    python migrate_plan_history_lures.py
+    python migrate_plan_history_lures.py --batch-size 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.plan_history import PlanHistoryStore
+from app.services.plan_links import PlanLinkStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill denormalized plan_history columns")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Plan History Backfill: lures + coordinates")
+    print("=" * 60)
+
+    history = PlanHistoryStore()  # adds the columns if they don't exist yet
+    links = PlanLinkStore()
+
+    t0 = time.time()
+    counts = history.backfill_denormalized(links.get_plans, batch_size=args.batch_size)
+    print(f"  Scanned: {counts['scanned']}")
+    print(f"  Updated: {counts['updated']}")
+    print(f"  Plan link missing: {counts['missing']}")
+    print(f"✓ Done in {time.time() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Plan link storage codec: report, train, migrate
+
+Plan bodies used to be stored as JSON text in plan_links.plan_data. New rows go
+to plan_blob through app/services/plan_codec.py; old rows stay readable as-is,
+and this script moves them over.
+
+Steps:
+  1. Report (default): sample recent plans and compare stored size and
+     encode/decode cost for each codec, with and without a dictionary.
+  2. --train: train a dictionary from the sample and store it in the
+     plan_codec_dicts table under the next id. This process encodes with it
+     right away; running instances can already decode it and switch to it
+     for new rows when they restart.
+  3. --apply: re-encode the remaining JSON text rows into plan_blob.
+
+Usage:
+    python migrate_plan_links_codec.py
+    python migrate_plan_links_codec.py --sample 1000 --train
+    python migrate_plan_links_codec.py --apply --batch-size 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import plan_codec
+from app.services.plan_codec import CODEC_JSON, CODEC_ZLIB, CODEC_ZSTD, PlanCodec, train_dict
+from app.services.plan_links import PlanLinkStore
+
+
+def _measure(codec: PlanCodec, plans, codec_id: int, dict_id: int) -> dict:
+    t0 = time.perf_counter()
+    blobs = [codec.encode(plan, codec=codec_id, dict_id=dict_id) for plan in plans]
+    t1 = time.perf_counter()
+    for blob in blobs:
+        codec.decode(blob)
+    t2 = time.perf_counter()
+    n = len(plans)
+    return {
+        "bytes": sum(len(b) for b in blobs) / n,
+        "encode_us": (t1 - t0) / n * 1e6,
+        "decode_us": (t2 - t1) / n * 1e6,
+    }
+
+
+def report(plans, codec: PlanCodec, dict_id: int) -> None:
+    import json
+
+    n = len(plans)
+    texts = [json.dumps(plan) for plan in plans]
+    t0 = time.perf_counter()
+    for text in texts:
+        json.loads(text)
+    text_decode_us = (time.perf_counter() - t0) / n * 1e6
+    text_bytes = sum(len(t.encode("utf-8")) for t in texts) / n
+
+    print(f"  {'format':<22}{'avg bytes':>10}{'ratio':>8}{'encode µs':>11}{'decode µs':>11}")
+    print(f"  {'json text (current)':<22}{text_bytes:>10.0f}{1:>8.2f}{'-':>11}{text_decode_us:>11.1f}")
+
+    variants = [("json blob", CODEC_JSON, 0), ("zlib", CODEC_ZLIB, 0)]
+    if dict_id:
+        variants.append((f"zlib + dict #{dict_id}", CODEC_ZLIB, dict_id))
+    if plan_codec.zstandard is not None:
+        variants.append(("zstd", CODEC_ZSTD, 0))
+        if dict_id:
+            variants.append((f"zstd + dict #{dict_id}", CODEC_ZSTD, dict_id))
+    for label, codec_id, d in variants:
+        r = _measure(codec, plans, codec_id, d)
+        print(
+            f"  {label:<22}{r['bytes']:>10.0f}{r['bytes'] / text_bytes:>8.2f}"
+            f"{r['encode_us']:>11.1f}{r['decode_us']:>11.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compressed plan storage migration")
+    parser.add_argument("--sample", type=int, default=500, help="Recent plans to measure / train on")
+    parser.add_argument("--train", action="store_true", help="Train and save a new dictionary")
+    parser.add_argument("--dict-size", type=int, default=16 * 1024)
+    parser.add_argument("--apply", action="store_true", help="Re-encode JSON text rows into plan_blob")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Plan Links Storage Codec")
+    print("=" * 60)
+
+    links = PlanLinkStore()  # adds plan_blob if it doesn't exist yet
+    codec = links.codec
+    plans = links.sample_plans(limit=args.sample)
+    print(f"  Sampled {len(plans)} plans (codec={codec.codec_stats()['codec']}, level={codec.level})")
+
+    dict_id = codec.dict_id
+    if args.train:
+        if len(plans) < 8:
+            print("✗ Need at least 8 plans to train a dictionary")
+            sys.exit(1)
+        dict_id = links.add_codec_dict(train_dict(plans, size=args.dict_size))
+        print(f"✓ Stored dictionary #{dict_id} in plan_codec_dicts")
+
+    if plans:
+        report(plans, codec, dict_id)
+
+    if args.apply:
+        t0 = time.time()
+        counts = links.encode_legacy_rows(batch_size=args.batch_size)
+        before, after = counts["bytes_before"], counts["bytes_after"]
+        print(f"  Converted: {counts['converted']}  Failed: {counts['failed']}")
+        if before:
+            print(f"  Size: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB ({after / before:.0%})")
+        print(f"✓ Done in {time.time() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Backfill plan_links.summary
+
+The summary column (location, lake id, phase, lures, coordinates) lets plan
+listings and lookups skip decoding the plan body. New rows get it in
+save_plan; this fills it in for older rows. Rerunning is safe: it only touches
+rows still missing a summary.
+
+Opening the stores also applies the schema side: the summary column and its
+expression indexes, and on Postgres the conversion of plan_history.conditions
+to JSONB.
+
+Usage:
+    python migrate_plan_summaries.py
+    python migrate_plan_summaries.py --batch-size 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.plan_history import PlanHistoryStore
+from app.services.plan_links import PlanLinkStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill plan_links.summary")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Plan Links Backfill: summaries")
+    print("=" * 60)
+
+    PlanHistoryStore()
+    links = PlanLinkStore()
+
+    t0 = time.time()
+    counts = links.backfill_summaries(batch_size=args.batch_size)
+    print(f"  Updated: {counts['updated']}")
+    print(f"  Failed to decode: {counts['failed']}")
+    print(f"✓ Done in {time.time() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
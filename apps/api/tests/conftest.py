@@ -0,0 +1,12 @@
+# apps/api/tests/conftest.py
+import os
+import sys
+import tempfile
+
+# Import app modules from apps/api
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Module-level stores open data/*.sqlite3 relative to the cwd on import; keep
+# them (and anything a test writes) out of the real data directory.
+os.environ.pop("DATABASE_URL", None)
+os.chdir(tempfile.mkdtemp(prefix="bfp-api-tests-"))
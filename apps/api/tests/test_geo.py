@@ -0,0 +1,65 @@
+# apps/api/tests/test_geo.py
+import asyncio
+import io
+import zipfile
+
+import pytest
+
+from app.services import geo
+
+np = pytest.importorskip("numpy")
+
+GEONAMES = (
+    "US\t30301\tAtlanta\tGeorgia\tGA\tFulton\t121\t\t\t33.8444\t-84.474\t4\n"
+    "US\t30501\tGainesville\tGeorgia\tGA\tHall\t139\t\t\t34.3106\t-83.8144\t4\n"
+    "CA\tH0H\tNorth Pole\t\t\t\t\t\t\t90.0\t0.0\t1\n"
+)
+
+
+def _archive():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("US.txt", GEONAMES)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def fresh(tmp_path, monkeypatch):
+    monkeypatch.setattr(geo, "_index", geo.ZipIndex(path=str(tmp_path / "zip_index.npy")))
+    monkeypatch.setattr(geo, "_cache", geo.ZipCacheStore(path=str(tmp_path / "zip_cache.sqlite3")))
+    return tmp_path
+
+
+def test_startup_build_then_index_lookup(fresh, monkeypatch):
+    async def fake_download(url=geo.ZIP_INDEX_SOURCE_URL):
+        return _archive()
+
+    async def no_remote(z):
+        raise AssertionError("remote lookup")
+
+    monkeypatch.setattr(geo, "download_zip_source", fake_download)
+    monkeypatch.setattr(geo, "_resolve_zip_remote", no_remote)
+    geo._cache.put({"zip": "99501", "lat": 61.22, "lon": -149.9, "name": "Anchorage AK"})
+
+    asyncio.run(geo.ensure_zip_index())
+    assert geo._index.zips == 3  # two GeoNames rows plus the cached one
+
+    hit = asyncio.run(geo.resolve_zip("30501"))
+    assert hit == {"zip": "30501", "lat": 34.3106, "lon": -83.8144, "name": "Gainesville GA"}
+    assert asyncio.run(geo.resolve_zip("99501"))["name"] == "Anchorage AK"
+
+
+def test_cache_then_remote_without_index(fresh, monkeypatch):
+    calls = []
+
+    async def remote(z):
+        calls.append(z)
+        return {"zip": z, "lat": 1.0, "lon": 2.0, "name": "Somewhere"}
+
+    monkeypatch.setattr(geo, "_resolve_zip_remote", remote)
+    assert asyncio.run(geo.resolve_zip("12345"))["name"] == "Somewhere"
+    assert asyncio.run(geo.resolve_zip("12345"))["name"] == "Somewhere"
+    assert calls == ["12345"]
+
+    with pytest.raises(ValueError):
+        asyncio.run(geo.resolve_zip("123"))
@@ -0,0 +1,28 @@
+# apps/api/tests/test_hedge_budget.py
+from app.services import llm_plan_service as svc
+
+
+def test_hedge_estimate_ignores_repair_calls(monkeypatch):
+    monkeypatch.setattr(svc, "_LLM_USAGE", {k: 0 for k in svc._LLM_USAGE})
+    budget = svc._HedgeBudget()
+    assert budget._estimate_tokens() == budget.DEFAULT_CALL_TOKENS
+
+    svc._record_usage({"prompt_tokens": 15000, "completion_tokens": 3000})
+    for _ in range(5):
+        svc._record_usage({"prompt_tokens": 1500, "completion_tokens": 500}, attempt=False)
+    assert budget._estimate_tokens() == 18000
+    assert svc._LLM_USAGE["calls"] == 6
+
+
+def test_hedge_refused_when_spend_is_over_budget(monkeypatch):
+    monkeypatch.setattr(svc, "_LLM_USAGE", {k: 0 for k in svc._LLM_USAGE})
+    monkeypatch.setenv("LLM_HEDGE_TOKENS_PER_MINUTE", "40000")
+    svc._record_usage({"prompt_tokens": 15000, "completion_tokens": 3000})
+    svc._record_usage({"prompt_tokens": 1500, "completion_tokens": 500}, attempt=False)
+
+    budget = svc._HedgeBudget()
+    assert budget.try_acquire() is None
+    budget.release()
+    assert budget.try_acquire() is None
+    budget.release()
+    assert budget.try_acquire() == "spend"
@@ -0,0 +1,40 @@
+# apps/api/tests/test_lake_catalog.py
+import pytest
+
+from app.services import lake_catalog
+from app.services.lake_catalog import LakeCatalog
+
+CSV = """id,name,state,lat,lon,radius_km
+ga-lake-lanier,Lake Lanier,GA,34.2123,-84.0831,20
+ga-small-pond,Small Pond,GA,34.30,-84.00,0.5
+tx-lake-fork,Lake Fork,TX,32.8134,-95.6486,
+"""
+
+
+@pytest.fixture(params=["numpy", "pure"])
+def catalog(request, tmp_path, monkeypatch):
+    if request.param == "pure":
+        monkeypatch.setattr(lake_catalog, "np", None)
+    elif lake_catalog.np is None:
+        pytest.skip("numpy not installed")
+    path = tmp_path / "lakes.csv"
+    path.write_text(CSV)
+    return LakeCatalog(path=str(path))
+
+
+def test_resolve_uses_each_lakes_radius(catalog):
+    # 15 km up the lake from its point: outside the default 5 km, inside Lanier's 20 km
+    assert catalog.resolve(34.34, -84.03)["id"] == "ga-lake-lanier"
+    # On the pond, which is nearer than Lanier's point
+    assert catalog.resolve(34.301, -84.001)["id"] == "ga-small-pond"
+    # Rows without radius_km use LAKE_MATCH_RADIUS_KM (5)
+    assert catalog.resolve(32.85, -95.65)["id"] == "tx-lake-fork"
+    assert catalog.resolve(32.95, -95.65) is None
+
+
+def test_within_is_sorted_and_limited(catalog):
+    lakes = catalog.within(34.25, -84.05, radius_km=50)
+    assert [lake["id"] for lake in lakes] == ["ga-lake-lanier", "ga-small-pond"]
+    assert lakes[0]["distance_km"] < lakes[1]["distance_km"]
+    assert len(catalog.within(34.25, -84.05, radius_km=50, limit=1)) == 1
+    assert catalog.nearest(0.0, 0.0) == []
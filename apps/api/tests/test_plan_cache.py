@@ -0,0 +1,123 @@
+# apps/api/tests/test_plan_cache.py
+import asyncio
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.services.plan_cache import InMemoryPlanCacheBackend, PlanCache, SqlPlanCacheBackend, plan_cache_key
+
+WEATHER = {"temp_f": 71.0, "wind_mph": 6.0, "cloud_cover": "clear sky", "pressure_mb": 1016.0, "pressure_trend": "falling"}
+NOW = datetime(2026, 6, 1, 9, 15, tzinfo=timezone.utc)
+PLAN = {"primary": {"base_lure": "jig"}, "secondary": {"base_lure": "spinnerbait"}}
+
+
+def _key(**overrides):
+    kw = dict(weather=WEATHER, phase="summer", access_type="boat", latitude=None, longitude=None,
+              water_view_id="ga-lake-lanier", now=NOW)
+    kw.update(overrides)
+    return plan_cache_key(**kw)
+
+
+def _sql(tmp_path, max_entries):
+    return SqlPlanCacheBackend(path=str(tmp_path / "plan_cache.sqlite3"), max_entries=max_entries)
+
+
+# ----------------------------------------
+# Key composition
+# ----------------------------------------
+
+def test_key_splits_on_what_the_plan_depends_on():
+    base = _key()
+    assert _key() == base
+    assert _key(access_type="bank") != base
+    assert _key(water_view_id="tx-lake-fork") != base
+    assert _key(trip_date=date(2026, 6, 6)) != base
+    assert _key(phase="post-spawn") != base
+    assert _key(weather={**WEATHER, "pressure_trend": "rising"}) != base
+
+
+def test_key_ignores_display_fields_and_shares_a_time_bucket():
+    base = _key()
+    assert _key(weather={**WEATHER, "sunriseTime": "6:12 AM"}) == base
+    assert _key(now=NOW.replace(minute=55)) == base
+    assert _key(now=NOW.replace(hour=10)) != base
+
+
+def test_point_key_rounds_lat_lon(monkeypatch):
+    monkeypatch.setenv("PLAN_CACHE_LATLON_DIGITS", "2")
+    point = _key(water_view_id=None, latitude=34.2012, longitude=-83.9017)
+    assert _key(water_view_id=None, latitude=34.2049, longitude=-83.9001) == point
+    assert _key(water_view_id=None, latitude=34.2151, longitude=-83.9017) != point
+
+
+# ----------------------------------------
+# Backends: TTL and LRU
+# ----------------------------------------
+
+@pytest.mark.parametrize("make", [lambda tmp: InMemoryPlanCacheBackend(max_entries=2), lambda tmp: _sql(tmp, 2)])
+def test_ttl_expiry(tmp_path, make):
+    backend = make(tmp_path)
+    backend.set("a", "{}", expires_at=110, now=100)
+    assert backend.get("a", now=109) == "{}"
+    assert backend.get("a", now=110) is None
+    assert backend.size() == 0  # an expired read drops the entry
+
+
+def test_memory_lru_evicts_least_recently_used():
+    backend = InMemoryPlanCacheBackend(max_entries=2)
+    backend.set("a", "A", 1000, 1)
+    backend.set("b", "B", 1000, 2)
+    assert backend.get("a", 3) == "A"  # a is now the most recent
+    assert backend.set("c", "C", 1000, 4) == 1
+    assert backend.get("b", 5) is None
+    assert (backend.get("a", 5), backend.get("c", 5)) == ("A", "C")
+
+
+def test_memory_sweep_drops_expired():
+    backend = InMemoryPlanCacheBackend(max_entries=10)
+    backend.set("old", "x", 50, 1)
+    backend.set("new", "y", 500, 1)
+    assert backend.sweep(now=100) == 1
+    assert backend.size() == 1
+
+
+def test_sql_set_is_one_write_and_sweep_bounds_the_table(tmp_path):
+    backend = _sql(tmp_path, 2)
+    backend.set("expired", "x", 50, 1)
+    for i, key in enumerate(("a", "b", "c")):
+        assert backend.set(key, key, 1000, 10 + i) == 0
+    assert backend.size() == 4  # nothing removed on the write path
+    backend.get("a", 20)  # touch a: b is now least recently used
+
+    assert backend.sweep(now=100) == 2
+    assert backend.get("b", 101) is None
+    assert (backend.get("a", 101), backend.get("c", 101)) == ("a", "c")
+
+
+# ----------------------------------------
+# Facade
+# ----------------------------------------
+
+def test_regeneration_bypasses_the_cache():
+    cache = PlanCache(backend=InMemoryPlanCacheBackend(), ttl_seconds=60, enabled=True)
+    cache.set("k", PLAN)
+    assert cache.lookup("k", regenerating=True) is None
+    assert cache.lookup("k") == PLAN
+    stats = cache.stats()
+    assert (stats["bypasses"], stats["hits"], stats["misses"]) == (1, 1, 0)
+
+
+def test_last_combination_is_never_served_again():
+    cache = PlanCache(backend=InMemoryPlanCacheBackend(), ttl_seconds=60, enabled=True)
+    cache.set("k", PLAN)
+    assert cache.lookup("k", avoid_combination=["jig", "spinnerbait"]) is None
+    assert cache.lookup("k", avoid_combination=["jig", "frog"]) == PLAN
+
+
+def test_aio_view_and_sweep(tmp_path):
+    cache = PlanCache(backend=_sql(tmp_path, 10), ttl_seconds=-1, enabled=True)
+    asyncio.run(cache.aio.set("k", PLAN))
+    assert asyncio.run(cache.aio.lookup("k")) is None  # already expired
+    cache.set("gone", PLAN)
+    assert asyncio.run(cache.aio.sweep()) == 1
+    assert cache.stats()["sweeps"] == 1
@@ -0,0 +1,90 @@
+# apps/api/tests/test_plan_codec.py
+import json
+
+import pytest
+
+from app.services import plan_codec
+from app.services.plan_codec import CODEC_JSON, CODEC_ZLIB, CODEC_ZSTD, PlanCodec, train_dict
+from app.services.plan_links import PlanLinkStore
+
+CODECS = [CODEC_JSON, CODEC_ZLIB]
+if plan_codec.zstandard is not None:
+    CODECS.append(CODEC_ZSTD)
+
+
+def _plan(i):
+    return {
+        "forecast_rating": {"score": i % 10, "label": "Good"},
+        "outlook_blurb": f"Post-frontal bluebird day #{i}; fish tight to cover.",
+        "primary": {"base_lure": "jig", "color": "green pumpkin", "targets": ["docks", "laydowns"]},
+        "secondary": {"base_lure": "crankbait", "color": "shad", "depth_ft": [4, 8]},
+        "conditions": {"location_name": "Lake Lanier", "latitude": 34.2, "longitude": -83.9, "phase": "summer"},
+    }
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Each test gets its own codec instead of the process-wide one
+    monkeypatch.setattr(plan_codec, "_codec", None)
+    return PlanLinkStore(path=str(tmp_path / "plan_links.sqlite3"))
+
+
+@pytest.mark.parametrize("codec_id", CODECS)
+@pytest.mark.parametrize("with_dict", [False, True])
+def test_round_trip(store, codec_id, with_dict):
+    dict_id = store.add_codec_dict(train_dict([_plan(i) for i in range(40)], size=4096)) if with_dict else 0
+    codec = store.codec
+    plan = _plan(7)
+    blob = codec.encode(plan, codec=codec_id, dict_id=dict_id)
+
+    _, _, stored_codec, stored_dict = plan_codec.HEADER.unpack_from(blob)
+    assert stored_codec == codec_id
+    assert stored_dict == (dict_id if codec_id != CODEC_JSON else 0)
+    assert codec.decode(blob) == plan
+    assert codec.decode(memoryview(blob)) == plan  # psycopg BYTEA
+
+
+def test_legacy_text_rows_and_migration(store):
+    plan = _plan(1)
+    with store._conn() as conn:
+        conn.execute(
+            "INSERT INTO plan_links (token, email, is_member, plan_data, created_at) VALUES (?, ?, 1, ?, 0)",
+            ("legacy", "a@x.com", json.dumps(plan)),
+        )
+        conn.commit()
+    assert store.get_plan("legacy", count_view=False)["plan"] == plan
+
+    assert store.encode_legacy_rows()["converted"] == 1
+    with store._conn() as conn:
+        row = conn.execute("SELECT plan_data, plan_blob FROM plan_links WHERE token='legacy'").fetchone()
+    assert row["plan_data"] == "" and row["plan_blob"] is not None
+    assert store.get_plan("legacy", count_view=False)["plan"] == plan
+
+
+def test_other_instances_read_dictionaries_from_the_db(store):
+    dict_id = store.add_codec_dict(train_dict([_plan(i) for i in range(40)], size=4096))
+    token = store.save_plan("a@x.com", True, _plan(3))
+    with store._conn() as conn:
+        blob = conn.execute("SELECT plan_blob FROM plan_links WHERE token=?", (token,)).fetchone()["plan_blob"]
+    assert plan_codec.HEADER.unpack_from(blob)[3] == dict_id
+
+    # An instance started before the dictionary was trained fetches it on first use
+    other = PlanCodec(dict_loader=store.get_codec_dict)
+    assert other.decode(blob) == _plan(3)
+    assert other.stats["dicts_fetched"] == 1
+
+    with pytest.raises(ValueError):
+        PlanCodec().decode(blob)
+
+
+def test_dictionary_files_are_imported(tmp_path, monkeypatch):
+    monkeypatch.setattr(plan_codec, "_codec", None)
+    monkeypatch.setattr(plan_codec, "DICT_DIR", str(tmp_path / "dicts"))
+    (tmp_path / "dicts").mkdir()
+    data = train_dict([_plan(i) for i in range(40)], size=4096)
+    (tmp_path / "dicts" / "3.dict").write_bytes(data)
+
+    store = PlanLinkStore(path=str(tmp_path / "plan_links.sqlite3"))
+    assert store.get_codec_dict(3) == data
+    assert store.codec.dict_id == 3
+    assert store.add_codec_dict(data) == 4
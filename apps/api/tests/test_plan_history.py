@@ -0,0 +1,130 @@
+# apps/api/tests/test_plan_history.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.routes import members
+from app.services.plan_history import PlanHistoryStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("PLAN_HISTORY_COUNT_CACHE", "1")
+    return PlanHistoryStore(db_path=str(tmp_path / "plan_history.sqlite3"))
+
+
+def _add(store, email, n, same_time=False):
+    ids = [store.add_plan(email, f"tok{i}", "Lake Lanier", "member", {"phase": "pre-spawn"}) for i in range(n)]
+    if same_time:
+        # Ties on generation_date: the cursor must fall back to id
+        with store._conn() as conn:
+            conn.execute("UPDATE plan_history SET generation_date=? WHERE user_email=?", (datetime.now(timezone.utc).isoformat(), email))
+            conn.commit()
+    return ids
+
+
+def _recount(store, email):
+    with store._conn() as conn:
+        return conn.execute("SELECT COUNT(*) AS n FROM plan_history WHERE user_email=? AND is_deleted=0", (email,)).fetchone()["n"]
+
+
+def test_cursor_pages_do_not_overlap(store):
+    ids = _add(store, "a@x.com", 9, same_time=True)
+    seen, cursor = [], None
+    while True:
+        page = store.get_user_plans_page("a@x.com", limit=4, cursor=cursor)
+        seen += [plan["id"] for plan in page["plans"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 9
+    assert set(seen) == set(ids)
+
+
+@pytest.mark.parametrize("cursor", ["!!!", "bm9waXBl"])  # not base64; no "|" separator
+def test_bad_cursor_raises(store, cursor):
+    with pytest.raises(ValueError):
+        store.get_user_plans_page("a@x.com", cursor=cursor)
+
+
+def test_bad_cursor_is_a_400(store, monkeypatch):
+    async def session(authorization):
+        return "a@x.com"
+
+    monkeypatch.setattr(members, "verify_clerk_session", session)
+    monkeypatch.setattr(members, "plan_history_store", store)
+    _add(store, "a@x.com", 2)
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(members.get_plan_history(authorization="Bearer t", cursor="bm9waXBl"))
+    assert e.value.status_code == 400
+    assert asyncio.run(members.get_plan_history(authorization="Bearer t"))["total"] == 2
+
+
+def test_cached_count_follows_writes(store):
+    _add(store, "a@x.com", 12)
+    assert store.count_user_plans("a@x.com") == 12
+
+    assert store.enforce_user_limit("a@x.com", limit=10) == 2
+    assert store.count_user_plans("a@x.com") == 10
+
+    with store._conn() as conn:
+        conn.execute("UPDATE plan_history SET generation_date=? WHERE id IN (SELECT id FROM plan_history LIMIT 5)",
+                     ((datetime.now(timezone.utc) - timedelta(days=40)).isoformat(),))
+        conn.commit()
+    store.claim_expired(datetime.now(timezone.utc) - timedelta(days=30))
+    assert store.count_user_plans("a@x.com") == _recount(store, "a@x.com")
+
+
+def test_write_seeds_an_unseeded_user(tmp_path, monkeypatch):
+    # History written before the cache was turned on
+    monkeypatch.setenv("PLAN_HISTORY_COUNT_CACHE", "0")
+    store = PlanHistoryStore(db_path=str(tmp_path / "plan_history.sqlite3"))
+    _add(store, "a@x.com", 3)
+    store.count_cache = True
+
+    with store._conn() as conn:
+        store.add_plan("a@x.com", "tok", "Lake Lanier", "member", {})
+        # A reader that counted before the insert committed seeds too late and changes nothing
+        conn.execute("INSERT INTO plan_history_counts (user_email, visible) VALUES (?, 3) ON CONFLICT (user_email) DO NOTHING",
+                     ("a@x.com",))
+        conn.commit()
+    assert store.count_user_plans("a@x.com") == 4
+
+
+def test_top_lakes_groups_by_lake_not_name(store):
+    def plan(lake_id, lat, lon, n, name="Clear Lake"):
+        for _ in range(n):
+            store.add_plan("a@x.com", "tok", name, "member", {"lake_id": lake_id, "latitude": lat, "longitude": lon})
+
+    plan("ca-clear-lake", 39.0, -122.8, 3)
+    plan("ca-clear-lake", 39.1, -122.9, 1)  # same lake, another launch
+    plan("ia-clear-lake", 43.1, -93.4, 2)
+    plan(None, 30.0, -90.0, 1, name="My Pond")
+
+    lakes = {lake["lake_id"]: lake for lake in store.top_lakes()}
+    assert (lakes["ca-clear-lake"]["plans"], lakes["ca-clear-lake"]["lat"], lakes["ca-clear-lake"]["lon"]) == (4, 39.0, -122.8)
+    assert (lakes["ia-clear-lake"]["plans"], lakes["ia-clear-lake"]["lat"]) == (2, 43.1)
+    assert lakes[None]["lake_name"] == "My Pond"
+
+
+@pytest.mark.parametrize("cached", ["0", "1"])
+def test_total_matches_the_listing_with_or_without_the_cache(tmp_path, monkeypatch, cached):
+    monkeypatch.setenv("PLAN_HISTORY_COUNT_CACHE", cached)
+    store = PlanHistoryStore(db_path=str(tmp_path / "plan_history.sqlite3"))
+    _add(store, "a@x.com", 3)
+    # Older than 30 days but not yet removed by retention (e.g. PLAN_RETENTION_DAYS=45)
+    with store._conn() as conn:
+        conn.execute("UPDATE plan_history SET generation_date=? WHERE id IN (SELECT id FROM plan_history LIMIT 1)",
+                     ((datetime.now(timezone.utc) - timedelta(days=40)).isoformat(),))
+        conn.commit()
+
+    async def session(authorization):
+        return "a@x.com"
+
+    monkeypatch.setattr(members, "verify_clerk_session", session)
+    monkeypatch.setattr(members, "plan_history_store", store)
+    out = asyncio.run(members.get_plan_history(authorization="Bearer t"))
+    assert out["total"] == len(out["plans"]) == 3
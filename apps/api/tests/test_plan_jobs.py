@@ -0,0 +1,68 @@
+# apps/api/tests/test_plan_jobs.py
+import asyncio
+import time
+
+from app.services.plan_jobs import JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, PlanJobQueue, PlanJobStore
+
+
+def _age(store, job_id, started_ago, heartbeat_ago):
+    now = int(time.time())
+    with store._conn() as conn:
+        conn.execute(
+            "UPDATE plan_jobs SET started_at=?, heartbeat_at=? WHERE id=?",
+            (now - started_ago, now - heartbeat_ago, job_id),
+        )
+        conn.commit()
+
+
+def test_long_running_job_with_heartbeat_is_not_requeued(tmp_path):
+    store = PlanJobStore(path=str(tmp_path / "plan_jobs.sqlite3"))
+    job_id = store.enqueue("a@x.com", {"body": {}})
+    assert store.claim_next("w1")["id"] == job_id
+
+    # Running for 10 minutes (5 attempts x 70s reads plus backoff) but still beating
+    _age(store, job_id, started_ago=600, heartbeat_ago=5)
+    assert store.requeue_stale(120, max_attempts=3) == 0
+    assert store.get(job_id)["status"] == JOB_RUNNING
+
+    # Worker died: heartbeat stopped
+    _age(store, job_id, started_ago=600, heartbeat_ago=300)
+    assert store.requeue_stale(120, max_attempts=3) == 1
+    assert store.get(job_id)["status"] == JOB_QUEUED
+
+
+def test_heartbeat_only_for_the_owning_worker(tmp_path):
+    store = PlanJobStore(path=str(tmp_path / "plan_jobs.sqlite3"))
+    job_id = store.enqueue("a@x.com", {"body": {}})
+    store.claim_next("w1")
+    assert store.heartbeat(job_id, "w1")
+    assert not store.heartbeat(job_id, "w2")
+
+    store.release_worker("w1")
+    assert not store.heartbeat(job_id, "w1")
+
+
+def test_failed_complete_is_retried_not_rerun(tmp_path):
+    store = PlanJobStore(path=str(tmp_path / "plan_jobs.sqlite3"))
+    queue = PlanJobQueue(store)
+    job_id = store.enqueue("a@x.com", {"body": {}})
+    job = store.claim_next("w1")
+
+    complete, errors = store.complete, [OSError("db blip"), OSError("db blip")]
+    def flaky(*args):
+        if errors:
+            raise errors.pop()
+        return complete(*args)
+    store.complete = flaky
+
+    runs = []
+    async def handler(job):
+        runs.append(job["id"])
+        return "tok123"
+    queue._handler = handler
+
+    asyncio.run(queue._run(job, "w1"))
+    assert runs == [job_id]
+    assert store.get(job_id)["status"] == JOB_SUCCEEDED
+    assert store.get(job_id)["result_token"] == "tok123"
+    assert queue._counters["complete_retries"] == 2
@@ -0,0 +1,133 @@
+# apps/api/tests/test_plan_repair.py
+import asyncio
+
+from app.services import llm_plan_service as svc
+
+
+def _pattern(**overrides):
+    pattern = {
+        "base_lure": "spinnerbait",
+        "presentation": "Horizontal Reaction",
+        "trailer": "paddle tail swimbait",
+        "trailer_why": "bulk",
+        "color_recommendations": ["white", "shad"],
+        "targets": ["grass edges"],
+    }
+    pattern.update(overrides)
+    return pattern
+
+
+def test_lure_spelling_and_colors_coerced_to_pool():
+    pattern = _pattern(base_lure="Spinnerbait ", color_recommendations=["hot pink sparkle", "WHITE"])
+    fixes = svc._repair_pattern(pattern, "primary")
+
+    assert pattern["base_lure"] == "spinnerbait"
+    colors = pattern["color_recommendations"]
+    assert len(colors) == 2
+    allowed = set(svc.get_color_pool_for_lure("spinnerbait", None))
+    assert set(colors) <= allowed
+    assert "white" in colors
+    assert any("colors" in f for f in fixes)
+
+
+def test_unknown_lure_is_left_for_the_validator():
+    pattern = _pattern(base_lure="magic spoon", color_recommendations=["hot pink sparkle"])
+    svc._repair_pattern(pattern, "primary")
+
+    assert pattern["base_lure"] == "magic spoon"
+    assert pattern["color_recommendations"] == ["hot pink sparkle"]
+
+
+def test_soft_plastic_moves_to_trailer_for_trailer_lures():
+    pattern = _pattern(soft_plastic="paddle tail swimbait", soft_plastic_why="bulk")
+    del pattern["trailer"], pattern["trailer_why"]
+    fixes = svc._repair_pattern(pattern, "primary")
+
+    assert pattern["trailer"] == "paddle tail swimbait"
+    assert pattern["trailer_why"] == "bulk"
+    assert "soft_plastic" not in pattern and "soft_plastic_why" not in pattern
+    assert "primary: moved soft_plastic to trailer" in fixes
+
+
+def test_trailer_moves_to_soft_plastic_for_terminal_rigs():
+    pattern = {
+        "base_lure": "texas rig",
+        "presentation": "Bottom Contact - Dragging",
+        "trailer": "craw",
+        "trailer_why": "profile",
+        "color_recommendations": ["green pumpkin", "black/blue"],
+    }
+    fixes = svc._repair_pattern(pattern, "secondary")
+
+    assert pattern["soft_plastic"] == "craw"
+    assert pattern["soft_plastic_why"] == "profile"
+    assert "trailer" not in pattern and "trailer_why" not in pattern
+    assert "secondary: moved trailer to soft_plastic" in fixes
+
+
+def test_repair_plan_locally_forces_different_presentations():
+    plan = {
+        "primary": {
+            "base_lure": "texas rig",
+            "presentation": "Bottom Contact - Dragging",
+            "soft_plastic": "craw",
+            "color_recommendations": ["green pumpkin", "black/blue"],
+        },
+        "secondary": {
+            "base_lure": "texas rig",
+            "presentation": "Bottom Contact - Dragging",
+            "soft_plastic": "craw",
+            "color_recommendations": ["green pumpkin", "black/blue"],
+        },
+    }
+    fixes = svc.repair_plan_locally(plan, is_member=True)
+
+    assert plan["primary"]["presentation"] != plan["secondary"]["presentation"]
+    assert any("must differ" in f for f in fixes)
+
+
+def test_only_failing_sections_go_to_the_llm(monkeypatch):
+    plan = {
+        "outlook_blurb": "Overcast and windy.",
+        "primary": _pattern(),
+        "secondary": _pattern(base_lure="magic spoon"),
+        "day_progression": ["Morning: a", "Midday: b", "Evening: c"],
+    }
+    seen = {}
+
+    def fake_prompt(sections, errors):
+        seen["sections"] = sections
+        seen["errors"] = errors
+        return "repair"
+
+    async def fake_chat(messages, **kwargs):
+        seen["messages"] = messages
+        seen["label"] = kwargs.get("label")
+        return {"secondary": {"base_lure": "chatterbait"}, "primary": {"base_lure": "rewritten"}}
+
+    monkeypatch.setattr(svc, "build_section_repair_prompt", fake_prompt)
+    monkeypatch.setattr(svc, "_openai_chat_json", fake_chat)
+
+    errors = ["secondary: base_lure 'magic spoon' not in pool"]
+    merged = asyncio.run(svc._repair_sections_with_llm(plan, errors, True, "user msg"))
+
+    assert list(seen["sections"]) == ["secondary"]
+    assert seen["errors"] == errors
+    assert seen["messages"][1]["content"] == "user msg"
+    assert seen["messages"][2]["content"] == "repair"
+    assert seen["label"] == "LLM_REPAIR"
+    # Only the failing section is merged; the rest of the plan is untouched
+    assert merged["secondary"] == {"base_lure": "chatterbait"}
+    assert merged["primary"] == plan["primary"]
+    assert merged["day_progression"] == plan["day_progression"]
+
+
+def test_unscoped_errors_skip_section_repair(monkeypatch):
+    async def fail_chat(*_args, **_kwargs):
+        raise AssertionError("section repair should not call the LLM")
+
+    monkeypatch.setattr(svc, "_openai_chat_json", fail_chat)
+    plan = {"primary": _pattern(), "secondary": _pattern()}
+
+    assert asyncio.run(svc._repair_sections_with_llm(plan, ["Missing required field: primary"], True, "u")) is None
+    assert asyncio.run(svc._repair_sections_with_llm(plan, ["primary: x"], False, "u")) is None
@@ -0,0 +1,62 @@
+# apps/api/tests/test_plan_retention.py
+import gzip
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.plan_history import PlanHistoryStore
+from app.services.plan_retention import PlanRetentionWorker
+
+
+def _store_with_expired(tmp_path, n):
+    store = PlanHistoryStore(db_path=str(tmp_path / "plan_history.sqlite3"))
+    old = (datetime.now(timezone.utc) - timedelta(days=40)).isoformat()
+    for i in range(n):
+        store.add_plan(f"u{i % 3}@x.com", f"tok{i}", "Lake Lanier", "member", {"phase": "pre-spawn"})
+    with store._conn() as conn:
+        conn.execute("UPDATE plan_history SET generation_date=?", (old,))
+        conn.commit()
+    return store
+
+
+def _archived_ids(path):
+    with gzip.open(path, "rt") as f:
+        return [json.loads(line)["id"] for line in f if line.strip()]
+
+
+def test_concurrent_passes_archive_each_row_once(tmp_path, monkeypatch):
+    archive = tmp_path / "archive.jsonl.gz"
+    monkeypatch.setenv("PLAN_RETENTION_ARCHIVE_PATH", str(archive))
+    monkeypatch.setenv("PLAN_RETENTION_BATCH_SIZE", "7")
+    store = _store_with_expired(tmp_path, 60)
+    workers = [PlanRetentionWorker(store) for _ in range(4)]
+
+    start = threading.Barrier(len(workers))
+    def run(worker):
+        start.wait()
+        worker.purge_expired()
+    threads = [threading.Thread(target=run, args=(w,)) for w in workers]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    ids = _archived_ids(archive)
+    assert len(ids) == len(set(ids)) == 60
+    assert sum(w.archived for w in workers) == 60
+    assert store.count_user_plans("u0@x.com", since=datetime(2000, 1, 1, tzinfo=timezone.utc)) == 0
+
+
+def test_failed_archive_keeps_the_batch(tmp_path, monkeypatch):
+    monkeypatch.setenv("PLAN_RETENTION_ARCHIVE_PATH", str(tmp_path / "archive.jsonl.gz"))
+    store = _store_with_expired(tmp_path, 5)
+    worker = PlanRetentionWorker(store)
+
+    def fail(rows):
+        raise OSError("disk full")
+    monkeypatch.setattr(worker, "_archive", fail)
+    with pytest.raises(OSError):
+        worker.purge_expired()
+    assert store.count_user_plans("u0@x.com", since=datetime(2000, 1, 1, tzinfo=timezone.utc)) == 2
+
+    assert PlanRetentionWorker(store).purge_expired() == 5
@@ -0,0 +1,69 @@
+# apps/api/tests/test_plan_stream.py
+import asyncio
+import json
+
+from app.services import llm_plan_service as svc
+
+STREAMED = {"forecast_rating": {"score": 6}, "outlook_blurb": "Fish the wind-blown points."}
+
+KWARGS = dict(
+    weather={}, phase="summer", location="Lake Lanier", latitude=34.2, longitude=-83.9, is_member=True,
+)
+
+
+def _run(monkeypatch, repaired=None, valid=True, fallback=None):
+    async def fake_stream(messages, temperature, max_tokens):
+        text = json.dumps(STREAMED)
+        for i in range(0, len(text), 7):
+            yield text[i:i + 7]
+
+    async def fake_repair(plan, is_member, build_user_message):
+        return (repaired if repaired is not None else plan), valid, ([] if valid else ["bad"])
+
+    async def fake_retries(**kwargs):
+        return fallback
+
+    monkeypatch.setattr(svc, "_build_plan_user_input", lambda **kw: ({}, 0.7))
+    monkeypatch.setattr(svc, "_openai_chat_json_stream", fake_stream)
+    monkeypatch.setattr(svc, "_validate_and_repair", fake_repair)
+    monkeypatch.setattr(svc, "generate_llm_plan_with_retries", fake_retries)
+
+    async def collect():
+        return [e async for e in svc.stream_llm_plan(**KWARGS)]
+
+    return asyncio.run(collect())
+
+
+def _client_view(events):
+    """Sections a client holds after applying events in order (reset clears them)."""
+    held = {}
+    for event, data in events:
+        if event == "reset":
+            held = {}
+        elif event in svc.STREAM_SECTIONS:
+            held[event] = data
+    return held
+
+
+def test_unchanged_plan_sends_each_section_once(monkeypatch):
+    events = _run(monkeypatch)
+    names = [e for e, _ in events]
+    assert names == ["forecast_rating", "outlook_blurb", "plan"]
+    assert _client_view(events) == {k: events[-1][1][k] for k in STREAMED}
+
+
+def test_repair_that_changes_a_sent_section_resets(monkeypatch):
+    repaired = {"forecast_rating": {"score": 4}, "outlook_blurb": STREAMED["outlook_blurb"], "primary": None}
+    events = _run(monkeypatch, repaired=repaired)
+    names = [e for e, _ in events]
+    assert names == ["forecast_rating", "outlook_blurb", "reset", "forecast_rating", "outlook_blurb", "plan"]
+    assert events[2][1] == {"sections": ["forecast_rating"]}
+    assert _client_view(events) == {"forecast_rating": {"score": 4}, "outlook_blurb": STREAMED["outlook_blurb"]}
+
+
+def test_fallback_plan_replaces_streamed_sections(monkeypatch):
+    fallback = {"forecast_rating": {"score": 8}, "weather_card_insights": ["Calm morning"]}
+    events = _run(monkeypatch, valid=False, fallback=fallback)
+    assert [e for e, _ in events][2] == "reset"
+    assert _client_view(events) == fallback
+    assert events[-1] == ("plan", fallback)
@@ -0,0 +1,73 @@
+# apps/api/tests/test_pressure_history.py
+import time
+
+from app.services.pressure_history import FORECAST_HOURS, LOOKBACK_HOURS, MIN_RING_HOURS, PressureHistoryStore
+
+
+def _store(tmp_path, monkeypatch, ring_hours, retention_hours=None):
+    monkeypatch.setenv("PRESSURE_RING_HOURS", str(ring_hours))
+    if retention_hours is None:
+        monkeypatch.delenv("PRESSURE_RETENTION_HOURS", raising=False)
+    else:
+        monkeypatch.setenv("PRESSURE_RETENTION_HOURS", str(retention_hours))
+    return PressureHistoryStore(path=str(tmp_path / "pressure.sqlite3"))
+
+
+def test_ring_and_retention_bounds(tmp_path, monkeypatch):
+    store = _store(tmp_path, monkeypatch, ring_hours=24, retention_hours=168)
+    assert store.ring_hours == MIN_RING_HOURS == FORECAST_HOURS + LOOKBACK_HOURS + 1
+    assert store.retention_hours == store.ring_hours
+
+    store = _store(tmp_path, monkeypatch, ring_hours=96)
+    assert (store.ring_hours, store.retention_hours) == (96, 96)
+
+
+def test_forecasts_never_overwrite_the_lookback(tmp_path, monkeypatch):
+    store = _store(tmp_path, monkeypatch, ring_hours=MIN_RING_HOURS)
+    now = int(time.time()) // 3600 * 3600 + 60
+    hour = now // 3600
+    store.record_many("c", [(now - LOOKBACK_HOURS * 3600, 1020.0, False), (now, 1014.0, False)])
+
+    # The full One Call horizon, plus one hour beyond what the ring can hold
+    forecasts = [(now + h * 3600, 1000.0 + h, True) for h in range(1, FORECAST_HOURS + 2)]
+    store.record_many("c", forecasts)
+
+    assert store.value_at("c", hour - LOOKBACK_HOURS) == 1020.0
+    assert store.change("c", LOOKBACK_HOURS, now) == -6.0
+    assert store.value_at("c", hour + FORECAST_HOURS) == 1000.0 + FORECAST_HOURS
+    assert store.value_at("c", hour + FORECAST_HOURS + 1) is None
+
+
+def test_fetch_path_records_off_the_event_loop(tmp_path, monkeypatch):
+    import asyncio
+    import threading
+
+    from app.services import weather
+
+    store = _store(tmp_path, monkeypatch, ring_hours=MIN_RING_HOURS)
+    threads = []
+    observe = store.observe
+
+    def spy(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return observe(*args, **kwargs)
+
+    monkeypatch.setattr(store, "observe", spy)
+    monkeypatch.setattr(weather, "pressure_history", store)
+
+    out = asyncio.run(weather._pressure_trend_from_history(34.2, -83.9, 1012.0))
+    assert out["pressure_trend"] is None  # one reading, no history yet
+    assert threads and threads[0].startswith("db")
+
+
+def test_detect_pressure_trend_is_read_only(monkeypatch):
+    from app.services import weather
+
+    class NoStore:
+        def __getattr__(self, name):
+            raise AssertionError(f"pressure_history.{name} called")
+
+    monkeypatch.setattr(weather, "pressure_history", NoStore())
+    assert weather._detect_pressure_trend(1012.0, "falling") == "falling"
+    assert weather._detect_pressure_trend(1018.0) == "rising"
+    assert weather._detect_pressure_trend(None) == "stable"
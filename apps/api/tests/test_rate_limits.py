@@ -0,0 +1,97 @@
+# apps/api/tests/test_rate_limits.py
+import pytest
+
+from app.services.rate_limits import RateLimitStore
+
+
+def _store(tmp_path, monkeypatch, mode, bypass=""):
+    monkeypatch.setenv("RATE_LIMIT_MODE", mode)
+    monkeypatch.setenv("RATE_LIMIT_BYPASS_EMAILS", bypass)
+    return RateLimitStore(path=str(tmp_path / "rate_limits.sqlite3"))
+
+
+def _row(store, email, day):
+    with store._conn() as conn:
+        row = conn.execute("SELECT count FROM daily_usage WHERE email=? AND day=?", (email, day)).fetchone()
+    return row["count"] if row else 0
+
+
+def test_shared_is_the_default(tmp_path, monkeypatch):
+    monkeypatch.delenv("RATE_LIMIT_MODE", raising=False)
+    monkeypatch.setenv("WEB_CONCURRENCY", "1")
+    assert RateLimitStore(path=str(tmp_path / "r.sqlite3")).shared
+
+
+@pytest.mark.parametrize("mode", ["shared", "memory"])
+def test_reserve_stops_at_the_cap_and_release_refunds(tmp_path, monkeypatch, mode):
+    store = _store(tmp_path, monkeypatch, mode)
+    days = [store.reserve("A@x.com ", limit=3) for _ in range(5)]
+    assert days[:3] == [store._today()] * 3
+    assert days[3:] == [None, None]
+    assert store.get_daily_count("a@x.com") == 3
+
+    store.release("a@x.com", days[0])
+    assert store.get_daily_count("a@x.com") == 2
+    assert store.reserve("a@x.com", limit=3) is not None
+    assert store.reserve("a@x.com", limit=3) is None
+
+    store.flush_usage()
+    assert _row(store, "a@x.com", store._today()) == 3
+
+
+def test_bypass_list_is_never_capped(tmp_path, monkeypatch):
+    store = _store(tmp_path, monkeypatch, "shared", bypass="Admin@x.com, qa@x.com")
+    assert store.bypass == {"admin@x.com", "qa@x.com"}
+    for _ in range(4):
+        assert store.reserve("admin@x.com", limit=2) is not None
+        assert store.is_within_daily_limit("ADMIN@x.com", limit=2)
+    assert store.get_daily_count("admin@x.com") == 4
+
+    assert store.reserve("user@x.com", limit=1) is not None
+    assert store.reserve("user@x.com", limit=1) is None
+    assert not store.is_within_daily_limit("user@x.com", limit=1)
+
+
+def test_memory_counts_roll_over_at_midnight(tmp_path, monkeypatch):
+    store = _store(tmp_path, monkeypatch, "memory")
+    monkeypatch.setattr(store, "_today", lambda: "2026-01-01")
+    store._day, store._day_ends = "2026-01-01", 0
+    assert store.reserve("a@x.com", limit=1) == "2026-01-01"
+    assert store.reserve("a@x.com", limit=1) is None
+
+    monkeypatch.setattr(store, "_today", lambda: "2026-01-02")
+    store._day_ends = 0
+    assert store.get_daily_count("a@x.com") == 0
+    assert store.reserve("a@x.com", limit=1) == "2026-01-02"
+
+    # Releasing yesterday's slot doesn't touch today's count
+    store.release("a@x.com", "2026-01-01")
+    assert store.get_daily_count("a@x.com") == 1
+
+    store.flush_usage()
+    assert _row(store, "a@x.com", "2026-01-01") == 0
+    assert _row(store, "a@x.com", "2026-01-02") == 1
+
+
+def test_failed_flush_keeps_pending_increments(tmp_path, monkeypatch):
+    store = _store(tmp_path, monkeypatch, "memory")
+    day = store._today()
+    store.increment_daily_count("a@x.com")
+    store.increment_daily_count("a@x.com")
+
+    real_conn = store._conn
+
+    def broken_conn():
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(store, "_conn", broken_conn)
+    with pytest.raises(RuntimeError):
+        store.flush_usage()
+    store.increment_daily_count("a@x.com")
+    assert store.stats()["pending_increments"] == 3
+    assert store.stats()["flush_errors"] == 1
+
+    monkeypatch.setattr(store, "_conn", real_conn)
+    assert store.flush_usage() == 3
+    assert store.stats()["pending_increments"] == 0
+    assert _row(store, "a@x.com", day) == 3
@@ -0,0 +1,29 @@
+# apps/api/tests/test_trip_date.py
+from datetime import date, datetime, timedelta, timezone
+
+from app.services.plan_cache import plan_cache_key
+from app.services.weather import local_date
+
+WEATHER = {"temp_f": 71.0, "wind_mph": 6.0, "cloud_cover": "clear sky", "pressure_mb": 1016.0}
+
+
+def test_local_date_uses_the_lakes_offset():
+    for offset_h in (-10, -5, 0, 9, 14):
+        expected = datetime.now(timezone(timedelta(hours=offset_h))).date()
+        assert local_date({"tz_offset": offset_h * 3600}, lon=0.0) == expected
+
+
+def test_local_date_estimates_from_longitude_without_offset():
+    # Cached snapshots from before tz_offset was recorded
+    expected = datetime.now(timezone(timedelta(hours=-6))).date()
+    assert local_date({"tz_offset": None}, lon=-90.0) == expected
+
+
+def test_cache_key_includes_trip_date():
+    kw = dict(weather=WEATHER, phase="summer", access_type="boat", latitude=None, longitude=None,
+              water_view_id="ga-lake-lanier", now=datetime(2026, 6, 1, 9, tzinfo=timezone.utc))
+    today = plan_cache_key(**kw)
+    saturday = plan_cache_key(**kw, trip_date=date(2026, 6, 6))
+    sunday = plan_cache_key(**kw, trip_date=date(2026, 6, 7))
+    assert len({today, saturday, sunday}) == 3
+    assert plan_cache_key(**kw, trip_date=date(2026, 6, 6)) == saturday
@@ -0,0 +1,52 @@
+# apps/api/tests/test_weather_providers.py
+import asyncio
+
+import pytest
+
+from app.services.weather_providers import CircuitBreaker, ProviderChain, WeatherProvider
+
+
+def _half_open_chain(fetch):
+    chain = ProviderChain([WeatherProvider("onecall", fetch, timeout=5)], budget_seconds=5)
+    breaker = chain.breakers["onecall"]
+    breaker.opened_at = 0.0  # opened long ago: next call is the half-open trial
+    return chain, breaker
+
+
+def test_cancelled_trial_releases_the_breaker():
+    started = asyncio.Event()
+
+    async def hang(lat, lon):
+        started.set()
+        await asyncio.sleep(60)
+
+    async def ok(lat, lon):
+        return {"temp_f": 70.0}
+
+    chain, breaker = _half_open_chain(hang)
+
+    async def scenario():
+        task = asyncio.create_task(chain.fetch(34.2, -83.9))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert breaker.state == "half_open"
+        chain.providers[0].fetch = ok
+        return await chain.fetch(34.2, -83.9)
+
+    assert asyncio.run(scenario())["weather_source"] == "onecall"
+    assert breaker.state == "closed"
+
+
+def test_unreported_trial_expires_after_the_reset_window(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.services.weather_providers.time.time", lambda: clock[0])
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    breaker.opened_at = 900.0
+
+    assert breaker.allow()          # the trial
+    assert not breaker.allow()      # one at a time
+    clock[0] += 31
+    assert breaker.allow()          # the first trial never reported back